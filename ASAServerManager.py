@@ -2,93 +2,184 @@ import os
 import sys
 import subprocess
 import platform
+import time
+import multiprocessing
+import asyncio
 from PyQt5.QtWidgets import (
-    QApplication, QWidget, QVBoxLayout, QPushButton, QLineEdit, QLabel, QTextEdit, QStackedWidget, QMainWindow,
-    QHBoxLayout
+    QApplication, QWidget, QVBoxLayout, QPushButton, QLineEdit, QLabel, QPlainTextEdit, QStackedWidget,
+    QMainWindow, QHBoxLayout, QComboBox, QCheckBox, QProgressBar
 )
-from PyQt5.QtGui import QRegExpValidator, QIntValidator
-from PyQt5.QtCore import QThread, pyqtSignal, QRegExp, QTimer
+from PyQt5.QtGui import QRegExpValidator, QIntValidator, QPainter, QPen, QColor
+from PyQt5.QtCore import QThread, pyqtSignal, QRegExp, QTimer, QObject, QRunnable, QThreadPool
+
+from log_buffer import LogBuffer
+from rcon import default_pool, RconError
+from server_supervisor import ServerSupervisor, start_bat_path, graceful_stop
+from ini_model import read_ini_text, save_ini_text, settings_dir, settings_file_path
+from settings_editor import SettingsEditor
+from log_archive import LogArchive, LogArchiveReader, archive_dir
+from server_config import template_path, create_start_bat_content, create_game_user_settings_template, run_setup_script
+from profile_store import ProfileStore, default_profile_name, user_data_dir
+from integrity import verify
+from scheduler import MaintenanceScheduler, Job, restart_chain, backup_chain, CronError
+from log_events import server_ready, server_crashed
+from server_watchdog import Watchdog, watchdog_state_path
+from backup import BackupStore, backup_dir, backup_server
+from metrics import MetricsSampler, MetricsServer, default_metrics_port
+from steam_progress import SteamProgress
+from staged_update import stage_update, staged_info, swap_in, finish_switch, switch_builds
+from manager_daemon import connect_daemon, load_daemon_state
+
+
+# Console limits, keeps the GUI responsive no matter how chatty the server log is
+console_max_lines = 5000
+console_flush_interval_ms = 100
+# The install progress bar is redrawn at this rate however fast SteamCMD reports progress
+progress_refresh_interval_ms = 250
+console_flush_batch = 1000
+log_search_limit = 500
+# Reconnect attempts after losing the background manager, doubling up to the max
+daemon_reconnect_initial_ms = 1000
+daemon_reconnect_max_ms = 30000
+scheduler_state_path = os.path.join(user_data_dir(), "scheduler.state.json")
 
+class ScriptRunner(QThread):
+    finished = pyqtSignal()
 
-steam_cmd_path = ""
-install_path = ""
-start_bat_content = ""
-game_user_settings_template = ""
+    def __init__(self, log_buffer, steam_cmd_path, install_path, start_bat_content, game_user_settings_template,
+                 shared_path=None, busy_instances=(), staged=False):
+        super().__init__()
+        self.log_buffer = log_buffer
+        self.steam_cmd_path = steam_cmd_path
+        self.install_path = install_path
+        self.start_bat_content = start_bat_content
+        self.game_user_settings_template = game_user_settings_template
+        self.shared_path = shared_path
+        self.busy_instances = busy_instances
+        self.staged = staged
+        self.progress = SteamProgress()
 
-def resource_path(relative_path):
-    # For the temp folder created by PYINSTALLER
-    try:
-        base_path = sys._MEIPASS
-    except Exception:
-        base_path = os.path.abspath(".")
+    def run(self):
+        if self.staged:
+            stage_update(self.log_buffer, self.steam_cmd_path, self.install_path, self.progress)
+            self.finished.emit()
+            return
+        run_setup_script(
+            self.log_buffer, self.steam_cmd_path, self.install_path, self.start_bat_content,
+            self.game_user_settings_template, shared_path=self.shared_path, busy_instances=self.busy_instances,
+            progress=self.progress
+        )
+        self.finished.emit()
 
-    return os.path.join(base_path, relative_path)
 
+class JobSignals(QObject):
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(str)
 
-ps1_path = resource_path("setup-asa-server.ps1")
-template_path = resource_path(os.path.join("data", "GameSettingsTemplate.ini"))
 
-class ScriptRunner(QThread):
-    finished = pyqtSignal()
-    output = pyqtSignal(str)
+class BackgroundJob(QRunnable):
+    # Runs a blocking function (file I/O, process launch) on the shared thread pool
+    def __init__(self, fn, *args):
+        super().__init__()
+        self.fn = fn
+        self.args = args
+        self.signals = JobSignals()
 
     def run(self):
-        process = subprocess.Popen([
-            "powershell", "-ExecutionPolicy", "Bypass", "-File", ps1_path,
-            "-steamCmdPath", steam_cmd_path,
-            "-installPath", install_path,
-            "-startBatContent", start_bat_content,
-            "-gameUserSettingsTemplate", game_user_settings_template
-        ],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            bufsize=1,
-            universal_newlines=True,
-            creationflags=subprocess.CREATE_NO_WINDOW
-        )
-
-        for line in iter(process.stdout.readline, ''):
-            if line:
-                self.output.emit(line.strip())
-
-        process.stdout.close()
-        process.wait()
-        self.finished.emit()
+        try:
+            result = self.fn(*self.args)
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+            return
+        self.signals.finished.emit(result)
 
 
-class ServerRunner(QThread):
+class RconRunner(QThread):
     finished = pyqtSignal()
-    output = pyqtSignal(str)
+
+    def __init__(self, log_buffer, port, password, command, host="127.0.0.1"):
+        super().__init__()
+        self.log_buffer = log_buffer
+        self.host = host
+        self.port = port
+        self.password = password
+        self.command = command
 
     def run(self):
-        process = subprocess.Popen(
-            os.path.join(install_path, "ShooterGame\\Binaries\\Win64\\start.bat"),
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            shell=True,
-            bufsize=1,
-            universal_newlines=True
-        )
+        try:
+            response = default_pool.command(self.host, self.port, self.password, self.command)
+            self.log_buffer.push(f"RCON> {self.command}")
+            for line in response.strip().splitlines():
+                self.log_buffer.push(line.strip())
+        except (OSError, RconError) as e:
+            self.log_buffer.push(f"RCON command '{self.command}' failed: {e}")
+        self.finished.emit()
 
-        for line in iter(process.stdout.readline, ''):
-            self.output.emit(line.strip())
 
-        process.stdout.close()
-        process.wait()
-        self.finished.emit()
+class MetricsChart(QWidget):
+    # Small CPU (green) and memory (blue) history chart for one server
+    def __init__(self):
+        super().__init__()
+        self.samples = []
+        self.setMinimumHeight(60)
+
+    def set_samples(self, samples):
+        self.samples = samples
+        self.update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), QColor(30, 30, 30))
+        if len(self.samples) < 2:
+            return
+
+        width = self.width()
+        height = self.height() - 2
+        step = width / (len(self.samples) - 1)
+        max_cpu = max(100.0, max(sample.cpu for sample in self.samples))
+        max_rss = max(1, max(sample.rss for sample in self.samples))
+
+        for color, values in (
+            (QColor(80, 200, 120), [sample.cpu / max_cpu for sample in self.samples]),
+            (QColor(90, 150, 230), [sample.rss / max_rss for sample in self.samples]),
+        ):
+            painter.setPen(QPen(color, 1.5))
+            for index in range(1, len(values)):
+                painter.drawLine(
+                    int((index - 1) * step), int(height - values[index - 1] * height + 1),
+                    int(index * step), int(height - values[index] * height + 1)
+                )
 
 
 class ArkManager(QMainWindow):
+    # Emitted on the daemon client's reader thread, handled on the GUI thread
+    daemonStatusReceived = pyqtSignal(str, object)
+    daemonLinesReceived = pyqtSignal(str, object)
+    daemonDisconnected = pyqtSignal(object)
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("ARK Server Manager")
         self.setMinimumSize(600, 400)
+        # Created first, anything set up below may report into the console (the metrics endpoint, ...)
+        self.logBuffer = LogBuffer()
 
         self.stacked_widget = QStackedWidget()
 
         self.server_widget = QWidget()
         self.settings_widget = QWidget()
 
+        self.profileStore = ProfileStore()
+        self.profileLayout = QHBoxLayout()
+        self.profileSelector = QComboBox()
+        self.profileSelector.setEditable(True)
+        self.profileSelector.setToolTip("Pick a saved server profile, or type a new name to save the inputs as a new profile")
+        self.profileSelector.activated.connect(self.select_profile)
+        self.profileDeleteButton = QPushButton("Delete Profile")
+        self.profileDeleteButton.clicked.connect(self.delete_profile)
+        self.profileLayout.addWidget(self.profileSelector, 1)
+        self.profileLayout.addWidget(self.profileDeleteButton)
+
         self.steamCmdLayout = QHBoxLayout()
         self.steamCmdInput = QLineEdit()
         self.steamCmdOpenDirectoryButton = QPushButton("Open Folder")
@@ -100,28 +191,131 @@ class ArkManager(QMainWindow):
         self.arkInstallInput = QLineEdit()
         self.arkInstallOpenDirectoryButton = QPushButton("Open Folder")
         self.arkInstallOpenDirectoryButton.clicked.connect(lambda: self.open_directory(steam_cmd=False))
+        self.arkInstallInput.editingFinished.connect(self.refresh_backups)
         self.arkInstallLayout.addWidget(self.arkInstallInput)
         self.arkInstallLayout.addWidget(self.arkInstallOpenDirectoryButton)
 
+        self.sharedInstallInput = QLineEdit()
+        self.sharedInstallInput.setPlaceholderText("Optional, e.g. C:\\ARKShared. Servers using the same path share one copy of the game files")
+
         self.serverNameInput = QLineEdit()
         self.serverAdminPasswordInput = QLineEdit()
         self.serverPasswordInput = QLineEdit()
         self.serverPortInput = QLineEdit()
         self.serverQueryPortInput = QLineEdit()
         self.serverMaxPlayersInput = QLineEdit()
+        self.serverRconPortInput = QLineEdit()
         self.serverLaunchOptionsInput = QLineEdit()
 
         self.runButton = QPushButton("Install/Update ARK Server")
         self.runButton.clicked.connect(self.run_script)
 
+        self.verifyFilesButton = QPushButton("Verify Server Files")
+        self.verifyFilesButton.clicked.connect(self.verify_files)
+
+        self.serverControlLayout = QHBoxLayout()
         self.startServerButton = QPushButton("Start Server")
         self.startServerButton.clicked.connect(self.start_server)
+        self.stopServerButton = QPushButton("Stop Server")
+        self.stopServerButton.clicked.connect(self.stop_server)
+        self.stopServerButton.setEnabled(False)
+        self.serverControlLayout.addWidget(self.startServerButton)
+        self.serverControlLayout.addWidget(self.stopServerButton)
+        self.serverStatusLabel = QLabel("No servers running.")
+        self.autoRestartCheckBox = QCheckBox("Restart the server automatically if it crashes or hangs")
+        self.stagedUpdateCheckBox = QCheckBox("Stage updates in a second copy of the game files while the server runs")
+        self.backgroundServersCheckBox = QCheckBox("Keep the server running in the background after this window closes")
+
+        self.switchBuildLayout = QHBoxLayout()
+        self.switchBuildButton = QPushButton("Restart Into Staged Update")
+        self.switchBuildButton.clicked.connect(lambda: self.switch_build())
+        self.rollbackBuildButton = QPushButton("Roll Back Update")
+        self.rollbackBuildButton.clicked.connect(lambda: self.switch_build(rollback=True))
+        self.switchBuildLayout.addWidget(self.switchBuildButton)
+        self.switchBuildLayout.addWidget(self.rollbackBuildButton)
 
         self.serverSettingsPageButton = QPushButton("Open Settings Files")
         self.serverSettingsPageButton.clicked.connect(self.open_server_settings_page)
 
-        self.textEditor = QTextEdit()
+        self.rconLayout = QHBoxLayout()
+        self.rconCommandInput = QLineEdit()
+        self.rconCommandInput.setPlaceholderText("RCON command, e.g. SaveWorld")
+        self.rconCommandInput.returnPressed.connect(self.send_rcon_command)
+        self.rconSendButton = QPushButton("Send RCON")
+        self.rconSendButton.clicked.connect(self.send_rcon_command)
+        self.rconLayout.addWidget(self.rconCommandInput)
+        self.rconLayout.addWidget(self.rconSendButton)
+        self.rconWorker = None
+        self.rconCommand = None
+
+        self.metricsChart = MetricsChart()
+        self.metricsLabel = QLabel("")
+        self.metrics = MetricsSampler()
+        self.metricsServer = None
+        if self.metrics.start():
+            try:
+                self.metricsServer = MetricsServer(self.metrics, default_metrics_port)
+                self.metricsServer.start()
+            except OSError as e:
+                self.metricsServer = None
+                self.logBuffer.push(f"Metrics endpoint unavailable: {e}")
+        else:
+            self.metricsLabel.setText("Install psutil to see server CPU/memory metrics.")
+        self.metricsTimer = QTimer(self)
+        self.metricsTimer.setInterval(int(self.metrics.interval * 1000))
+        self.metricsTimer.timeout.connect(self.refresh_metrics)
+        self.metricsTimer.start()
+
+        self.maintenanceLayout = QHBoxLayout()
+        self.maintenanceScheduleInput = QLineEdit()
+        self.maintenanceScheduleInput.setPlaceholderText("Daily restart + update (cron), e.g. 0 4 * * *")
+        self.maintenanceApplyButton = QPushButton("Apply Schedule")
+        self.maintenanceApplyButton.clicked.connect(self.apply_maintenance_schedule)
+        self.maintenanceLayout.addWidget(self.maintenanceScheduleInput)
+        self.maintenanceLayout.addWidget(self.maintenanceApplyButton)
+        self.scheduler = None
+
+        self.backupLayout = QHBoxLayout()
+        self.backupScheduleInput = QLineEdit()
+        self.backupScheduleInput.setPlaceholderText("Backup schedule (cron), e.g. */30 * * * *")
+        self.backupNowButton = QPushButton("Back Up Now")
+        self.backupNowButton.clicked.connect(lambda: self.run_backup())
+        self.backupLayout.addWidget(self.backupScheduleInput)
+        self.backupLayout.addWidget(self.backupNowButton)
+
+        self.restoreLayout = QHBoxLayout()
+        self.backupSelector = QComboBox()
+        self.restoreBackupButton = QPushButton("Restore Backup")
+        self.restoreBackupButton.clicked.connect(self.restore_backup)
+        self.restoreLayout.addWidget(self.backupSelector, 1)
+        self.restoreLayout.addWidget(self.restoreBackupButton)
+
+        self.logSearchLayout = QHBoxLayout()
+        self.logSearchInput = QLineEdit()
+        self.logSearchInput.setPlaceholderText("Search archived server logs (regex)")
+        self.logSearchInput.returnPressed.connect(self.search_logs)
+        self.logSearchButton = QPushButton("Search Logs")
+        self.logSearchButton.clicked.connect(self.search_logs)
+        self.logSearchLayout.addWidget(self.logSearchInput)
+        self.logSearchLayout.addWidget(self.logSearchButton)
+
+        self.textEditor = QPlainTextEdit()
         self.textEditor.setReadOnly(True)
+        self.textEditor.setMaximumBlockCount(console_max_lines)
+        self.consoleStatsLabel = QLabel("")
+        self.installProgressBar = QProgressBar()
+        self.installProgressBar.setRange(0, 1000)
+        self.installProgressBar.setTextVisible(True)
+        self.installProgressBar.hide()
+        self.installProgressTimer = QTimer(self)
+        self.installProgressTimer.setInterval(progress_refresh_interval_ms)
+        self.installProgressTimer.timeout.connect(self.refresh_install_progress)
+
+        # Runner output is buffered and flushed to the console in batches
+        self.logFlushTimer = QTimer(self)
+        self.logFlushTimer.setInterval(console_flush_interval_ms)
+        self.logFlushTimer.timeout.connect(self.flush_output)
+        self.logFlushTimer.start()
 
         self.setup_server_run_widget()
 
@@ -136,8 +330,8 @@ class ArkManager(QMainWindow):
         self.settingsFileControlPanelLayout.addWidget(self.gameUserSettingsButton)
         self.settingsFileControlPanelLayout.addWidget(self.gameSettingsButton)
 
-        self.settingsTextEditor = QTextEdit()
-        self.userSettingsTextEditor = QTextEdit()
+        self.settingsTextEditor = SettingsEditor(self.run_job)
+        self.userSettingsTextEditor = SettingsEditor(self.run_job)
         self.settingsPageTextEditors = QStackedWidget()
         self.settingsPageTextEditors.addWidget(self.userSettingsTextEditor)
         self.settingsPageTextEditors.addWidget(self.settingsTextEditor)
@@ -153,12 +347,37 @@ class ArkManager(QMainWindow):
 
         self.setCentralWidget(self.stacked_widget)
 
+        # Installs/updates run one at a time, servers run side by side under the supervisor
         self.worker = None
+        self.worker_install_path = None
+        self.supervisor = ServerSupervisor()
+        self.shownServerRunning = False
+        self.watchdog = Watchdog(log=self.logBuffer.push)
+        self.watchdog.start()
+        # Servers started in the background belong to the manager daemon, the window follows their output
+        self.daemon = None
+        self.daemonStatus = {}
+        self.daemonLogs = {}
+        # Servers the daemon ran when the connection dropped. Until it answers again they may or may not
+        # be running, so they count as running: starting one here could run a second copy.
+        self.daemonUnknown = set()
+        self.daemonReconnectDelay = daemon_reconnect_initial_ms
+        self.daemonReconnectTimer = QTimer(self)
+        self.daemonReconnectTimer.setSingleShot(True)
+        self.daemonReconnectTimer.timeout.connect(self.reconnect_daemon)
+        self.daemonStatusReceived.connect(self.daemon_status)
+        self.daemonLinesReceived.connect(self.daemon_lines)
+        self.daemonDisconnected.connect(self.daemon_lost)
+
+        # Shared pool for blocking file I/O so network drives don't freeze the window
+        self.threadPool = QThreadPool.globalInstance()
+        self.jobs = set()
 
         # Set validators for the input fields
         dir_path_validator = QRegExpValidator(QRegExp(r"^[A-Za-z]:[\\/](?:[A-Za-z0-9 _\-\\/]*)$"))
         self.steamCmdInput.setValidator(dir_path_validator)
         self.arkInstallInput.setValidator(dir_path_validator)
+        self.sharedInstallInput.setValidator(dir_path_validator)
 
         server_name_validator = QRegExpValidator(QRegExp("[A-Za-z0-9_-]+"))
         self.serverNameInput.setValidator(server_name_validator)
@@ -169,67 +388,696 @@ class ArkManager(QMainWindow):
         server_port_validator = QIntValidator(1024, 49151)
         self.serverPortInput.setValidator(server_port_validator)
         self.serverQueryPortInput.setValidator(server_port_validator)
+        self.serverRconPortInput.setValidator(server_port_validator)
 
         server_max_players_validator = QIntValidator(1, 70)
         self.serverMaxPlayersInput.setValidator(server_max_players_validator)
 
         # Load user prefs if exists
         self.__load_user_prefs()
+        self.attach_daemon()
 
     def run_script(self):
-        if not self.worker:
-            if self.__check_valid_path_inputs() and self.__check_valid_start_bat_inputs():
-                self.runButton.setText("Running Script...")
-                self.runButton.setEnabled(False)
-                # Save the inputs into user preferences to load later
-                self.__save_user_prefs()
-
-                global steam_cmd_path, install_path
-                steam_cmd_path = self.steamCmdInput.text().strip()
-                install_path = self.arkInstallInput.text().strip()
-
-                self.create_start_bat_content()
-                self.create_game_user_settings_template()
-
-                self.worker = ScriptRunner()
-                self.worker.output.connect(self.append_output)
-                self.worker.finished.connect(self.script_done)
-                self.worker.start()
-            else:
-                self.append_output("Server Install Failed.")
-        else:
+        if self.worker:
+            self.append_output("Wait for the current install/update to finish!")
+            return
+
+        install_path = self.arkInstallInput.text().strip()
+        staged = self.stagedUpdateCheckBox.isChecked()
+        if self.is_server_running(install_path) and not staged:
             self.append_output("Cannot install/update server while it is running!")
+            return
+
+        if self.__check_valid_path_inputs() and self.__check_valid_start_bat_inputs():
+            self.runButton.setText("Running Script...")
+            self.runButton.setEnabled(False)
+            # Save the inputs into user preferences to load later
+            self.__save_user_prefs()
+
+            self.worker_install_path = install_path
+            self.worker = ScriptRunner(
+                self.logBuffer,
+                self.steamCmdInput.text().strip(),
+                install_path,
+                self.create_start_bat_content(install_path),
+                self.create_game_user_settings_template(),
+                shared_path=self.sharedInstallInput.text().strip() or None,
+                busy_instances=self.running_install_paths(),
+                staged=staged
+            )
+            self.worker.finished.connect(self.script_done)
+            self.worker.start()
+            self.installProgressBar.setValue(0)
+            self.installProgressBar.setFormat("Waiting for SteamCMD...")
+            self.installProgressBar.show()
+            self.installProgressTimer.start()
+        else:
+            self.append_output("Server Install Failed.")
+
+    def refresh_install_progress(self):
+        if not self.worker:
+            return
+        snapshot = self.worker.progress.snapshot()
+        self.installProgressBar.setValue(int(snapshot["percent"] * 10))
+        # "%" is a placeholder character in QProgressBar formats
+        self.installProgressBar.setFormat(self.worker.progress.describe(snapshot).replace("%", "%%"))
 
     def script_done(self):
+        self.installProgressTimer.stop()
+        self.installProgressBar.hide()
         self.runButton.setText("Install/Update ARK Server")
         self.runButton.setEnabled(True)
+        staged_install_path = self.worker_install_path if self.worker.staged else None
         self.worker = None
+        self.worker_install_path = None
+
+        # A stopped server switches to the staged build right away, a running one when the user restarts it
+        if staged_install_path and staged_info(staged_install_path):
+            if self.is_server_running(staged_install_path):
+                self.append_output("Press Restart Into Staged Update to switch, the server is only down for the restart.")
+            else:
+                self.switch_build(install_path=staged_install_path)
+
+    def switch_build(self, rollback=False, install_path=None):
+        install_path = install_path or self.arkInstallInput.text().strip()
+        if self.worker and self.worker_install_path == install_path:
+            self.append_output("Wait for the current install/update to finish!")
+            return
+        if not rollback and not staged_info(install_path):
+            self.append_output("No staged update is ready, tick the staged updates box and press Install/Update first.")
+            return
+
+        instance = self.supervisor.get(install_path)
+        stop_server = start_server = None
+        if self.owned_by_daemon(install_path) and self.is_server_running(install_path):
+            start_args = self.daemon_start_args(install_path)
+            stop_server = lambda: self.daemon.request("stop", server=install_path)
+            start_server = lambda: self.daemon.request("start", **start_args)
+        elif instance and instance.is_running():
+            rcon_port = self.serverRconPortInput.text().strip()
+            admin_password = self.serverAdminPasswordInput.text().strip()
+
+            def send_command(command):
+                default_pool.command("127.0.0.1", rcon_port, admin_password, command)
+
+            def stop_server():
+                self.logBuffer.push(f"Stopping server at {install_path} to switch builds...")
+                if rcon_port and admin_password:
+                    try:
+                        send_command("SaveWorld")
+                    except (OSError, RconError) as e:
+                        self.logBuffer.push(f"SaveWorld failed: {e}")
+                graceful_stop(instance, send_command)
+
+            start_server = instance.start
+
+        def failed(error):
+            self.append_output(f"Switching builds failed: {error}")
+
+        self.run_job(
+            switch_builds,
+            install_path,
+            stop_server,
+            start_server,
+            rollback,
+            on_done=self.append_output,
+            on_error=failed,
+            busy_widgets=(self.switchBuildButton, self.rollbackBuildButton, self.runButton, self.startServerButton)
+        )
+
+    def verify_files(self):
+        install_path = self.arkInstallInput.text().strip()
+        if self.worker and self.worker_install_path == install_path:
+            self.append_output("Cannot verify server files while installing/updating!")
+            return
+
+        if self.__check_valid_path_inputs(check_steam_cmd=False):
+            if not os.path.isdir(install_path):
+                self.append_output("Path does not exist, so cannot verify it.")
+                return
+
+            self.append_output(f"Verifying server files at {install_path}...")
+            self.verifyFilesButton.setText("Verifying Files...")
+
+            def verified(result):
+                self.verifyFilesButton.setText("Verify Server Files")
+                for line in result.summary_lines():
+                    self.append_output(line)
+
+            def failed(error):
+                self.verifyFilesButton.setText("Verify Server Files")
+                self.append_output(f"File verification failed: {error}")
+
+            self.run_job(verify, install_path, on_done=verified, on_error=failed, busy_widgets=(self.verifyFilesButton,))
 
     def start_server(self):
-        if not self.worker:
-            global install_path
-            install_path = self.arkInstallInput.text().strip()
-
-            if self.__check_valid_path_inputs(check_steam_cmd=False):
-                bat_path = os.path.join(install_path, "ShooterGame\\Binaries\\Win64\\start.bat")
-                if os.path.isfile(bat_path):
-                    self.startServerButton.setText("Running Server...")
-                    self.startServerButton.setEnabled(False)
-
-                    self.worker = ServerRunner()
-                    self.worker.output.connect(self.append_output)
-                    self.worker.finished.connect(self.server_done)
-                    self.worker.start()
-                else:
-                    self.append_output("Server start.bat file not found at " + bat_path + "!\nInstall/Update server first.")
+        install_path = self.arkInstallInput.text().strip()
+
+        if self.worker and self.worker_install_path == install_path:
+            self.append_output("Cannot run server while installing/updating!")
+            return
+
+        if install_path in self.daemonUnknown:
+            self.append_output("This server runs under the background manager, which isn't answering. It can't be started until it reconnects.")
+            return
+
+        if self.is_server_running(install_path):
+            self.append_output("This server is already running!")
+            return
+
+        if self.__check_valid_path_inputs(check_steam_cmd=False):
+            bat_path = start_bat_path(install_path)
+            if os.path.isfile(bat_path) and (self.backgroundServersCheckBox.isChecked() or self.owned_by_daemon(install_path)):
+                self.start_in_daemon(install_path)
+            elif os.path.isfile(bat_path):
+                instance = self.get_server_instance(install_path, {
+                    "port": self.serverPortInput.text().strip(),
+                    "query_port": self.serverQueryPortInput.text().strip(),
+                    "rcon_port": self.serverRconPortInput.text().strip(),
+                })
+                self.watch_server(instance)
+                try:
+                    instance.start()
+                except OSError as e:
+                    self.watchdog.unwatch(install_path)
+                    self.append_output(f"Server Start Failed: {e}")
+                    return
+                self.refresh_server_controls()
             else:
-                self.append_output("Server Start Failed.")
+                self.append_output("Server start.bat file not found at " + bat_path + "!\nInstall/Update server first.")
         else:
-            self.append_output("Cannot run server while installing/updating!")
+            self.append_output("Server Start Failed.")
+
+    def get_server_instance(self, install_path, ports):
+        # Instances (and their log archives) are reused across restarts of the same install
+        instance = self.supervisor.get(install_path)
+        if instance is None:
+            instance = self.supervisor.add(
+                install_path,
+                install_path,
+                ports=ports,
+                label=os.path.basename(os.path.normpath(install_path)) or install_path
+            )
+            instance.on_start.append(lambda started: self.metrics.track(started.name, started.process.pid, started.started_at))
+            instance.on_exit.append(lambda exited: self.metrics.untrack(exited.name))
+            instance.events.subscribe(self.metrics.ready_subscriber(install_path), (server_ready,))
+            instance.events.subscribe(self.notify_scheduler, (server_crashed,))
+
+            # Everything the server prints is also kept in a rotating archive on disk
+            try:
+                archive = LogArchive(archive_dir(install_path))
+                instance.listeners.append(archive.append)
+                instance.on_exit.append(lambda _: archive.close())
+            except OSError as e:
+                self.append_output(f"Server log archive unavailable: {e}")
+        else:
+            instance.ports = ports
+        return instance
+
+    def watch_server(self, instance):
+        if not self.autoRestartCheckBox.isChecked():
+            self.watchdog.unwatch(instance.name)
+            return
+
+        probe = None
+        rcon_port = self.serverRconPortInput.text().strip()
+        admin_password = self.serverAdminPasswordInput.text().strip()
+        if rcon_port and admin_password:
+            # A hung server usually still has its process, but stops answering RCON
+            probe = lambda: default_pool.command("127.0.0.1", rcon_port, admin_password, "ListPlayers")
+        self.watchdog.watch(instance, probe=probe, state_path=watchdog_state_path(instance.install_path))
+
+    def notify_scheduler(self, event):
+        # Runs on the server's output thread, the scheduler hands the work to its own loop
+        scheduler = self.scheduler
+        if scheduler:
+            scheduler.notify(event)
+
+    def refresh_metrics(self):
+        if not self.metrics.available():
+            return
+
+        server = self.metrics.get(self.arkInstallInput.text().strip())
+        if server is None:
+            self.metricsChart.set_samples([])
+            self.metricsLabel.setText("")
+            return
+
+        samples = list(server.samples)
+        self.metricsChart.set_samples(samples)
+        text = f"Uptime {int(time.time() - server.started_at) // 60} min"
+        if samples:
+            sample = samples[-1]
+            text = f"CPU {sample.cpu:.0f}%    Memory {sample.rss / 1024 ** 3:.2f} GB    Threads {sample.threads}    " + text
+        if server.time_to_ready() is not None:
+            text += f"    Ready after {server.time_to_ready():.0f}s"
+        self.metricsLabel.setText(text)
+
+    def stop_server(self):
+        install_path = self.arkInstallInput.text().strip()
+        if install_path in self.daemonUnknown:
+            self.append_output("Not connected to the background manager running this server, reconnecting...")
+            return
+        if self.owned_by_daemon(install_path):
+            self.append_output(f"Stopping background server at {install_path}...")
+            self.run_job(
+                lambda: self.daemon.request("stop", server=install_path),
+                on_done=lambda status: self.daemon_status(install_path, status),
+                on_error=lambda error: self.append_output(f"Could not stop the background server: {error}"),
+                busy_widgets=(self.stopServerButton,)
+            )
+            return
+        # Also cancels a pending automatic restart
+        self.watchdog.unwatch(install_path)
+        if self.supervisor.is_running(install_path):
+            self.append_output(f"Stopping server at {install_path}...")
+            self.supervisor.stop(install_path)
+        self.refresh_server_controls()
+
+    def attach_daemon(self):
+        # Picks up the servers a background manager kept running, with the output they printed meanwhile
+        def attach():
+            client = connect_daemon()
+            servers = client.request("status")["servers"]
+            return client, servers
+
+        def attached(result):
+            self.daemon_attached(*result)
+            if self.daemonStatus:
+                self.append_output(f"Reattached to {len(self.daemonStatus)} background server(s).")
+
+        # No daemon running is the normal case, nothing to report
+        self.run_job(attach, on_done=attached, on_error=lambda error: None)
+
+    def daemon_attached(self, client, servers):
+        if self.daemon and self.daemon is not client:
+            self.daemon.close()
+        self.daemon = client
+        client.on_status = self.daemonStatusReceived.emit
+        client.on_disconnect = lambda: self.daemonDisconnected.emit(client)
+        for status in servers:
+            self.daemonStatus[status["name"]] = status
+        self.run_job(self.follow_daemon_servers, [status["name"] for status in servers])
+
+    def follow_daemon_servers(self, names):
+        # Everything the daemon still has is replayed, later lines arrive as they are printed
+        for name in names:
+            if name not in self.daemon.follows:
+                self.daemon.follow(name, self.daemonLinesReceived.emit, since=0)
+
+    def daemon_lines(self, server, lines):
+        # Drained by flush_output like the other buffers
+        log_buffer = self.daemonLogs.setdefault(server, LogBuffer())
+        for line in lines:
+            log_buffer.push(line)
+
+    def daemon_status(self, server, status):
+        self.daemonStatus[server] = status
+        self.refresh_server_controls()
+
+    def daemon_lost(self, client):
+        # A client replaced by a newer one is closed on purpose
+        if client is not self.daemon:
+            return
+        owned = set(self.daemonStatus)
+        self.daemonStatus = {}
+        self.daemonUnknown |= owned
+        if owned:
+            self.append_output(
+                "Lost the connection to the background manager, reconnecting. Its servers may still be running, "
+                "they can't be started from here until it answers."
+            )
+        if self.daemonUnknown:
+            self.schedule_daemon_reconnect()
+            self.refresh_server_controls()
+
+    def schedule_daemon_reconnect(self):
+        if not self.daemonReconnectTimer.isActive():
+            self.daemonReconnectTimer.start(self.daemonReconnectDelay)
+
+    def reconnect_daemon(self):
+        # The same client connects again, so every followed log resumes after the last line it received
+        client = self.daemon
+        if client is None or client.connected:
+            return
+
+        def reconnect():
+            # The daemon only removes its state file when it shuts down cleanly, after stopping its servers.
+            # One that crashed leaves it behind, and its servers may still be running.
+            if load_daemon_state(client.state_path) is None:
+                return None
+            client.connect()
+            return client, client.request("status")["servers"]
+
+        def reconnected(result):
+            self.daemonReconnectDelay = daemon_reconnect_initial_ms
+            if result is None:
+                self.append_output("The background manager has shut down and stopped its servers.")
+            else:
+                self.daemon_attached(*result)
+                self.append_output(f"Reconnected to the background manager, {len(self.daemonStatus)} background server(s).")
+            # Servers the daemon doesn't report aren't running under it
+            self.daemonUnknown = set()
+            self.refresh_server_controls()
+
+        def failed(error):
+            self.daemonReconnectDelay = min(self.daemonReconnectDelay * 2, daemon_reconnect_max_ms)
+            self.schedule_daemon_reconnect()
+
+        self.run_job(reconnect, on_done=reconnected, on_error=failed)
+
+    def owned_by_daemon(self, install_path):
+        return install_path in self.daemonStatus
+
+    def is_server_running(self, install_path):
+        if self.supervisor.is_running(install_path) or install_path in self.daemonUnknown:
+            return True
+        return self.daemonStatus.get(install_path, {}).get("state") == "running"
+
+    def daemon_start_args(self, install_path):
+        rcon_port = self.serverRconPortInput.text().strip()
+        return {
+            "server": install_path,
+            "install_path": install_path,
+            "ports": {
+                "port": self.serverPortInput.text().strip(),
+                "query_port": self.serverQueryPortInput.text().strip(),
+                "rcon_port": rcon_port,
+            },
+            "label": os.path.basename(os.path.normpath(install_path)) or install_path,
+            "auto_restart": self.autoRestartCheckBox.isChecked(),
+            "rcon_port": rcon_port or None,
+            "rcon_password": self.serverAdminPasswordInput.text().strip() or None,
+        }
+
+    def start_in_daemon(self, install_path):
+        # The daemon is started on first use and keeps running, with its servers, after the window closes
+        start_args = self.daemon_start_args(install_path)
+        client = self.daemon if self.daemon and self.daemon.connected else None
+
+        def start():
+            daemon = client or connect_daemon(spawn=True)
+            status = daemon.request("start", **start_args)
+            return daemon, status
+
+        def started(result):
+            daemon, status = result
+            self.daemon_attached(daemon, [status])
+            self.refresh_server_controls()
+
+        self.append_output(f"Starting server at {install_path} in the background...")
+        self.run_job(
+            start, on_done=started,
+            on_error=lambda error: self.append_output(f"Server Start Failed: {error}"),
+            busy_widgets=(self.startServerButton,)
+        )
 
     def server_done(self):
-        self.startServerButton.setText("Run ARK Server")
+        self.startServerButton.setText("Start Server")
         self.startServerButton.setEnabled(True)
+        self.stopServerButton.setEnabled(False)
+
+    def running_install_paths(self):
+        paths = [instance.install_path for instance in self.supervisor.running()] + list(self.daemonUnknown)
+        return paths + [name for name, status in self.daemonStatus.items() if status.get("state") == "running"]
+
+    def refresh_server_controls(self):
+        install_path = self.arkInstallInput.text().strip()
+        running = self.is_server_running(install_path)
+        if running:
+            self.startServerButton.setText("Running Server...")
+            self.startServerButton.setEnabled(False)
+            self.stopServerButton.setEnabled(True)
+        elif self.shownServerRunning:
+            self.server_done()
+        self.shownServerRunning = running
+
+        running_count = len(self.running_install_paths())
+        status = f"Servers running: {running_count}" if running_count else "No servers running."
+        instance = self.supervisor.get(install_path)
+        daemon_status = self.daemonStatus.get(install_path)
+        if install_path in self.daemonUnknown:
+            status += "    This server (background): not connected to the background manager, reconnecting"
+        elif running and daemon_status:
+            players = len(daemon_status.get("players", []))
+            status += "    This server (background): " + ("ready" if daemon_status.get("ready") else "starting")
+            status += f", {players} player{'s' if players != 1 else ''} online"
+        elif running and instance:
+            status += "    This server: " + ("ready" if instance.ready_at else "starting")
+            status += f", {len(instance.players)} player{'s' if len(instance.players) != 1 else ''} online"
+        if daemon_status:
+            watchdog_status = daemon_status.get("watchdog")
+        else:
+            watchdog_status = self.watchdog.status(install_path)
+        if watchdog_status and watchdog_status["state"] == "waiting":
+            status += f"    Restarting in {watchdog_status['restart_in']:.0f}s ({watchdog_status['reason']})"
+        elif watchdog_status and watchdog_status["state"] == "crash-loop":
+            status += "    Keeps crashing, automatic restarts paused"
+        self.serverStatusLabel.setText(status)
+
+    def send_rcon_command(self):
+        command = self.rconCommandInput.text().strip()
+        if not command:
+            return
+
+        if self.rconWorker:
+            self.append_output("Wait for the previous RCON command to finish!")
+            return
+
+        if not self.serverRconPortInput.text().strip() or not self.serverAdminPasswordInput.text().strip():
+            self.append_output("Include the RCON port and admin password to send RCON commands!")
+            return
+
+        self.rconSendButton.setEnabled(False)
+        self.rconWorker = RconRunner(
+            self.logBuffer, self.serverRconPortInput.text().strip(), self.serverAdminPasswordInput.text().strip(), command
+        )
+        self.rconWorker.finished.connect(self.rcon_done)
+        self.rconWorker.start()
+        self.rconCommand = command
+        self.rconCommandInput.clear()
+
+    def apply_maintenance_schedule(self):
+        install_path = self.arkInstallInput.text().strip()
+        schedule = self.maintenanceScheduleInput.text().strip()
+        backup_schedule = self.backupScheduleInput.text().strip()
+        if not self.__check_valid_path_inputs():
+            return
+
+        # New jobs for this server only, every apply builds them from the current inputs
+        jobs = []
+        if schedule or backup_schedule:
+            if not self.serverRconPortInput.text().strip() or not self.serverAdminPasswordInput.text().strip():
+                self.append_output("Scheduled restarts and backups need the RCON port and admin password to save the world first!")
+                return
+
+            steam_cmd_path = self.steamCmdInput.text().strip()
+            rcon_port = self.serverRconPortInput.text().strip()
+            admin_password = self.serverAdminPasswordInput.text().strip()
+            ports = {
+                "port": self.serverPortInput.text().strip(),
+                "query_port": self.serverQueryPortInput.text().strip(),
+                "rcon_port": rcon_port,
+            }
+            start_bat_content = self.create_start_bat_content(install_path)
+            game_user_settings_template = self.create_game_user_settings_template()
+            shared_path = self.sharedInstallInput.text().strip() or None
+            staged = self.stagedUpdateCheckBox.isChecked() and not shared_path
+            instance = self.get_server_instance(install_path, ports)
+
+            def send_command(command):
+                if instance.is_running():
+                    default_pool.command("127.0.0.1", rcon_port, admin_password, command)
+
+            def back_up(label):
+                _, lines = backup_server(install_path, label=label)
+                for line in lines:
+                    self.logBuffer.push(line)
+
+            def stage_server_update():
+                stage_update(self.logBuffer, steam_cmd_path, install_path)
+
+            # Only bring the server back up if it was running when the restart began
+            restart = {"was_running": False, "stopped_at": None, "switch": None}
+
+            def update_server():
+                # A build staged ahead of the restart only needs to be switched to, otherwise update in place
+                if staged and staged_info(install_path):
+                    restart["switch"] = swap_in(install_path)
+                    return
+                run_setup_script(
+                    self.logBuffer, steam_cmd_path, install_path, start_bat_content, game_user_settings_template,
+                    shared_path=shared_path, busy_instances=self.running_install_paths()
+                )
+
+            def stop_server():
+                restart.update(was_running=instance.is_running(), stopped_at=time.time(), switch=None)
+                graceful_stop(instance, send_command)
+
+            def start_server():
+                if restart["was_running"] and not instance.is_running():
+                    instance.start()
+                if restart["switch"]:
+                    self.logBuffer.push(finish_switch(install_path, restart["switch"], restart["stopped_at"]))
+
+            try:
+                if schedule:
+                    jobs.extend(restart_chain(
+                        install_path,
+                        schedule,
+                        send_command,
+                        stop_server,
+                        update_server,
+                        start_server,
+                        log=self.logBuffer.push,
+                        backup=lambda: back_up("before scheduled update"),
+                        prepare=stage_server_update if staged else None
+                    ))
+                if backup_schedule:
+                    jobs.extend(backup_chain(
+                        install_path, backup_schedule, send_command, lambda: back_up("scheduled")
+                    ))
+                    # Keep the last save from before a crash, in case the restart overwrites it
+                    jobs.append(Job(
+                        install_path + ":crash-backup", lambda: asyncio.to_thread(back_up, "after crash"),
+                        event=server_crashed, source=install_path
+                    ))
+            except CronError as e:
+                self.append_output(str(e))
+                return
+
+        if self.scheduler is None:
+            self.scheduler = MaintenanceScheduler(state_path=scheduler_state_path, log=self.logBuffer.push)
+            self.scheduler.start_in_thread()
+        # Swapped on the running scheduler, the other servers' jobs and restarts under way carry on
+        self.scheduler.remove_jobs(install_path + ":")
+        self.scheduler.add_jobs(jobs)
+        if jobs:
+            self.append_output(f"Maintenance schedule '{schedule}' applied." if schedule else "Maintenance schedule cleared.")
+            if backup_schedule:
+                self.append_output(f"Backup schedule '{backup_schedule}' applied.")
+        else:
+            self.append_output("No maintenance scheduled.")
+        self.__save_user_prefs()
+
+    def search_logs(self):
+        pattern = self.logSearchInput.text().strip()
+        install_path = self.arkInstallInput.text().strip()
+        if not pattern or not self.__check_valid_path_inputs(check_steam_cmd=False):
+            return
+
+        def search():
+            reader = LogArchiveReader(archive_dir(install_path))
+            return list(reader.search(pattern, limit=log_search_limit))
+
+        def found(matches):
+            self.append_output(f"Found {len(matches)} archived log lines matching '{pattern}':")
+            for timestamp, line in matches:
+                self.append_output(f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(timestamp))} {line}")
+
+        self.run_job(
+            search,
+            on_done=found,
+            on_error=lambda e: self.append_output(f"Log search failed: {e}"),
+            busy_widgets=(self.logSearchButton,)
+        )
+
+    def rcon_done(self):
+        self.rconSendButton.setEnabled(True)
+        self.rconWorker = None
+        # A manual save is a good moment for a snapshot too
+        if self.rconCommand and self.rconCommand.lower() == "saveworld":
+            self.run_backup("after SaveWorld")
+        self.rconCommand = None
+
+    def run_backup(self, label=None):
+        install_path = self.arkInstallInput.text().strip()
+        if not self.__check_valid_path_inputs(check_steam_cmd=False):
+            return
+
+        def backed_up(result):
+            for line in result[1]:
+                self.append_output(line)
+            self.refresh_backups()
+
+        self.append_output(f"Backing up {install_path}...")
+        self.run_job(
+            backup_server, install_path, label,
+            on_done=backed_up,
+            on_error=lambda e: self.append_output(f"Backup failed: {e}"),
+            busy_widgets=(self.backupNowButton, self.restoreBackupButton)
+        )
+
+    def refresh_backups(self):
+        install_path = self.arkInstallInput.text().strip()
+        if not install_path:
+            self.backupSelector.clear()
+            return
+
+        def list_backups():
+            store = BackupStore(backup_dir(install_path))
+            return [(snapshot_id, store.describe(snapshot_id)) for snapshot_id in reversed(store.snapshots())]
+
+        def listed(backups):
+            self.backupSelector.clear()
+            for snapshot_id, text in backups:
+                self.backupSelector.addItem(text, snapshot_id)
+
+        self.run_job(list_backups, on_done=listed, on_error=lambda e: self.append_output(f"Cannot list backups: {e}"))
+
+    def restore_backup(self):
+        install_path = self.arkInstallInput.text().strip()
+        snapshot_id = self.backupSelector.currentData()
+        if not snapshot_id or not self.__check_valid_path_inputs(check_steam_cmd=False):
+            return
+
+        if self.is_server_running(install_path):
+            self.append_output("Stop the server before restoring a backup!")
+            return
+
+        def restored(stats):
+            self.append_output(
+                f"Restored backup {snapshot_id}: {stats['restored_files']} files written, {stats['removed_files']} removed "
+                f"in {stats['seconds']:.1f}s. The previous state was backed up first."
+            )
+            self.refresh_backups()
+
+        self.append_output(f"Restoring backup {snapshot_id}...")
+        self.run_job(
+            BackupStore(backup_dir(install_path)).restore, snapshot_id,
+            on_done=restored,
+            on_error=lambda e: self.append_output(f"Restore failed: {e}"),
+            busy_widgets=(self.backupNowButton, self.restoreBackupButton, self.startServerButton)
+        )
+
+    def run_job(self, fn, *args, on_done=None, on_error=None, busy_widgets=()):
+        for widget in busy_widgets:
+            widget.setEnabled(False)
+
+        job = BackgroundJob(fn, *args)
+        self.jobs.add(job)
+
+        def finish():
+            self.jobs.discard(job)
+            for busy_widget in busy_widgets:
+                busy_widget.setEnabled(True)
+
+        def done(result):
+            finish()
+            if on_done:
+                on_done(result)
+
+        def failed(error):
+            finish()
+            if on_error:
+                on_error(error)
+            else:
+                self.append_output(error)
+
+        job.signals.finished.connect(done)
+        job.signals.failed.connect(failed)
+        self.threadPool.start(job)
+        return job
 
     def switch_to_game_user_settings(self):
         self.onGameUserSettings = True
@@ -240,23 +1088,33 @@ class ArkManager(QMainWindow):
 
         self.settingsPageTextEditors.setCurrentIndex(0)
 
-        global install_path
         install_path = self.arkInstallInput.text().strip()
 
         if self.__check_valid_path_inputs(check_steam_cmd=False, settings_editor=True):
-            game_user_settings_path = os.path.join(install_path, "ShooterGame\\Saved\\Config\\WindowsServer\\GameUserSettings.ini")
-            if os.path.isfile(game_user_settings_path):
-                try:
-                    with open(game_user_settings_path, "r", encoding="utf-8") as f:
-                        self.userSettingsTextEditor.setText(f.read())
-                        self.settingsSaveButton.setEnabled(True)
-                except Exception as e:
-                    self.append_output(f"Error reading GameUserSettings.ini: {e}")
-            else:
-                # Delay the error message slightly to avoid reentrant GUI issues
-                QTimer.singleShot(0, lambda: self.append_output(
-                    f"Cannot find GameUserSettings.ini at {game_user_settings_path}\nRun and join the server first, then shut it down properly to create the settings files.", settings_editor=True
-                ))
+            game_user_settings_path = settings_file_path(install_path, "GameUserSettings.ini")
+
+            def read_settings():
+                if os.path.isfile(game_user_settings_path):
+                    return read_ini_text(game_user_settings_path)
+                return None
+
+            def loaded(text):
+                if text is None:
+                    self.append_output(
+                        f"Cannot find GameUserSettings.ini at {game_user_settings_path}\nRun and join the server first, then shut it down properly to create the settings files.", settings_editor=True
+                    )
+                    return
+                self.load_settings_editor(self.userSettingsTextEditor, text)
+                if self.onGameUserSettings:
+                    self.settingsSaveButton.setEnabled(True)
+
+            self.run_job(
+                read_settings,
+                on_done=loaded,
+                on_error=lambda e: self.append_output(f"Error reading GameUserSettings.ini: {e}"),
+                busy_widgets=(self.userSettingsTextEditor,)
+            )
+
     def switch_to_game_settings(self):
         self.onGameUserSettings = False
         self.gameUserSettingsButton.setEnabled(True)
@@ -266,64 +1124,80 @@ class ArkManager(QMainWindow):
 
         self.settingsPageTextEditors.setCurrentIndex(1)
 
-        global install_path
         install_path = self.arkInstallInput.text().strip()
 
         if self.__check_valid_path_inputs(check_steam_cmd=False, settings_editor=True):
-            game_settings_path = os.path.join(install_path, "ShooterGame", "Saved", "Config", "WindowsServer", "Game.ini")
+            game_settings_path = settings_file_path(install_path, "Game.ini")
 
-            if os.path.isfile(game_settings_path):
-                try:
-                    with open(game_settings_path, "r", encoding="utf-8") as f:
-                        self.settingsTextEditor.setText(f.read())
-                        self.settingsSaveButton.setEnabled(True)
-                except Exception as e:
-                    self.append_output(f"Error reading Game.ini: {e}", settings_editor=True)
-            else:
+            def read_settings():
+                if os.path.isfile(game_settings_path):
+                    return read_ini_text(game_settings_path)
                 # Fall back to the template file
                 if os.path.isfile(template_path):
                     try:
-                        with open(template_path, "r", encoding="utf-8") as f:
-                            self.settingsTextEditor.setText(f.read())
-                            self.settingsSaveButton.setEnabled(True)
+                        return read_ini_text(template_path)
                     except Exception as e:
-                        self.append_output(f"Error reading template Game.ini at {template_path}: {e}", settings_editor=True)
-                else:
-                    self.append_output(f"Game.ini not found and no template available at {template_path}.", settings_editor=True)
+                        raise OSError(f"Error reading template Game.ini at {template_path}: {e}")
+                return None
 
+            def loaded(text):
+                if text is None:
+                    self.append_output(f"Game.ini not found and no template available at {template_path}.", settings_editor=True)
+                    return
+                self.load_settings_editor(self.settingsTextEditor, text)
+                if not self.onGameUserSettings:
+                    self.settingsSaveButton.setEnabled(True)
+
+            self.run_job(
+                read_settings,
+                on_done=loaded,
+                on_error=lambda e: self.append_output(f"Error reading Game.ini: {e}", settings_editor=True),
+                busy_widgets=(self.settingsTextEditor,)
+            )
+
+    def load_settings_editor(self, editor, text):
+        # Skip the (slow for big files) setPlainText when the editor already shows this exact file content
+        if editor.property("loadedText") == text and not editor.document().isModified():
+            return
+        editor.setPlainText(text)
+        editor.setProperty("loadedText", text)
+        editor.document().setModified(False)
 
     def save_settings(self, game_user_settings=True):
-        global install_path
         install_path = self.arkInstallInput.text().strip()
         if game_user_settings:
-            # Save GameUserSettings.ini
-            if self.__check_valid_path_inputs(check_steam_cmd=False, settings_editor=True):
-                user_settings_path = os.path.join(install_path, "ShooterGame", "Saved", "Config", "WindowsServer")
-                if os.path.exists(user_settings_path):
-                    file_path = os.path.join(user_settings_path, "GameUserSettings.ini")
-                    try:
-                        with open(file_path, "w", encoding="utf-8") as f:
-                            f.write(self.userSettingsTextEditor.toPlainText())
-                            self.indicate_save_success()
-                    except Exception as e:
-                        self.append_output(f";Error when attempting save: {e}", settings_editor=True)
-                else:
-                    self.append_output(f";Error when traversing path to settings files with path set to: {user_settings_path}")
+            file_name = "GameUserSettings.ini"
+            editor = self.userSettingsTextEditor
         else:
-            # Save Game.ini
-            if self.__check_valid_path_inputs(check_steam_cmd=False, settings_editor=True):
-                settings_path = os.path.join(install_path, "ShooterGame", "Saved", "Config", "WindowsServer")
-                if os.path.exists(settings_path):
-                    file_path = os.path.join(settings_path, "Game.ini")
-                    try:
-                        with open(file_path, "w", encoding="utf-8") as f:
-                            f.write(self.settingsTextEditor.toPlainText())
-                            self.indicate_save_success()
-                    except Exception as e:
-                        self.append_output(f";Error when attempting save: {e}", settings_editor=True)
-                else:
-                    self.append_output(
-                        f";Error when traversing path to settings files with path set to: {settings_path}")
+            file_name = "Game.ini"
+            editor = self.settingsTextEditor
+
+        if self.__check_valid_path_inputs(check_steam_cmd=False, settings_editor=True):
+            settings_path = settings_dir(install_path)
+            file_path = os.path.join(settings_path, file_name)
+
+            def write_settings(text):
+                if not os.path.exists(settings_path):
+                    return None
+                # Only writes when the content changed, through a temp file + rename
+                save_ini_text(file_path, text)
+                return read_ini_text(file_path)
+
+            def saved(text):
+                if text is None:
+                    self.append_output(f";Error when traversing path to settings files with path set to: {settings_path}")
+                    return
+                editor.setProperty("loadedText", text)
+                editor.document().setModified(False)
+                self.indicate_save_success()
+
+            self.run_job(
+                write_settings,
+                editor.toPlainText(),
+                on_done=saved,
+                on_error=lambda e: self.append_output(f";Error when attempting save: {e}", settings_editor=True),
+                busy_widgets=(self.settingsSaveButton, editor)
+            )
 
     def indicate_save_success(self):
         self.settingsSaveButton.setText("Saved!")
@@ -352,42 +1226,105 @@ class ArkManager(QMainWindow):
             else:
                 path = self.arkInstallInput.text().strip()
 
-            if os.path.exists(path):
-                path = os.path.abspath(path)
+            def open_path():
+                if not os.path.exists(path):
+                    return False
 
+                full_path = os.path.abspath(path)
                 if platform.system() == "Windows": # Windows
-                    os.startfile(path)
+                    os.startfile(full_path)
                 elif platform.system() == "Darwin": # macOS
-                    subprocess.run(["open", path])
+                    subprocess.run(["open", full_path])
                 else: # Linux, etc.
-                    subprocess.run(["xdg-open", path])
-            else:
-                self.append_output("Path does not exist, so cannot open to it.")
+                    subprocess.run(["xdg-open", full_path])
+                return True
+
+            button = self.steamCmdOpenDirectoryButton if steam_cmd else self.arkInstallOpenDirectoryButton
+            self.run_job(
+                open_path,
+                on_done=lambda opened: opened or self.append_output("Path does not exist, so cannot open to it."),
+                busy_widgets=(button,)
+            )
+
+    def shut_down(self):
+        # Stop the watchdog first so it doesn't restart servers that are shutting down with the manager
+        self.watchdog.stop()
+        if self.scheduler:
+            self.scheduler.stop()
+        self.metrics.stop()
+        if self.metricsServer:
+            self.metricsServer.stop()
+        self.supervisor.stop_all()
+        # Background servers keep running under the daemon, the next window reattaches to them
+        self.daemonReconnectTimer.stop()
+        if self.daemon:
+            self.daemon.on_disconnect = None
+            self.daemon.close()
 
     def append_output(self, text, settings_editor=False):
         if not settings_editor:
-            self.textEditor.append(text.strip())
+            self.logBuffer.push(text.strip())
         else:
             if self.onGameUserSettings:
-                self.userSettingsTextEditor.append(text.strip())
+                self.userSettingsTextEditor.appendPlainText(text.strip())
             else:
-                self.settingsTextEditor.append(text.strip())
-
-    def create_start_bat_content(self):
-        server_exe_path = os.path.join(install_path, "ShooterGame", "Binaries", "Win64", "ArkAscendedServer.exe")
-        global start_bat_content
-        start_bat_content = f'"{server_exe_path}" TheIsland_WP?listen?SessionName={self.serverNameInput.text().strip()} -server -log {self.serverLaunchOptionsInput.text().strip()}'
+                self.settingsTextEditor.appendPlainText(text.strip())
+
+    def flush_output(self):
+        lines = self.logBuffer.drain(console_flush_batch)
+        dropped, coalesced = self.logBuffer.stats()
+
+        # Each server instance has its own log stream, tag the lines when more than one exists
+        streams = [(instance.label, instance.log_buffer) for instance in self.supervisor.instances.values()]
+        for name, log_buffer in list(self.daemonLogs.items()):
+            streams.append((self.daemonStatus.get(name, {}).get("label", name), log_buffer))
+        for label, log_buffer in streams:
+            instance_lines = log_buffer.drain(console_flush_batch)
+            if len(streams) > 1:
+                instance_lines = [f"[{label}] {line}" for line in instance_lines]
+            lines.extend(instance_lines)
+
+            instance_dropped, instance_coalesced = log_buffer.stats()
+            dropped += instance_dropped
+            coalesced += instance_coalesced
+
+        if lines:
+            self.textEditor.appendPlainText("\n".join(lines))
+
+        self.refresh_server_controls()
+
+        if dropped or coalesced:
+            self.consoleStatsLabel.setText(f"Dropped lines: {dropped}    Coalesced lines: {coalesced}")
+
+    def prefs_inputs(self):
+        return {
+            "SteamCMD": self.steamCmdInput,
+            "ArkServerInstall": self.arkInstallInput,
+            "SharedInstall": self.sharedInstallInput,
+            "ServerName": self.serverNameInput,
+            "ServerAdminPassword": self.serverAdminPasswordInput,
+            "ServerPassword": self.serverPasswordInput,
+            "ServerPort": self.serverPortInput,
+            "ServerQueryPort": self.serverQueryPortInput,
+            "ServerMaxPlayers": self.serverMaxPlayersInput,
+            "ServerRCONPort": self.serverRconPortInput,
+            "ServerLaunchOptions": self.serverLaunchOptionsInput,
+            "MaintenanceSchedule": self.maintenanceScheduleInput,
+            "BackupSchedule": self.backupScheduleInput,
+        }
+
+    def current_prefs(self):
+        prefs = {key: widget.text().strip() for key, widget in self.prefs_inputs().items()}
+        prefs["AutoRestart"] = str(self.autoRestartCheckBox.isChecked())
+        prefs["StagedUpdates"] = str(self.stagedUpdateCheckBox.isChecked())
+        prefs["BackgroundServers"] = str(self.backgroundServersCheckBox.isChecked())
+        return prefs
+
+    def create_start_bat_content(self, install_path):
+        return create_start_bat_content(install_path, self.current_prefs())
 
     def create_game_user_settings_template(self):
-        global game_user_settings_template
-        game_user_settings_template = f"""[ServerSettings]
-ServerAdminPassword={self.serverAdminPasswordInput.text().strip()}
-ServerPassword={self.serverPasswordInput.text().strip()}
-SessionName={self.serverNameInput.text().strip()}
-Port={self.serverPortInput.text().strip()}
-QueryPort={self.serverQueryPortInput.text().strip()}
-MaxPlayers={self.serverMaxPlayersInput.text().strip()}
-"""
+        return create_game_user_settings_template(self.current_prefs())
 
     def __check_valid_path_inputs(self, check_steam_cmd=True, check_ark_install=True, settings_editor=False):
         if check_steam_cmd:
@@ -427,68 +1364,84 @@ MaxPlayers={self.serverMaxPlayersInput.text().strip()}
             self.append_output("No launch options added.")
         return True
 
+    def select_profile(self, index):
+        prefs = self.profileStore.get_prefs(self.profileSelector.itemText(index))
+        if prefs is not None:
+            self.apply_prefs(prefs)
+
+    def apply_prefs(self, prefs):
+        for key, widget in self.prefs_inputs().items():
+            widget.setText(prefs.get(key, ""))
+        self.autoRestartCheckBox.setChecked(prefs.get("AutoRestart") == "True")
+        self.stagedUpdateCheckBox.setChecked(prefs.get("StagedUpdates") == "True")
+        self.backgroundServersCheckBox.setChecked(prefs.get("BackgroundServers") == "True")
+        self.refresh_backups()
+
+    def refresh_profile_selector(self):
+        self.profileSelector.clear()
+        self.profileSelector.addItems(self.profileStore.names())
+        if self.profileStore.active:
+            self.profileSelector.setCurrentText(self.profileStore.active)
+
+    def delete_profile(self):
+        name = self.profileSelector.currentText().strip()
+        if self.profileStore.get(name) is None:
+            self.append_output(f"No saved profile named '{name}'.")
+            return
+
+        self.profileStore.delete(name)
+        self.refresh_profile_selector()
+        if self.profileStore.active:
+            self.apply_prefs(self.profileStore.get_prefs())
+        self.run_job(self.profileStore.save, on_done=lambda _: self.append_output(f"Profile '{name}' deleted."))
+
     def __save_user_prefs(self):
-        user_prefs_success = False
+        name = self.profileSelector.currentText().strip() or default_profile_name
         try:
-            os.mkdir("data")
-            self.append_output("Directory 'data' created.")
-            user_prefs_success = True
-        except FileExistsError:
-            self.append_output("Directory 'data' already exists.")
-            user_prefs_success = True
-        except OSError as e:
-            self.append_output(f"Error creating 'data' directory: {e}")
-
-        if user_prefs_success:
-            with open("data/user.prefs", "w", encoding="utf-8") as f:
-                f.write(
-                    f"""-SteamCMD: {self.steamCmdInput.text().strip()}
--ArkServerInstall: {self.arkInstallInput.text().strip()}
--ServerName: {self.serverNameInput.text().strip()}
--ServerAdminPassword: {self.serverAdminPasswordInput.text().strip()}
--ServerPassword: {self.serverPasswordInput.text().strip()}
--ServerPort: {self.serverPortInput.text().strip()}
--ServerQueryPort: {self.serverQueryPortInput.text().strip()}
--ServerMaxPlayers: {self.serverMaxPlayersInput.text().strip()}
--ServerLaunchOptions: {self.serverLaunchOptionsInput.text().strip()}"""
-                )
+            self.profileStore.set(name, self.current_prefs())
+        except ValueError as e:
+            self.append_output(f"Profile not saved: {e}")
+            return
+
+        if self.profileSelector.findText(name) < 0:
+            self.refresh_profile_selector()
+        self.run_job(self.profileStore.save, on_done=lambda saved: saved and self.append_output(f"Profile '{name}' saved."))
 
     def __load_user_prefs(self):
-        if os.path.exists("data/user.prefs"):
+        def loaded(store):
+            if not store.profiles:
+                self.append_output("No user preferences set.")
+                return
+
             self.append_output("Loading user preferences.")
-            with open("data/user.prefs", "r", encoding="utf-8") as f:
-                for line in f:
-                    if len(line.strip().split()) > 1:
-                        if "-SteamCMD" in line.strip():
-                            self.steamCmdInput.setText(line.strip().split()[1])
-                        if "-ArkServerInstall" in line.strip():
-                            self.arkInstallInput.setText(line.strip().split()[1])
-                        if "-ServerName" in line.strip():
-                            self.serverNameInput.setText(line.strip().split()[1])
-                        if "-ServerAdminPassword" in line.strip():
-                            self.serverAdminPasswordInput.setText(line.strip().split()[1])
-                        if "-ServerPassword" in line.strip():
-                            self.serverPasswordInput.setText(line.strip().split()[1])
-                        if "-ServerPort" in line.strip():
-                            self.serverPortInput.setText(line.strip().split()[1])
-                        if "-ServerQueryPort" in line.strip():
-                            self.serverQueryPortInput.setText(line.strip().split()[1])
-                        if "-ServerMaxPlayers" in line.strip():
-                            self.serverMaxPlayersInput.setText(line.strip().split()[1])
-                        if "-ServerLaunchOptions" in line.strip():
-                            self.serverLaunchOptionsInput.setText(line.strip().split()[1])
-        else:
-            self.append_output("No user preferences set.")
+            self.refresh_profile_selector()
+            self.apply_prefs(store.get_prefs())
+            # Write out a store that was just migrated from the old user.prefs file
+            if store.dirty:
+                self.run_job(store.save, on_done=lambda _: self.append_output(f"Preferences migrated to {store.path}."))
+
+        self.run_job(
+            self.profileStore.load,
+            on_done=loaded,
+            on_error=lambda e: self.append_output(f"Error loading user preferences: {e}"),
+            busy_widgets=(self.runButton, self.startServerButton, self.profileSelector)
+        )
 
     def setup_server_run_widget(self):
         server_layout = QVBoxLayout()
 
+        server_layout.addWidget(QLabel("Server Profile:"))
+        server_layout.addLayout(self.profileLayout)
+
         server_layout.addWidget(QLabel("SteamCMD Path:"))
         server_layout.addLayout(self.steamCmdLayout)
 
         server_layout.addWidget(QLabel("ARK Server Install Path:"))
         server_layout.addLayout(self.arkInstallLayout)
 
+        server_layout.addWidget(QLabel("Shared Game Files Path:"))
+        server_layout.addWidget(self.sharedInstallInput)
+
         server_layout.addWidget(QLabel("Server Name"))
         server_layout.addWidget(self.serverNameInput)
 
@@ -507,14 +1460,33 @@ MaxPlayers={self.serverMaxPlayersInput.text().strip()}
         server_layout.addWidget(QLabel("Max Players"))
         server_layout.addWidget(self.serverMaxPlayersInput)
 
+        server_layout.addWidget(QLabel("RCON Port"))
+        server_layout.addWidget(self.serverRconPortInput)
+
         server_layout.addWidget(QLabel("Launch Options"))
         server_layout.addWidget(self.serverLaunchOptionsInput)
 
         server_layout.addWidget(self.runButton)
-        server_layout.addWidget(self.startServerButton)
+        server_layout.addWidget(self.installProgressBar)
+        server_layout.addWidget(self.stagedUpdateCheckBox)
+        server_layout.addLayout(self.switchBuildLayout)
+        server_layout.addWidget(self.verifyFilesButton)
+        server_layout.addLayout(self.serverControlLayout)
+        server_layout.addWidget(self.autoRestartCheckBox)
+        server_layout.addWidget(self.backgroundServersCheckBox)
         server_layout.addWidget(self.serverSettingsPageButton)
 
+        server_layout.addLayout(self.rconLayout)
+        server_layout.addLayout(self.maintenanceLayout)
+        server_layout.addLayout(self.backupLayout)
+        server_layout.addLayout(self.restoreLayout)
+        server_layout.addLayout(self.logSearchLayout)
+
         server_layout.addWidget(self.textEditor)
+        server_layout.addWidget(self.consoleStatsLabel)
+        server_layout.addWidget(self.serverStatusLabel)
+        server_layout.addWidget(self.metricsChart)
+        server_layout.addWidget(self.metricsLabel)
 
         self.server_widget.setLayout(server_layout)
 
@@ -530,8 +1502,15 @@ MaxPlayers={self.serverMaxPlayersInput.text().strip()}
         self.settings_widget.setLayout(settings_layout)
 
 
-if __name__ == "__main__":
+def main():
     app = QApplication([])
     window = ArkManager()
     window.show()
     app.exec_()
+    window.shut_down()
+
+
+if __name__ == "__main__":
+    # Needed for the integrity scanner's process pool in the PyInstaller build
+    multiprocessing.freeze_support()
+    main()
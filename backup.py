@@ -0,0 +1,460 @@
+import datetime
+import hashlib
+import json
+import mmap
+import os
+import threading
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+# Content-defined chunking: a chunk ends after an anchor byte whose preceding window hashes to zero
+# under the mask. Finding anchors with bytes.find keeps the scan at C speed, and because boundaries
+# only depend on nearby bytes an insert early in a file doesn't shift every later chunk.
+chunk_min_size = 256 * 1024
+chunk_max_size = 4 * 1024 * 1024
+chunk_mask_bits = 10
+chunk_anchor = b"\x7f"
+chunk_window = 32
+# Highly repetitive data can contain the anchor everywhere, give up and cut at the max size instead
+chunk_max_candidates = 8 << chunk_mask_bits
+
+default_compression_level = 6
+default_keep_last = 24
+default_keep_daily = 14
+# Below this much changed data the process pool costs more than it saves
+pool_min_bytes = 16 * 1024 * 1024
+batch_max_bytes = 64 * 1024 * 1024
+batch_max_files = 64
+# Skipped inside ShooterGame/Saved: logs are archived separately and crash dumps are large and useless to restore
+excluded_dirs = {"logs", "crashes"}
+
+_store_locks = {}
+_store_locks_lock = threading.Lock()
+
+
+class BackupError(Exception):
+    pass
+
+
+def saved_dir(install_path):
+    return os.path.join(install_path, "ShooterGame", "Saved")
+
+
+def backup_dir(install_path):
+    return os.path.join(install_path, "ShooterGame", "SavedBackups")
+
+
+def chunk_boundaries(data):
+    size = len(data)
+    mask = (1 << chunk_mask_bits) - 1
+    boundaries = []
+    start = 0
+    while start < size:
+        end = min(size, start + chunk_max_size)
+        cut = end
+        if end - start > chunk_min_size:
+            candidates = 0
+            i = data.find(chunk_anchor, start + chunk_min_size, end)
+            while i >= 0 and candidates < chunk_max_candidates:
+                if not zlib.crc32(data[i - chunk_window:i]) & mask:
+                    cut = i
+                    break
+                candidates += 1
+                i = data.find(chunk_anchor, i + 1, end)
+        boundaries.append(cut)
+        start = cut
+    return boundaries
+
+
+def chunk_path(store_dir, digest):
+    return os.path.join(store_dir, "chunks", digest[:2], digest)
+
+
+def _write_chunk(store_dir, digest, chunk, level):
+    path = chunk_path(store_dir, digest)
+    if os.path.exists(path):
+        return 0
+    compressed = zlib.compress(chunk, level)
+    # Already compressed data is stored raw rather than paying to inflate it on restore
+    data = b"z" + compressed if len(compressed) < len(chunk) else b"r" + chunk
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(data)
+    os.replace(temp_path, path)
+    return len(data)
+
+
+def read_chunk(store_dir, digest):
+    with open(chunk_path(store_dir, digest), "rb") as f:
+        data = f.read()
+    if data[:1] == b"z":
+        return zlib.decompress(data[1:])
+    if data[:1] == b"r":
+        return data[1:]
+    raise BackupError(f"Chunk {digest} is corrupt")
+
+
+def _store_file(path, store_dir, level):
+    before = os.stat(path)
+    chunks = []
+    stored_bytes = new_chunks = 0
+    with open(path, "rb") as f:
+        if before.st_size:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                start = 0
+                for end in chunk_boundaries(data):
+                    chunk = data[start:end]
+                    digest = hashlib.blake2b(chunk, digest_size=20).hexdigest()
+                    written = _write_chunk(store_dir, digest, chunk, level)
+                    if written:
+                        new_chunks += 1
+                        stored_bytes += written
+                    chunks.append(digest)
+                    start = end
+
+    # The server may have been writing the file while we read it, the caller retries those
+    after = os.stat(path)
+    if (after.st_size, after.st_mtime_ns) != (before.st_size, before.st_mtime_ns):
+        return None
+    return {
+        "size": before.st_size,
+        "mtime_ns": before.st_mtime_ns,
+        "chunks": chunks,
+        "new_chunks": new_chunks,
+        "stored_bytes": stored_bytes,
+    }
+
+
+def _store_files(paths, store_dir, level):
+    results = []
+    for path in paths:
+        try:
+            results.append(_store_file(path, store_dir, level))
+        except OSError:
+            results.append(None)
+    return results
+
+
+def _restore_file(path, entry, store_dir):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = path + ".restore.tmp"
+    with open(temp_path, "wb") as f:
+        for digest in entry["chunks"]:
+            f.write(read_chunk(store_dir, digest))
+    os.replace(temp_path, path)
+    # Keeping the original mtime lets the next backup (and restore) skip this file
+    os.utime(path, ns=(entry["mtime_ns"], entry["mtime_ns"]))
+    return entry["size"]
+
+
+def _restore_files(items, store_dir):
+    return sum(_restore_file(path, entry, store_dir) for path, entry in items)
+
+
+def _lower_priority():
+    # Pool workers yield to the game server
+    try:
+        if os.name == "nt":
+            import psutil
+            psutil.Process().nice(psutil.BELOW_NORMAL_PRIORITY_CLASS)
+        else:
+            os.nice(10)
+    except (ImportError, OSError):
+        pass
+
+
+def _batches(paths, sizes):
+    batch, batch_bytes = [], 0
+    for path, size in zip(paths, sizes):
+        if batch and (batch_bytes + size > batch_max_bytes or len(batch) >= batch_max_files):
+            yield batch
+            batch, batch_bytes = [], 0
+        batch.append(path)
+        batch_bytes += size
+    if batch:
+        yield batch
+
+
+def _run_batches(fn, batches, args, workers, use_pool):
+    if not use_pool:
+        for batch in batches:
+            yield batch, fn(batch, *args)
+        return
+    with ProcessPoolExecutor(max_workers=workers, initializer=_lower_priority) as pool:
+        futures = [(batch, pool.submit(fn, batch, *args)) for batch in batches]
+        for batch, future in futures:
+            yield batch, future.result()
+
+
+def list_source_files(source_dir):
+    files = {}
+    for root, dirs, names in os.walk(source_dir):
+        relative_root = os.path.relpath(root, source_dir)
+        if relative_root == ".":
+            dirs[:] = [name for name in dirs if name.lower() not in excluded_dirs]
+        for name in names:
+            if name.endswith(".tmp"):
+                continue
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files[os.path.normpath(os.path.join(relative_root, name)).replace("\\", "/")] = (stat.st_size, stat.st_mtime_ns)
+    return files
+
+
+def default_workers():
+    # Leave half the cores to the running servers
+    return max(1, (os.cpu_count() or 2) // 2)
+
+
+class BackupResult:
+    def __init__(self, snapshot_id, stats):
+        self.snapshot_id = snapshot_id
+        self.stats = stats
+
+    def dedupe_ratio(self):
+        if not self.stats["stored_bytes"]:
+            return None
+        return self.stats["total_bytes"] / self.stats["stored_bytes"]
+
+    def summary_lines(self):
+        stats = self.stats
+        seconds = max(stats["seconds"], 1e-6)
+        ratio = self.dedupe_ratio()
+        return [
+            f"Backup {self.snapshot_id}: {stats['files']} files, {stats['total_bytes'] / 1024 ** 2:.1f} MB "
+            f"({stats['changed_files']} changed) in {stats['seconds']:.1f}s.",
+            f"Read {stats['read_bytes'] / 1024 ** 2:.1f} MB at {stats['read_bytes'] / 1024 ** 2 / seconds:.1f} MB/s, "
+            f"stored {stats['stored_bytes'] / 1024 ** 2:.2f} MB in {stats['new_chunks']} new chunks"
+            + (f" (dedupe ratio {ratio:.1f}:1)." if ratio else " (everything was already in the store)."),
+        ]
+
+
+class BackupStore:
+    # Snapshots are small JSON manifests listing each file's chunk hashes. The chunks themselves are
+    # stored once under chunks/<first two hex digits>/<hash>, shared by every snapshot that has them.
+    def __init__(self, directory, compression_level=default_compression_level):
+        self.directory = directory
+        self.compression_level = compression_level
+        with _store_locks_lock:
+            self.lock = _store_locks.setdefault(os.path.normcase(os.path.abspath(directory)), threading.Lock())
+
+    def snapshot_path(self, snapshot_id):
+        return os.path.join(self.directory, "snapshots", snapshot_id + ".json")
+
+    def snapshots(self):
+        try:
+            names = os.listdir(os.path.join(self.directory, "snapshots"))
+        except OSError:
+            return []
+        return sorted(name[:-5] for name in names if name.endswith(".json"))
+
+    def load_snapshot(self, snapshot_id):
+        try:
+            with open(self.snapshot_path(snapshot_id), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise BackupError(f"No backup named '{snapshot_id}'")
+
+    def latest(self):
+        snapshots = self.snapshots()
+        return self.load_snapshot(snapshots[-1]) if snapshots else None
+
+    def __new_snapshot_id(self, now):
+        base = datetime.datetime.fromtimestamp(now).strftime("%Y%m%d-%H%M%S")
+        snapshot_id, suffix = base, 1
+        while os.path.exists(self.snapshot_path(snapshot_id)):
+            suffix += 1
+            snapshot_id = f"{base}-{suffix}"
+        return snapshot_id
+
+    def create(self, source_dir, label=None, workers=None, progress=None, retries=3):
+        if not os.path.isdir(source_dir):
+            raise BackupError(f"Nothing to back up, {source_dir} does not exist")
+
+        with self.lock:
+            start = time.perf_counter()
+            previous = self.latest()
+            previous_files = previous["files"] if previous else {}
+            files = list_source_files(source_dir)
+
+            # Files with the same size and mtime as in the last snapshot reuse its chunk list unread
+            entries = {}
+            to_store = []
+            for relative_path, (size, mtime_ns) in files.items():
+                old = previous_files.get(relative_path)
+                if old and old["size"] == size and old["mtime_ns"] == mtime_ns:
+                    entries[relative_path] = old
+                else:
+                    to_store.append(relative_path)
+            changed_files = len(to_store)
+
+            read_bytes = stored_bytes = new_chunks = 0
+            for attempt in range(retries):
+                if not to_store:
+                    break
+                if attempt:
+                    time.sleep(1)
+                sizes = [files[path][0] for path in to_store]
+                batches = list(_batches(to_store, sizes))
+                retry = []
+                done = 0
+                results = _run_batches(
+                    _store_files, [[os.path.join(source_dir, path) for path in batch] for batch in batches],
+                    (self.directory, self.compression_level), workers or default_workers(), sum(sizes) >= pool_min_bytes
+                )
+                for batch, (_, batch_results) in zip(batches, results):
+                    for relative_path, result in zip(batch, batch_results):
+                        if result is None:
+                            retry.append(relative_path)
+                            continue
+                        read_bytes += result["size"]
+                        stored_bytes += result["stored_bytes"]
+                        new_chunks += result["new_chunks"]
+                        entries[relative_path] = {key: result[key] for key in ("size", "mtime_ns", "chunks")}
+                    done += len(batch)
+                    if progress:
+                        progress(done, len(to_store))
+                to_store = retry
+
+            if to_store:
+                raise BackupError(f"Files kept changing during the backup: {', '.join(to_store[:5])}")
+
+            now = time.time()
+            snapshot_id = self.__new_snapshot_id(now)
+            stats = {
+                "files": len(entries),
+                "changed_files": changed_files,
+                "total_bytes": sum(entry["size"] for entry in entries.values()),
+                "read_bytes": read_bytes,
+                "stored_bytes": stored_bytes,
+                "new_chunks": new_chunks,
+                "seconds": time.perf_counter() - start,
+            }
+            self.__write_json(self.snapshot_path(snapshot_id), {
+                "id": snapshot_id,
+                "created_at": now,
+                "label": label,
+                "source": os.path.abspath(source_dir),
+                "stats": stats,
+                "files": entries,
+            })
+            return BackupResult(snapshot_id, stats)
+
+    def restore(self, snapshot_id, target_dir=None, workers=None, safety_snapshot=True):
+        # Makes target_dir look exactly like the snapshot. By default the current state is backed up
+        # first, so a restore can itself be undone.
+        snapshot = self.load_snapshot(snapshot_id)
+        target_dir = target_dir or snapshot["source"]
+        if safety_snapshot and os.path.isdir(target_dir) and list_source_files(target_dir):
+            self.create(target_dir, label=f"before restoring {snapshot_id}", workers=workers)
+
+        with self.lock:
+            start = time.perf_counter()
+            current = list_source_files(target_dir) if os.path.isdir(target_dir) else {}
+            items = []
+            for relative_path, entry in snapshot["files"].items():
+                if current.get(relative_path) != (entry["size"], entry["mtime_ns"]):
+                    items.append((os.path.join(target_dir, relative_path), entry))
+
+            removed = 0
+            for relative_path in current:
+                if relative_path not in snapshot["files"]:
+                    os.remove(os.path.join(target_dir, relative_path))
+                    removed += 1
+
+            sizes = [entry["size"] for _, entry in items]
+            batches = list(_batches(items, sizes))
+            written = 0
+            for _, batch_bytes in _run_batches(
+                _restore_files, batches, (self.directory,), workers or os.cpu_count(), sum(sizes) >= pool_min_bytes
+            ):
+                written += batch_bytes
+
+            return {
+                "files": len(snapshot["files"]),
+                "restored_files": len(items),
+                "removed_files": removed,
+                "written_bytes": written,
+                "seconds": time.perf_counter() - start,
+            }
+
+    def prune(self, keep_last=default_keep_last, keep_daily=default_keep_daily, now=None):
+        # Keeps the newest `keep_last` snapshots plus the newest one of each of the last `keep_daily` days,
+        # then deletes chunks no remaining snapshot uses
+        with self.lock:
+            snapshots = self.snapshots()
+            keep = set(snapshots[-keep_last:] if keep_last else [])
+            today = datetime.date.fromtimestamp(now or time.time())
+            newest_per_day = {}
+            for snapshot_id in snapshots:
+                newest_per_day[snapshot_id[:8]] = snapshot_id
+            for days in range(keep_daily):
+                day = (today - datetime.timedelta(days=days)).strftime("%Y%m%d")
+                if day in newest_per_day:
+                    keep.add(newest_per_day[day])
+
+            removed = [snapshot_id for snapshot_id in snapshots if snapshot_id not in keep]
+            for snapshot_id in removed:
+                os.remove(self.snapshot_path(snapshot_id))
+            freed = self.__collect_garbage() if removed else 0
+            return removed, freed
+
+    def __collect_garbage(self):
+        referenced = set()
+        for snapshot_id in self.snapshots():
+            for entry in self.load_snapshot(snapshot_id)["files"].values():
+                referenced.update(entry["chunks"])
+
+        freed = 0
+        for root, dirs, names in os.walk(os.path.join(self.directory, "chunks")):
+            for name in names:
+                if name not in referenced:
+                    path = os.path.join(root, name)
+                    try:
+                        freed += os.path.getsize(path)
+                        os.remove(path)
+                    except OSError:
+                        pass
+        return freed
+
+    def store_bytes(self):
+        total = 0
+        for root, dirs, names in os.walk(os.path.join(self.directory, "chunks")):
+            for name in names:
+                try:
+                    total += os.path.getsize(os.path.join(root, name))
+                except OSError:
+                    pass
+        return total
+
+    def describe(self, snapshot_id):
+        snapshot = self.load_snapshot(snapshot_id)
+        stats = snapshot.get("stats", {})
+        created = datetime.datetime.fromtimestamp(snapshot["created_at"]).strftime("%Y-%m-%d %H:%M:%S")
+        text = f"{snapshot_id}  {created}  {stats.get('files', len(snapshot['files']))} files  {stats.get('total_bytes', 0) / 1024 ** 2:.1f} MB"
+        if snapshot.get("label"):
+            text += f"  ({snapshot['label']})"
+        return text
+
+    def __write_json(self, path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(temp_path, path)
+
+
+def backup_server(install_path, label=None, keep_last=default_keep_last, keep_daily=default_keep_daily, workers=None):
+    # Snapshot ShooterGame/Saved, then apply the retention policy
+    store = BackupStore(backup_dir(install_path))
+    result = store.create(saved_dir(install_path), label=label, workers=workers)
+    removed, freed = store.prune(keep_last, keep_daily)
+    lines = result.summary_lines()
+    if removed:
+        lines.append(f"Pruned {len(removed)} old backups, freed {freed / 1024 ** 2:.1f} MB.")
+    return result, lines
@@ -0,0 +1,615 @@
+import importlib.util
+import os
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+
+import ini_model
+import integrity
+import metrics
+from log_archive import LogArchive, LogArchiveReader
+from log_buffer import LogBuffer
+from metrics import MetricsSampler
+from profile_store import ProfileStore
+from rcon import RconClient, RconPool
+from server_config import create_game_user_settings_template, template_path, update_game_files
+from server_supervisor import ServerInstance, start_bat_path
+
+# Each case times one run and returns seconds, or raises Skipped when it can't run here.
+# Stand-ins for start.bat, steamcmd.exe and powershell are the ones the tests use.
+repo_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+fakes_dir = os.path.join(repo_dir, "tests")
+
+server_lines = 50000
+steam_progress_lines = 20000
+console_lines = 100000
+# The GUI's console_flush_batch, console_flush_interval_ms and console_max_lines, ASAServerManager needs PyQt5 to import
+console_batch = 1000
+console_flush_interval = 0.1
+console_max_lines = 5000
+# A server logging 100,000 lines a second for 2 seconds, while the GUI thread is expected every 10 ms
+load_lines = 200000
+load_rate = 100000
+load_tick = 0.01
+append_output_lines = 2000
+settings_keys = 400
+settings_rounds = 20
+profile_count = 200
+prefs_rounds = 20
+# A game install of many small files, the real one has about 30,000
+tree_dirs = 200
+tree_files_per_dir = 100
+# What a CLI command imports at most, and what opening the window imports
+cli_modules = ("manager_cli", "profile_store", "server_config", "steam_update", "staged_update", "rcon", "ini_model", "manager_daemon", "backup")
+gui_modules = ("ASAServerManager",)
+# About 50 MB of server output before compression
+archive_lines = 500000
+# A heavily modded Game.ini: 50,000 lines, some of them spawn containers and XP ramps thousands of characters long
+rcon_commands = 500
+# A day of 5 second ticks
+metrics_ticks = 17280
+game_ini_lines = 50000
+game_ini_long_every = 50
+editor_keystrokes = 20
+editor_keystroke_interval = 0.05
+
+
+class Skipped(Exception):
+    pass
+
+
+def write_stub(path, script, *args):
+    # A shell script (a .cmd file on Windows) that runs one of the Python fakes with fixed arguments
+    command = " ".join(f'"{arg}"' for arg in (sys.executable, os.path.join(fakes_dir, script)) + args)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        if os.name == "nt":
+            f.write(f"@{command} %*\n")
+        else:
+            f.write(f'#!/bin/sh\nexec {command} "$@"\n')
+    os.chmod(path, 0o755)
+    return path
+
+
+def setup_environment(work_dir):
+    # Points the manager's seams at the stand-ins and keeps profiles out of the real user data folder
+    suffix = ".cmd" if os.name == "nt" else ""
+    os.environ["ASA_STEAMCMD"] = write_stub(os.path.join(work_dir, "stubs", "steamcmd" + suffix), "fake_steam.py", "steamcmd")
+    os.environ["ASA_POWERSHELL"] = write_stub(os.path.join(work_dir, "stubs", "powershell" + suffix), "fake_steam.py", "powershell")
+    os.environ["FAKE_STEAM_PROGRESS"] = str(steam_progress_lines)
+    os.environ["APPDATA"] = os.environ["XDG_CONFIG_HOME"] = os.path.join(work_dir, "user")
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+
+def server_output(work_dir):
+    # Reader thread throughput: start.bat prints the lines as fast as it can, then exits
+    install_path = os.path.join(work_dir, "server")
+    write_stub(start_bat_path(install_path), "fake_server.py", "--lines", str(server_lines), "--ready", "--then", "exit")
+    instance = ServerInstance("bench", install_path)
+    exited = threading.Event()
+    instance.on_exit.append(lambda exited_instance: exited.set())
+    start = time.perf_counter()
+    instance.start()
+    if not exited.wait(120):
+        instance.stop(timeout=5)
+        raise RuntimeError("The stand-in server didn't exit")
+    seconds = time.perf_counter() - start
+    if instance.exit_code != 0:
+        raise RuntimeError(f"The stand-in server exited with code {instance.exit_code}")
+    return seconds
+
+
+def setup_script(work_dir):
+    # What ScriptRunner runs for Install/Update: a fresh install streaming SteamCMD progress lines
+    install_path = os.path.join(work_dir, f"install-{time.perf_counter_ns()}")
+    start = time.perf_counter()
+    return_code = update_game_files(LogBuffer(), "unused", install_path)
+    seconds = time.perf_counter() - start
+    if return_code != 0:
+        raise RuntimeError(f"The stand-in setup script exited with code {return_code}")
+    return seconds
+
+
+def console_buffer(work_dir):
+    # Runner threads push, the GUI timer drains in batches
+    log_buffer = LogBuffer()
+    start = time.perf_counter()
+    for number in range(console_lines):
+        log_buffer.push(f"log line {number}")
+        if number % console_batch == 0:
+            log_buffer.drain(console_batch)
+    while log_buffer.drain(console_batch):
+        pass
+    return time.perf_counter() - start
+
+
+def _p99(samples):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+
+
+def console_load_latency(work_dir):
+    # How late the GUI thread gets to run while a server floods the console. This thread stands in for the
+    # Qt event loop: it wakes every 10 ms and does what the flush timer does every 100 ms. Returns the 99th
+    # percentile of how late it woke, see gui_load_latency for the real window.
+    install_path = os.path.join(work_dir, "server")
+    instance = ServerInstance("bench", install_path, command=[
+        sys.executable, os.path.join(fakes_dir, "fake_server.py"), "--lines", str(load_lines), "--rate", str(load_rate),
+        "--then", "exit"
+    ])
+    exited = threading.Event()
+    instance.on_exit.append(lambda exited_instance: exited.set())
+    console = deque(maxlen=console_max_lines)
+    lateness = []
+    instance.start()
+    try:
+        expected = time.perf_counter() + load_tick
+        next_flush = time.perf_counter() + console_flush_interval
+        while not exited.is_set():
+            time.sleep(max(0.0, expected - time.perf_counter()))
+            now = time.perf_counter()
+            lateness.append(now - expected)
+            if now >= next_flush:
+                lines = instance.log_buffer.drain(console_batch)
+                console.extend(lines)
+                next_flush = now + console_flush_interval
+            expected = time.perf_counter() + load_tick
+            if len(lateness) * load_tick > 120:
+                raise RuntimeError("The stand-in server didn't exit")
+    finally:
+        instance.stop(timeout=5)
+    if not console:
+        raise RuntimeError("No server output reached the console")
+    return _p99(lateness)
+
+
+def _qt_application():
+    try:
+        from PyQt5.QtWidgets import QApplication
+    except ImportError:
+        raise Skipped("PyQt5 is not installed")
+    return QApplication.instance() or QApplication([])
+
+
+def append_output(work_dir):
+    # Lines through append_output until they are in the console widget
+    app = _qt_application()
+    from ASAServerManager import ArkManager
+
+    window = ArkManager()
+    try:
+        app.processEvents()
+        start = time.perf_counter()
+        for number in range(append_output_lines):
+            window.append_output(f"log line {number}")
+        while window.logBuffer.pending():
+            window.flush_output()
+        app.processEvents()
+        return time.perf_counter() - start
+    finally:
+        window.shut_down()
+        window.close()
+
+
+def gui_load_latency(work_dir):
+    # The same flood through a real window: start.bat is the stand-in server, its output goes through the
+    # window's buffers and flush timer into the console. A 10 ms timer records how late the event loop runs it.
+    app = _qt_application()
+    from PyQt5.QtCore import QEventLoop, QTimer
+    from ASAServerManager import ArkManager
+
+    install_path = os.path.join(work_dir, "loaded-server")
+    write_stub(
+        start_bat_path(install_path), "fake_server.py", "--lines", str(load_lines), "--rate", str(load_rate), "--then", "exit"
+    )
+    window = ArkManager()
+    exited = threading.Event()
+    lateness = []
+    expected = [time.perf_counter() + load_tick]
+
+    def tick():
+        now = time.perf_counter()
+        lateness.append(max(0.0, now - expected[0]))
+        expected[0] = now + load_tick
+
+    loop = QEventLoop()
+    ticker = QTimer()
+    ticker.timeout.connect(tick)
+    watcher = QTimer()
+    watcher.timeout.connect(lambda: exited.is_set() and loop.quit())
+    try:
+        instance = window.get_server_instance(install_path, {})
+        instance.on_exit.append(lambda exited_instance: exited.set())
+        window.show()
+        app.processEvents()
+        instance.start()
+        expected[0] = time.perf_counter() + load_tick
+        ticker.start(int(load_tick * 1000))
+        watcher.start(50)
+        QTimer.singleShot(120000, loop.quit)
+        loop.exec_()
+        if not exited.is_set():
+            raise RuntimeError("The stand-in server didn't exit")
+        return _p99(lateness)
+    finally:
+        ticker.stop()
+        watcher.stop()
+        window.shut_down()
+        window.close()
+
+
+def _settings_text():
+    lines = ["[ServerSettings]"]
+    lines += [f"Setting{number}=True" for number in range(settings_keys)]
+    lines += ["", "[/Script/ShooterGame.ShooterGameMode]"]
+    lines += [f"OverridePlayerLevelEngramPoints={number % 50}" for number in range(settings_keys)]
+    return "\r\n".join(lines) + "\r\n"
+
+
+def settings_load_save(work_dir):
+    path = os.path.join(work_dir, "GameUserSettings.ini")
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write(_settings_text())
+    start = time.perf_counter()
+    for number in range(settings_rounds):
+        # Cold reads, the cache would otherwise hand back the text without touching the file
+        ini_model._cache.clear()
+        document = ini_model.load_ini(path)
+        document.set("ServerSettings", "Setting0", str(number))
+        ini_model.save_ini(path, document)
+    return time.perf_counter() - start
+
+
+def _game_ini_text():
+    spawn_entry = ",".join(
+        f'(AnEntryName="Dino{number}",EntryWeight=0.{number % 10 + 1},NPCsToSpawnStrings=("Raptor_Character_BP_C"),'
+        f'NPCsSpawnOffsets=((X=0,Y=0,Z=0)),NPCsToSpawnPercentageChance=(1.0))'
+        for number in range(20)
+    )
+    ramp = ",".join(f"ExperiencePointsForLevel[{level}]={level * 1250}" for level in range(200))
+    lines = ["[/Script/ShooterGame.ShooterGameMode]"]
+    for number in range(1, game_ini_lines - 3):
+        if number % game_ini_long_every == 0:
+            lines.append(f'ConfigAddNPCSpawnEntriesContainer=(NPCSpawnEntriesContainerClassString="DinoSpawnEntries{number}_C",'
+                         f"NPCSpawnEntries=({spawn_entry}))")
+        elif number % game_ini_long_every == 1:
+            lines.append(f"LevelExperienceRampOverrides=({ramp})")
+        else:
+            lines.append(f"OverridePlayerLevelEngramPoints={number % 50}")
+    lines += ["", "[ServerSettings]", "XPMultiplier=2.0"]
+    return "\n".join(lines) + "\n"
+
+
+def _known_settings():
+    # What the settings editor checks against, settings_editor.default_known_settings needs PyQt5
+    known = {}
+    with open(template_path, "r", encoding="utf-8") as f:
+        ini_model.known_settings(f.read(), known)
+    return ini_model.known_settings(create_game_user_settings_template({}), known)
+
+
+def settings_validate(work_dir):
+    # One validation pass the editor runs in the background after typing pauses
+    text = _game_ini_text()
+    known = _known_settings()
+    start = time.perf_counter()
+    ini_model.check_settings(text, known)
+    return time.perf_counter() - start
+
+
+def settings_editor(work_dir):
+    # Open the large Game.ini in the settings editor, scroll through it a page at a time, then type with the
+    # debounced validation running on the thread pool. A 10 ms timer records how late the GUI thread runs it.
+    app = _qt_application()
+    from PyQt5.QtCore import QThreadPool, QTimer
+    from PyQt5.QtGui import QTextCursor
+    from ASAServerManager import BackgroundJob
+    from settings_editor import SettingsEditor, validate_delay_ms
+
+    jobs = set()
+
+    def run_job(fn, *args, on_done=None, on_error=None):
+        job = BackgroundJob(fn, *args)
+        jobs.add(job)
+        job.signals.finished.connect(lambda result: (jobs.discard(job), on_done(result)))
+        job.signals.failed.connect(lambda error: (jobs.discard(job), on_error(error)))
+        QThreadPool.globalInstance().start(job)
+
+    text = _game_ini_text()
+    editor = SettingsEditor(run_job, known=_known_settings())
+    editor.resize(1000, 700)
+    editor.show()
+    app.processEvents()
+
+    lateness = []
+    expected = [time.perf_counter() + load_tick]
+
+    def tick():
+        now = time.perf_counter()
+        lateness.append(max(0.0, now - expected[0]))
+        expected[0] = now + load_tick
+
+    def run_events(seconds):
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            app.processEvents()
+            time.sleep(0.001)
+
+    ticker = QTimer()
+    ticker.timeout.connect(tick)
+    ticker.start(int(load_tick * 1000))
+    try:
+        expected[0] = time.perf_counter() + load_tick
+        editor.setPlainText(text)
+        run_events(0.2)
+
+        scroll_bar = editor.textEdit.verticalScrollBar()
+        for _ in range(100):
+            scroll_bar.setValue(scroll_bar.value() + scroll_bar.pageStep())
+            run_events(load_tick)
+
+        editor.textEdit.moveCursor(QTextCursor.End)
+        for _ in range(editor_keystrokes):
+            editor.textEdit.insertPlainText("1")
+            run_events(editor_keystroke_interval)
+        deadline = time.perf_counter() + 60
+        while editor.validatedRevision != editor.document().revision() and time.perf_counter() < deadline:
+            run_events(validate_delay_ms / 1000)
+        if editor.validatedRevision != editor.document().revision():
+            raise RuntimeError("The settings editor never finished validating")
+        return _p99(lateness)
+    finally:
+        ticker.stop()
+        editor.close()
+
+
+def prefs_load(work_dir):
+    path = os.path.join(work_dir, "profiles.json")
+    if not os.path.isfile(path):
+        store = ProfileStore(path, legacy_prefs_path=None)
+        for number in range(profile_count):
+            store.set(f"map{number}", {
+                "ArkServerInstall": f"C:\\ARK\\map{number}", "ServerName": f"Map {number}",
+                "ServerPort": 7777 + number * 2, "ServerRCONPort": 27020 + number, "AutoRestart": True,
+            })
+        store.save()
+    start = time.perf_counter()
+    for _ in range(prefs_rounds):
+        ProfileStore(path, legacy_prefs_path=None).load()
+    return time.perf_counter() - start
+
+
+def _archive_line(number):
+    if number % 10000 == 0:
+        return f"2024.01.05_10.00.00: Player{number} [UniqueNetId:{number:016x} Platform:None] joined this ARK!"
+    return f"[2024.01.05-10.00.00:000][{number % 1000:3d}]LogNet: Verbose: tick {number} actor channel update {'x' * (number % 40)}"
+
+
+def _write_archive(directory):
+    archive = LogArchive(directory, segment_max_bytes=8 * 1024 * 1024)
+    for number in range(archive_lines):
+        archive.append(_archive_line(number), timestamp=1000.0 + number / 100)
+    archive.close()
+
+
+def archive_append(work_dir):
+    # What the reader thread adds per server line when archiving is on
+    directory = os.path.join(work_dir, f"archive-{time.perf_counter_ns()}")
+    start = time.perf_counter()
+    _write_archive(directory)
+    return time.perf_counter() - start
+
+
+def archive_search(work_dir):
+    # A rare line across the whole archive, then a one minute window in the middle of it
+    directory = os.path.join(work_dir, "archive")
+    if not os.path.isdir(directory):
+        _write_archive(directory)
+    reader = LogArchiveReader(directory)
+    start = time.perf_counter()
+    found = list(reader.search("joined this ARK"))
+    window = list(reader.lines(start_time=3000.0, end_time=3060.0))
+    seconds = time.perf_counter() - start
+    if len(found) != archive_lines // 10000 or len(window) != 6001:
+        raise RuntimeError(f"The archive returned {len(found)} matches and {len(window)} window lines")
+    return seconds
+
+
+def _install_tree(work_dir):
+    install_path = os.path.join(work_dir, "tree")
+    if not os.path.isdir(install_path):
+        for directory in range(tree_dirs):
+            path = os.path.join(install_path, "ShooterGame", "Content", f"Dir{directory:03d}")
+            os.makedirs(path)
+            for number in range(tree_files_per_dir):
+                with open(os.path.join(path, f"asset{number:03d}.uasset"), "wb") as f:
+                    f.write(os.urandom(256 + number * 16))
+    return install_path
+
+
+def integrity_cold(work_dir):
+    # Every file hashed in the process pool, nothing cached
+    install_path = _install_tree(work_dir)
+    try:
+        os.remove(integrity.hash_cache_path(install_path))
+    except FileNotFoundError:
+        pass
+    start = time.perf_counter()
+    _, stats = integrity.scan(install_path)
+    seconds = time.perf_counter() - start
+    if stats["hashed"] != tree_dirs * tree_files_per_dir:
+        raise RuntimeError(f"Hashed {stats['hashed']} files, expected all of them")
+    return seconds
+
+
+def integrity_warm(work_dir):
+    # Nothing changed since the last scan, so every hash comes from the cache
+    install_path = _install_tree(work_dir)
+    integrity.scan(install_path)
+    start = time.perf_counter()
+    _, stats = integrity.scan(install_path)
+    seconds = time.perf_counter() - start
+    if stats["hashed"]:
+        raise RuntimeError(f"Hashed {stats['hashed']} files on a warm scan")
+    return seconds
+
+
+def _load_fake(name):
+    spec = importlib.util.spec_from_file_location(name, os.path.join(fakes_dir, f"{name}.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _process_source():
+    # psutil when it's installed, otherwise the tests' stand-in, which times only the sampler's own work
+    if metrics.psutil is not None:
+        return metrics.psutil, None
+    return None, _load_fake("fake_psutil").FakeProcessSource()
+
+
+def _metrics_sampling(server_count):
+    # Seconds per server for all the ticks, which should stay the same however many servers are tracked
+    real, fake = _process_source()
+    sampler = MetricsSampler()
+    for number in range(server_count):
+        if real:
+            pid = os.getpid()
+        else:
+            # start.bat and the server it runs
+            pid = 1000 + number * 2
+            fake.add(pid, rss=1000)
+            fake.add(pid + 1, parent=pid, cpu=50.0, rss=500000, threads=60)
+        sampler.track(f"server{number}", pid)
+    previous = metrics.psutil
+    metrics.psutil = real or fake
+    try:
+        start = time.perf_counter()
+        for _ in range(metrics_ticks):
+            for server in list(sampler.servers.values()):
+                sampler.sample(server)
+        return (time.perf_counter() - start) / server_count
+    finally:
+        metrics.psutil = previous
+
+
+def metrics_sample_1(work_dir):
+    return _metrics_sampling(1)
+
+
+def metrics_sample_50(work_dir):
+    return _metrics_sampling(50)
+
+
+def _rcon_commands(pooled):
+    # ListPlayers every few seconds from the window, the watchdog and the CLI, against the tests' RCON server
+    server = _load_fake("fake_rcon").FakeRconServer()
+    pool = RconPool()
+    try:
+        start = time.perf_counter()
+        for _ in range(rcon_commands):
+            if pooled:
+                pool.command("127.0.0.1", server.port, "secret", "ListPlayers")
+            else:
+                client = RconClient("127.0.0.1", server.port, "secret")
+                client.command("ListPlayers")
+                client.close()
+        return time.perf_counter() - start
+    finally:
+        pool.close()
+        server.close()
+
+
+def rcon_pooled(work_dir):
+    return _rcon_commands(pooled=True)
+
+
+def rcon_fresh(work_dir):
+    return _rcon_commands(pooled=False)
+
+
+def _time_process(args):
+    start = time.perf_counter()
+    result = subprocess.run(args, cwd=repo_dir, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
+    seconds = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"{' '.join(args[1:])} failed:\n{result.stdout}")
+    return seconds
+
+
+def _import_seconds(modules):
+    # Cumulative import time of the modules as "python -X importtime" reports it, interpreter startup left out
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import " + ", ".join(modules)], cwd=repo_dir,
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {', '.join(modules)} failed:\n{result.stderr}")
+    microseconds = 0
+    for line in result.stderr.splitlines():
+        fields = line.split("|")
+        # Top level entries have no indentation before the name, their cumulative time includes everything below
+        if line.startswith("import time:") and len(fields) == 3 and fields[2].strip() in modules and not fields[2].startswith("  "):
+            microseconds += int(fields[1])
+    return microseconds / 1e6
+
+
+def import_cli(work_dir):
+    return _import_seconds(cli_modules)
+
+
+def import_gui(work_dir):
+    if importlib.util.find_spec("PyQt5") is None:
+        raise Skipped("PyQt5 is not installed")
+    return _import_seconds(gui_modules)
+
+
+def cold_start_cli(work_dir):
+    # The packaged exe's entry point given a command
+    return _time_process([sys.executable, "gui_main.py", "--help"])
+
+
+def cold_start_gui(work_dir):
+    # Interpreter start to the first shown window, without a display
+    if importlib.util.find_spec("PyQt5") is None:
+        raise Skipped("PyQt5 is not installed")
+    return _time_process([sys.executable, "-c", (
+        "import os\n"
+        "from PyQt5.QtWidgets import QApplication\n"
+        "from ASAServerManager import ArkManager\n"
+        "app = QApplication([])\n"
+        "window = ArkManager()\n"
+        "window.show()\n"
+        "app.processEvents()\n"
+        "window.shut_down()\n"
+        "os._exit(0)\n"
+    )])
+
+
+# name -> case, in the order they run
+cases = {
+    "server_output": server_output,
+    "setup_script": setup_script,
+    "console_buffer": console_buffer,
+    "append_output": append_output,
+    "console_load_latency": console_load_latency,
+    "gui_load_latency": gui_load_latency,
+    "settings_load_save": settings_load_save,
+    "settings_validate": settings_validate,
+    "settings_editor": settings_editor,
+    "prefs_load": prefs_load,
+    "archive_append": archive_append,
+    "archive_search": archive_search,
+    "integrity_cold": integrity_cold,
+    "integrity_warm": integrity_warm,
+    "metrics_sample_1": metrics_sample_1,
+    "metrics_sample_50": metrics_sample_50,
+    "rcon_pooled": rcon_pooled,
+    "rcon_fresh": rcon_fresh,
+    "import_cli": import_cli,
+    "import_gui": import_gui,
+    "cold_start_cli": cold_start_cli,
+    "cold_start_gui": cold_start_gui,
+}
@@ -0,0 +1,103 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import tempfile
+
+from benchmarks.cases import Skipped, cases, setup_environment
+
+baseline_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+# A case is a regression when it is this much slower than its baseline (0.25 = 25%)
+default_threshold = 0.25
+default_repeat = 3
+
+
+def run_cases(names, repeat=default_repeat, log=print):
+    # Best of `repeat` runs, the minimum is the least disturbed by whatever else the machine is doing.
+    # Returns {name: seconds}, skipped cases are left out.
+    work_dir = tempfile.mkdtemp(prefix="asa-bench-")
+    saved_environ = dict(os.environ)
+    results = {}
+    try:
+        setup_environment(work_dir)
+        for name in names:
+            try:
+                results[name] = min(cases[name](work_dir) for _ in range(repeat))
+            except Skipped as e:
+                log(f"{name:<20} skipped: {e}")
+    finally:
+        os.environ.clear()
+        os.environ.update(saved_environ)
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return results
+
+
+def load_baselines(path=baseline_path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"results": {}}
+
+
+def save_baselines(results, path=baseline_path):
+    # Cases that were skipped this time keep their old baseline
+    data = load_baselines(path)
+    data["results"].update(results)
+    data["machine"] = machine_description()
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def machine_description():
+    return f"{platform.system()} {platform.machine()}, Python {platform.python_version()}, {os.cpu_count()} CPUs"
+
+
+def compare(results, baselines, threshold=default_threshold):
+    # Returns (report lines, names of the cases slower than baseline * (1 + threshold))
+    lines = []
+    regressions = []
+    for name, seconds in results.items():
+        baseline = baselines.get(name)
+        if baseline is None:
+            lines.append(f"{name:<20} {seconds * 1000:9.1f} ms   no baseline")
+            continue
+        change = seconds / baseline - 1
+        line = f"{name:<20} {seconds * 1000:9.1f} ms   baseline {baseline * 1000:9.1f} ms   {change:+7.1%}"
+        if change > threshold:
+            regressions.append(name)
+            line += "   REGRESSION"
+        lines.append(line)
+    return lines, regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Time the manager's hot paths against stored baselines.")
+    parser.add_argument("cases", nargs="*", metavar="case", help=f"Cases to run (default all): {', '.join(cases)}")
+    parser.add_argument("--repeat", type=int, default=default_repeat, help="Runs per case, the fastest counts")
+    parser.add_argument("--threshold", type=float, default=default_threshold, help="Allowed slowdown before a case fails, 0.25 = 25%%")
+    parser.add_argument("--baselines", default=baseline_path, help="Baseline file to compare with")
+    parser.add_argument("--update-baseline", action="store_true", help="Store these results as the new baselines")
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.cases if name not in cases]
+    if unknown:
+        parser.error(f"unknown cases: {', '.join(unknown)}")
+
+    results = run_cases(args.cases or list(cases), args.repeat)
+    baselines = load_baselines(args.baselines)
+    if baselines.get("machine") and baselines["machine"] != machine_description():
+        print(f"Baselines were recorded on {baselines['machine']}, this is {machine_description()}.")
+    lines, regressions = compare(results, baselines["results"], args.threshold)
+    for line in lines:
+        print(line)
+
+    if args.update_baseline:
+        save_baselines(results, args.baselines)
+        print(f"Baselines updated in {args.baselines}.")
+        return 0
+    if regressions:
+        print(f"{len(regressions)} cases are more than {args.threshold:.0%} slower than their baseline: {', '.join(regressions)}")
+        return 1
+    return 0
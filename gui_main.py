@@ -0,0 +1,11 @@
+import multiprocessing
+import sys
+
+# Entry point of the packaged exe (gui_main.spec). With a command it is the command line tool, the background
+# manager runs as "<exe> daemon", and PyQt5 is only imported when no command is given and the window opens.
+
+if __name__ == "__main__":
+    # Needed for the integrity scanner's process pool in the PyInstaller build
+    multiprocessing.freeze_support()
+    import manager_cli
+    sys.exit(manager_cli.main())
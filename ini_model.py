@@ -0,0 +1,313 @@
+import difflib
+import os
+import re
+import tempfile
+import threading
+
+
+def settings_dir(install_path):
+    return os.path.join(install_path, "ShooterGame", "Saved", "Config", "WindowsServer")
+
+
+def settings_file_path(install_path, file_name):
+    return os.path.join(settings_dir(install_path), file_name)
+
+
+class IniLine:
+    # One physical line. Untouched lines are written back exactly as they were read.
+    __slots__ = ("text", "section", "key", "value", "modified")
+
+    def __init__(self, text, section=None, key=None, value=None):
+        self.text = text
+        self.section = section
+        self.key = key
+        self.value = value
+        self.modified = False
+
+    def render(self):
+        if self.modified:
+            return f"{self.key}={self.value}"
+        return self.text
+
+
+class IniSection:
+    def __init__(self, name, header):
+        self.name = name
+        self.header = header
+        self.keys = {}
+        self.last_line = header
+
+
+class IniDocument:
+    # Keeps comments, blank lines and key order. Sections and keys are indexed (case-insensitively,
+    # like Unreal does) so lookups don't scan the file. ARK repeats some keys within a section
+    # (OverridePlayerLevelEngramPoints, ConfigAddNPCSpawnEntriesContainer, ...), so every key maps
+    # to a list of lines.
+    def __init__(self, text=""):
+        self.newline = "\r\n" if "\r\n" in text else "\n"
+        self.trailing_newline = text.endswith(("\n", "\r"))
+        self.lines = []
+        self.sections = {}
+        self.modified = False
+
+        section = self.__get_or_create_section("", None)
+        for raw in text.splitlines():
+            stripped = raw.strip()
+            if stripped.startswith("[") and stripped.endswith("]"):
+                line = IniLine(raw)
+                self.lines.append(line)
+                section = self.__get_or_create_section(stripped[1:-1].strip(), line)
+                continue
+
+            if stripped and not stripped.startswith((";", "#")) and "=" in stripped:
+                key, value = raw.split("=", 1)
+                line = IniLine(raw, section.name, key.strip(), value.strip())
+                section.keys.setdefault(line.key.lower(), []).append(line)
+            else:
+                line = IniLine(raw, section.name)
+
+            self.lines.append(line)
+            if stripped:
+                section.last_line = line
+
+    def __get_or_create_section(self, name, header):
+        section = self.sections.get(name.lower())
+        if section is None:
+            section = IniSection(name, header)
+            self.sections[name.lower()] = section
+        return section
+
+    def section_names(self):
+        return [section.name for section in self.sections.values() if section.header is not None]
+
+    def keys(self, section):
+        found = self.sections.get(section.lower())
+        if not found:
+            return []
+        return [lines[0].key for lines in found.keys.values() if lines]
+
+    def get(self, section, key, default=None):
+        values = self.get_all(section, key)
+        return values[0] if values else default
+
+    def get_all(self, section, key):
+        found = self.sections.get(section.lower())
+        if not found:
+            return []
+        return [line.value for line in found.keys.get(key.lower(), [])]
+
+    def set(self, section, key, value):
+        # Changes the first occurrence, or appends the key to the section
+        lines = self.__key_lines(section, key)
+        if lines:
+            self.__update_line(lines[0], value)
+        else:
+            self.add(section, key, value)
+
+    def set_all(self, section, key, values):
+        # Replaces every occurrence of a repeated key, keeping them in place where possible
+        lines = self.__key_lines(section, key)
+        values = [str(value) for value in values]
+        for line, value in zip(lines, values):
+            self.__update_line(line, value)
+        for line in lines[len(values):]:
+            self.__remove_line(line)
+        for value in values[len(lines):]:
+            self.add(section, key, value)
+
+    def add(self, section, key, value):
+        found = self.sections.get(section.lower())
+        if found is None:
+            if self.lines and self.lines[-1].text.strip():
+                self.lines.append(IniLine(""))
+            header = IniLine(f"[{section}]")
+            self.lines.append(header)
+            found = self.__get_or_create_section(section, header)
+
+        line = IniLine(f"{key}={value}", found.name, key, str(value))
+        if found.last_line is None:
+            self.lines.insert(0, line)
+        else:
+            self.lines.insert(self.lines.index(found.last_line) + 1, line)
+        found.keys.setdefault(key.lower(), []).append(line)
+        found.last_line = line
+        self.modified = True
+
+    def remove(self, section, key):
+        for line in list(self.__key_lines(section, key)):
+            self.__remove_line(line)
+
+    def to_text(self):
+        text = self.newline.join(line.render() for line in self.lines)
+        if self.trailing_newline:
+            text += self.newline
+        return text
+
+    def __key_lines(self, section, key):
+        found = self.sections.get(section.lower())
+        if not found:
+            return []
+        return found.keys.get(key.lower(), [])
+
+    def __update_line(self, line, value):
+        value = str(value)
+        if line.value != value:
+            line.value = value
+            line.modified = True
+            self.modified = True
+
+    def __remove_line(self, line):
+        section = self.sections[line.section.lower()]
+        section.keys[line.key.lower()].remove(line)
+        index = self.lines.index(line)
+        if section.last_line is line:
+            section.last_line = self.lines[index - 1] if index > 0 else None
+        del self.lines[index]
+        self.modified = True
+
+
+# "Key=Value" and "Key[3]=Value", also when commented out like the suggestions in the templates
+_setting_pattern = re.compile(r"^[;#]?\s*([A-Za-z_]\w*)(?:\[\d+\])?\s*=\s*([^;\s]*)")
+_number_pattern = re.compile(r"^-?\d+(?:\.\d*)?$")
+# How close an unknown key has to be to a known one to be reported as a likely typo
+typo_cutoff = 0.85
+
+
+def known_settings(template_text, known=None):
+    # {key lowercase: (key, example value)} from a template. Keys in templates are usually commented out.
+    known = {} if known is None else known
+    for raw in template_text.splitlines():
+        match = _setting_pattern.match(raw.strip())
+        if match:
+            known.setdefault(match.group(1).lower(), (match.group(1), match.group(2)))
+    return known
+
+
+def _value_problem(key, value, example):
+    if _number_pattern.match(example) and value and not _number_pattern.match(value):
+        return f"{key} should be a number, like {example}"
+    if example.lower() in ("true", "false") and value and value.lower() not in ("true", "false"):
+        return f"{key} should be True or False"
+    if value.count("(") != value.count(")"):
+        return f"{key} has unbalanced parentheses"
+    return None
+
+
+def check_settings(text, known):
+    # One pass over the editor text. Returns ([(line index, section name)], [(line index, problem)]).
+    # Only likely mistakes are reported, ARK accepts many more keys than any template lists.
+    sections = []
+    problems = []
+    in_section = False
+    typos = {}
+    for index, raw in enumerate(text.split("\n")):
+        stripped = raw.strip()
+        if not stripped or stripped.startswith((";", "#")):
+            continue
+        if stripped.startswith("["):
+            if stripped.endswith("]"):
+                sections.append((index, stripped[1:-1].strip()))
+                in_section = True
+            else:
+                problems.append((index, "Section header is missing its closing ]"))
+            continue
+        if "=" not in stripped:
+            problems.append((index, "Not a setting, expected Key=Value"))
+            continue
+
+        key, value = stripped.split("=", 1)
+        key = key.strip()
+        value = value.strip()
+        if not in_section:
+            problems.append((index, f"{key} is outside of any [section]"))
+        base_key = key.split("[", 1)[0].lower()
+        entry = known.get(base_key)
+        if entry:
+            problem = _value_problem(key, value, entry[1])
+            if problem:
+                problems.append((index, problem))
+            continue
+
+        # Repeated unknown keys are looked up once
+        if base_key not in typos:
+            close = difflib.get_close_matches(base_key, list(known), n=1, cutoff=typo_cutoff)
+            typos[base_key] = known[close[0]][0] if close else None
+        if typos[base_key]:
+            problems.append((index, f"Unknown key {key}, did you mean {typos[base_key]}?"))
+        elif value.count("(") != value.count(")"):
+            problems.append((index, f"{key} has unbalanced parentheses"))
+    return sections, problems
+
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _file_signature(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def read_ini_text(path):
+    # Cached by mtime/size, switching between the settings files doesn't re-read unchanged files
+    signature = _file_signature(path)
+    with _cache_lock:
+        cached = _cache.get(path)
+        if cached and cached[0] == signature:
+            return cached[1]
+
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        text = f.read()
+
+    with _cache_lock:
+        _cache[path] = (signature, text)
+    return text
+
+
+def load_ini(path):
+    return IniDocument(read_ini_text(path))
+
+
+def atomic_write_text(path, text):
+    # Write to a temp file in the same directory and rename over the original,
+    # so a crash mid-save never leaves a half written file behind
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+def save_ini_text(path, text):
+    # Returns False without touching the file when nothing changed
+    if os.path.isfile(path):
+        current = read_ini_text(path)
+        # Text coming from the editor has plain \n line endings, keep the file's own
+        if "\r\n" in current and "\r\n" not in text:
+            text = text.replace("\n", "\r\n")
+        if current == text:
+            return False
+
+    atomic_write_text(path, text)
+    with _cache_lock:
+        _cache[path] = (_file_signature(path), text)
+    return True
+
+
+def save_ini(path, document):
+    saved = save_ini_text(path, document.to_text())
+    document.modified = False
+    for line in document.lines:
+        if line.modified:
+            line.text = line.render()
+            line.modified = False
+    return saved
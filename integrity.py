@@ -0,0 +1,207 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from shared_install import private_paths
+from steam_update import installed_build_id
+
+# Each server's own files (world saves, start.bat, mods, manager state) change all the time and aren't part
+# of the game files SteamCMD installs
+excluded_paths = private_paths
+hash_read_size = 1024 * 1024
+
+
+def hash_cache_path(install_path):
+    return os.path.join(install_path, "steamapps", "asa_manager_hashes.json")
+
+
+def baseline_path(install_path):
+    return os.path.join(install_path, "steamapps", "asa_manager_baseline.json")
+
+
+def hash_file(path):
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(hash_read_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _hash_files(paths):
+    results = []
+    for path in paths:
+        try:
+            results.append(hash_file(path))
+        except OSError:
+            results.append(None)
+    return results
+
+
+def _is_excluded(relative_path):
+    return os.path.normcase(os.path.normpath(relative_path)) in excluded_paths
+
+
+def list_files(install_path):
+    files = {}
+    for root, dirs, names in os.walk(install_path):
+        relative_root = os.path.relpath(root, install_path)
+        dirs[:] = [name for name in dirs if not _is_excluded(os.path.join(relative_root, name))]
+        for name in names:
+            if _is_excluded(os.path.join(relative_root, name)):
+                continue
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files[os.path.normpath(os.path.join(relative_root, name)).replace("\\", "/")] = (stat.st_size, stat.st_mtime_ns)
+    return files
+
+
+def _load_json(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_json(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(temp_path, path)
+
+
+def scan(install_path, workers=None, progress=None):
+    # Returns {relative path: hash}, the hash is None for files that couldn't be read. Files whose size and
+    # mtime match the cache are not re-hashed.
+    start = time.perf_counter()
+    cache_path = hash_cache_path(install_path)
+    cache = _load_json(cache_path).get("files", {})
+    files = list_files(install_path)
+
+    hashes = {}
+    to_hash = []
+    for relative_path, (size, mtime_ns) in files.items():
+        cached = cache.get(relative_path)
+        if cached and cached[0] == size and cached[1] == mtime_ns:
+            hashes[relative_path] = cached[2]
+        else:
+            to_hash.append(relative_path)
+
+    if to_hash:
+        # Small batches keep the pool busy without paying IPC per file
+        batch_size = max(1, min(64, len(to_hash) // ((workers or os.cpu_count() or 1) * 4) or 1))
+        batches = [to_hash[i:i + batch_size] for i in range(0, len(to_hash), batch_size)]
+        done = 0
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for batch, results in zip(batches, pool.map(
+                _hash_files, [[os.path.join(install_path, path) for path in batch] for batch in batches]
+            )):
+                hashes.update(zip(batch, results))
+                done += len(batch)
+                if progress:
+                    progress(done, len(to_hash))
+
+    _save_json(cache_path, {"files": {
+        path: [files[path][0], files[path][1], file_hash] for path, file_hash in hashes.items() if file_hash is not None
+    }})
+
+    stats = {
+        "files": len(files),
+        "hashed": len(to_hash),
+        "cached": len(files) - len(to_hash),
+        "seconds": time.perf_counter() - start,
+    }
+    return hashes, stats
+
+
+def save_baseline(install_path, hashes):
+    _save_json(baseline_path(install_path), {
+        "build_id": installed_build_id(install_path),
+        "created_at": time.time(),
+        "files": {path: file_hash for path, file_hash in hashes.items() if file_hash is not None},
+    })
+
+
+def compare(baseline, current):
+    # Files that couldn't be read are neither missing nor modified, nobody knows what is in them
+    unreadable = sorted(path for path, file_hash in current.items() if file_hash is None)
+    missing = sorted(path for path in baseline if path not in current)
+    modified = sorted(
+        path for path, file_hash in baseline.items() if current.get(path) is not None and current[path] != file_hash
+    )
+    added = sorted(path for path, file_hash in current.items() if path not in baseline and file_hash is not None)
+    return missing, modified, added, unreadable
+
+
+class VerifyResult:
+    def __init__(self, stats, missing=(), modified=(), added=(), unreadable=(), baseline_created=False):
+        self.stats = stats
+        self.missing = list(missing)
+        self.modified = list(modified)
+        self.added = list(added)
+        self.unreadable = list(unreadable)
+        self.baseline_created = baseline_created
+
+    def ok(self):
+        return not self.missing and not self.modified and not self.unreadable
+
+    def summary_lines(self, limit=50):
+        lines = [
+            f"Scanned {self.stats['files']} files in {self.stats['seconds']:.1f}s "
+            f"({self.stats['hashed']} hashed, {self.stats['cached']} from cache)."
+        ]
+        if self.baseline_created:
+            lines.append("Saved a new integrity baseline for this build.")
+
+        for label, paths in (
+            ("Missing", self.missing), ("Modified", self.modified), ("Added", self.added), ("Unreadable", self.unreadable)
+        ):
+            if paths:
+                lines.append(f"{label} files: {len(paths)}")
+                lines.extend(f"  {path}" for path in paths[:limit])
+                if len(paths) > limit:
+                    lines.append(f"  ... and {len(paths) - limit} more")
+        if self.ok() and not self.baseline_created:
+            lines.append("All game files match the baseline.")
+        return lines
+
+
+def verify(install_path, workers=None, update_baseline=False, progress=None):
+    hashes, stats = scan(install_path, workers=workers, progress=progress)
+    baseline = _load_json(baseline_path(install_path))
+
+    # A new build legitimately changes files, so take a fresh baseline instead of reporting them
+    if update_baseline or not baseline.get("files") or baseline.get("build_id") != installed_build_id(install_path):
+        save_baseline(install_path, hashes)
+        unreadable = sorted(path for path, file_hash in hashes.items() if file_hash is None)
+        return VerifyResult(stats, unreadable=unreadable, baseline_created=True)
+
+    return VerifyResult(stats, *compare(baseline["files"], hashes))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check an ARK server install against its integrity baseline.")
+    parser.add_argument("install_path")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--update-baseline", action="store_true", help="Replace the baseline with the current files")
+    args = parser.parse_args(argv)
+
+    result = verify(args.install_path, workers=args.workers, update_baseline=args.update_baseline)
+    for line in result.summary_lines():
+        print(line)
+    return 0 if result.ok() else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
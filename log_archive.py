@@ -0,0 +1,290 @@
+import bisect
+import mmap
+import os
+import re
+import threading
+import time
+import zlib
+
+# Segments are a series of independent gzip members ("blocks"). The sidecar .idx file lists each
+# block's time range and byte range, so a reader can memory-map the segment and decompress only
+# the blocks it actually needs.
+SEGMENT_SUFFIX = ".log.gz"
+INDEX_SUFFIX = ".idx"
+
+
+def _segment_name(number):
+    return f"segment-{number:06d}"
+
+
+# Anchors and lookarounds look at what is around a line, which differs between a line on its own and the same
+# line inside a block ("ts\tline\n..."), so patterns with them skip the whole-block check
+_context_tokens = ("^", "$", "\\A", "\\Z", "(?=", "(?!", "(?<")
+
+
+def _block_prefilter(regex):
+    if any(token in regex.pattern for token in _context_tokens):
+        return None
+    return regex
+
+
+def _records(text):
+    # Only "\n" ends a record, str.splitlines() would also split server lines on \x1c-\x1e, \x85, \u2028, ...
+    records = text.split("\n")
+    records.pop()
+    return records
+
+
+class BlockIndex:
+    __slots__ = ("first_time", "last_time", "offset", "length", "first_line", "line_count")
+
+    def __init__(self, first_time, last_time, offset, length, first_line, line_count):
+        self.first_time = first_time
+        self.last_time = last_time
+        self.offset = offset
+        self.length = length
+        self.first_line = first_line
+        self.line_count = line_count
+
+    def to_line(self):
+        return f"{self.first_time:.3f}\t{self.last_time:.3f}\t{self.offset}\t{self.length}\t{self.first_line}\t{self.line_count}\n"
+
+    @classmethod
+    def from_line(cls, line):
+        first_time, last_time, offset, length, first_line, line_count = line.split("\t")
+        return cls(float(first_time), float(last_time), int(offset), int(length), int(first_line), int(line_count))
+
+
+class LogArchive:
+    # Appends server output to size-rotated, compressed segments with a sidecar index
+    def __init__(self, directory, segment_max_bytes=64 * 1024 * 1024, block_max_bytes=256 * 1024,
+                 block_max_age=5.0, max_segments=200):
+        self.directory = directory
+        self.segment_max_bytes = segment_max_bytes
+        self.block_max_bytes = block_max_bytes
+        self.block_max_age = block_max_age
+        self.max_segments = max_segments
+        self.lock = threading.Lock()
+
+        self.block = []
+        self.block_bytes = 0
+        self.block_first_time = None
+        self.block_last_time = None
+        # Counts written blocks, so a late flush timer can tell its block is already on disk
+        self.block_generation = 0
+        self.flush_timer = None
+
+        os.makedirs(directory, exist_ok=True)
+        segments = list_segments(directory)
+        self.segment_number = segments[-1] if segments else 1
+        self.__open_segment()
+
+    def __open_segment(self):
+        base = os.path.join(self.directory, _segment_name(self.segment_number))
+        self.line_number = 0
+        if os.path.isfile(base + INDEX_SUFFIX):
+            with open(base + INDEX_SUFFIX, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.endswith("\n"):
+                        block = BlockIndex.from_line(line.rstrip("\n"))
+                        self.line_number = block.first_line + block.line_count
+
+        self.segment_file = open(base + SEGMENT_SUFFIX, "ab")
+        self.index_file = open(base + INDEX_SUFFIX, "a", encoding="utf-8")
+        self.segment_offset = self.segment_file.tell()
+
+    def append(self, line, timestamp=None):
+        timestamp = time.time() if timestamp is None else timestamp
+        record = f"{timestamp:.3f}\t{line}\n"
+
+        with self.lock:
+            if self.block_first_time is None:
+                self.block_first_time = timestamp
+                # A quiet server may not log again for a long time, its last lines are written anyway
+                self.flush_timer = threading.Timer(self.block_max_age, self.__flush_stale, args=(self.block_generation,))
+                self.flush_timer.daemon = True
+                self.flush_timer.start()
+            self.block_last_time = timestamp
+            self.block.append(record)
+            self.block_bytes += len(record)
+
+            if self.block_bytes >= self.block_max_bytes or timestamp - self.block_first_time >= self.block_max_age:
+                self.__write_block()
+
+    def flush(self):
+        with self.lock:
+            self.__write_block()
+
+    def __flush_stale(self, generation):
+        with self.lock:
+            if generation == self.block_generation:
+                try:
+                    self.__write_block()
+                except OSError:
+                    # Kept in memory, the next append or flush tries again
+                    pass
+
+    def close(self):
+        # The next append opens the segment again. Closed while the server is down, so nothing in the
+        # install is held open (Windows can't move folders with open files in them).
+        with self.lock:
+            self.__write_block()
+            if self.segment_file:
+                self.segment_file.close()
+                self.index_file.close()
+                self.segment_file = None
+
+    def __write_block(self):
+        if not self.block:
+            return
+        if self.flush_timer:
+            self.flush_timer.cancel()
+            self.flush_timer = None
+        if self.segment_file is None:
+            os.makedirs(self.directory, exist_ok=True)
+            self.__open_segment()
+
+        data = "".join(self.block).encode("utf-8", errors="replace")
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+        compressed = compressor.compress(data) + compressor.flush()
+
+        self.segment_file.write(compressed)
+        self.segment_file.flush()
+
+        entry = BlockIndex(
+            self.block_first_time, self.block_last_time, self.segment_offset, len(compressed),
+            self.line_number, len(self.block)
+        )
+        # Index entry goes last so readers never see an entry for a block that isn't on disk yet
+        self.index_file.write(entry.to_line())
+        self.index_file.flush()
+
+        self.segment_offset += len(compressed)
+        self.line_number += len(self.block)
+        self.block = []
+        self.block_bytes = 0
+        self.block_first_time = None
+        self.block_last_time = None
+        self.block_generation += 1
+
+        if self.segment_offset >= self.segment_max_bytes:
+            self.__rotate()
+
+    def __rotate(self):
+        self.segment_file.close()
+        self.index_file.close()
+        self.segment_number += 1
+        self.__open_segment()
+
+        segments = list_segments(self.directory)
+        for number in segments[:max(0, len(segments) - self.max_segments)]:
+            base = os.path.join(self.directory, _segment_name(number))
+            for path in (base + SEGMENT_SUFFIX, base + INDEX_SUFFIX):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+
+def list_segments(directory):
+    if not os.path.isdir(directory):
+        return []
+
+    numbers = []
+    for name in os.listdir(directory):
+        if name.startswith("segment-") and name.endswith(SEGMENT_SUFFIX):
+            try:
+                numbers.append(int(name[len("segment-"):-len(SEGMENT_SUFFIX)]))
+            except ValueError:
+                pass
+    return sorted(numbers)
+
+
+class ArchivedSegment:
+    def __init__(self, directory, number):
+        base = os.path.join(directory, _segment_name(number))
+        self.path = base + SEGMENT_SUFFIX
+        self.blocks = []
+        with open(base + INDEX_SUFFIX, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.endswith("\n"):
+                    self.blocks.append(BlockIndex.from_line(line.rstrip("\n")))
+        self.block_end_times = [block.last_time for block in self.blocks]
+
+    def first_time(self):
+        return self.blocks[0].first_time if self.blocks else None
+
+    def last_time(self):
+        return self.blocks[-1].last_time if self.blocks else None
+
+    def read_blocks(self, start_time=None, end_time=None):
+        if not self.blocks:
+            return
+
+        # Blocks are in time order, so skip straight to the first one that can contain start_time
+        first = 0 if start_time is None else bisect.bisect_left(self.block_end_times, start_time)
+        with open(self.path, "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                for block in self.blocks[first:]:
+                    if end_time is not None and block.first_time > end_time:
+                        break
+                    if block.offset + block.length > len(mapped):
+                        break
+                    data = zlib.decompress(mapped[block.offset:block.offset + block.length], 31)
+                    yield block, data.decode("utf-8", errors="replace")
+
+
+class LogArchiveReader:
+    def __init__(self, directory):
+        self.directory = directory
+
+    def segments(self):
+        return [ArchivedSegment(self.directory, number) for number in list_segments(self.directory)]
+
+    def lines(self, start_time=None, end_time=None):
+        # Yields (timestamp, line) between the two times
+        for segment in self.segments():
+            if start_time is not None and (segment.last_time() or 0) < start_time:
+                continue
+            if end_time is not None and (segment.first_time() or 0) > end_time:
+                break
+            for block, text in segment.read_blocks(start_time, end_time):
+                for record in _records(text):
+                    timestamp, _, line = record.partition("\t")
+                    timestamp = float(timestamp)
+                    if start_time is not None and timestamp < start_time:
+                        continue
+                    if end_time is not None and timestamp > end_time:
+                        return
+                    yield timestamp, line
+
+    def search(self, pattern, start_time=None, end_time=None, limit=None, ignore_case=True):
+        regex = re.compile(pattern, re.IGNORECASE if ignore_case else 0)
+        prefilter = _block_prefilter(regex)
+        found = 0
+        for segment in self.segments():
+            if start_time is not None and (segment.last_time() or 0) < start_time:
+                continue
+            if end_time is not None and (segment.first_time() or 0) > end_time:
+                break
+            for block, text in segment.read_blocks(start_time, end_time):
+                # Cheap whole-block check first, most blocks won't contain a match at all
+                if prefilter and not prefilter.search(text):
+                    continue
+                for record in _records(text):
+                    timestamp, _, line = record.partition("\t")
+                    if not regex.search(line):
+                        continue
+                    timestamp = float(timestamp)
+                    if start_time is not None and timestamp < start_time:
+                        continue
+                    if end_time is not None and timestamp > end_time:
+                        continue
+                    yield timestamp, line
+                    found += 1
+                    if limit is not None and found >= limit:
+                        return
+
+
+def archive_dir(install_path):
+    return os.path.join(install_path, "ShooterGame", "Saved", "Logs", "ManagerArchive")
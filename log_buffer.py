@@ -0,0 +1,56 @@
+import threading
+from collections import deque
+
+
+class LogBuffer:
+    # Bounded ring buffer between the runner threads and the GUI.
+    # Runners push lines as fast as they arrive, the GUI drains them in batches on a timer.
+    def __init__(self, max_lines=20000):
+        self.lines = deque(maxlen=max_lines)
+        self.lock = threading.Lock()
+        self.dropped = 0
+        self.coalesced = 0
+        self.last_line = None
+        self.repeat_count = 0
+
+    def push(self, line):
+        with self.lock:
+            # Collapse runs of identical lines (spammy warnings, progress dots, etc.)
+            if line == self.last_line:
+                self.repeat_count += 1
+                self.coalesced += 1
+                return
+
+            self.__flush_repeats()
+            self.last_line = line
+            self.__append(line)
+
+    def drain(self, max_lines=None):
+        with self.lock:
+            self.__flush_repeats()
+
+            if max_lines is None or max_lines >= len(self.lines):
+                batch = list(self.lines)
+                self.lines.clear()
+            else:
+                batch = [self.lines.popleft() for _ in range(max_lines)]
+
+        return batch
+
+    def pending(self):
+        with self.lock:
+            return len(self.lines)
+
+    def stats(self):
+        with self.lock:
+            return self.dropped, self.coalesced
+
+    def __append(self, line):
+        if len(self.lines) == self.lines.maxlen:
+            self.dropped += 1
+        self.lines.append(line)
+
+    def __flush_repeats(self):
+        if self.repeat_count:
+            self.__append(f"(previous line repeated {self.repeat_count} more times)")
+            self.repeat_count = 0
@@ -0,0 +1,294 @@
+import re
+import threading
+import time
+
+# Event kinds raised by the default patterns
+server_ready = "server_ready"
+player_joined = "player_joined"
+player_left = "player_left"
+world_saved = "world_saved"
+server_crashed = "server_crashed"
+
+# (kind, pattern) pairs for the ARK: Survival Ascended server log
+_player = r"(?:\d{4}\.\d\d\.\d\d_\d\d\.\d\d\.\d\d:\s*)?(?P<player>[^\[\]]+?)\s*(?:\[UniqueNetId:(?P<player_id>\w+)[^\]]*\]\s*)?"
+default_patterns = [
+    (server_ready, r"Server has completed startup and is now advertising for join"),
+    (player_joined, _player + "joined this ARK!"),
+    (player_left, _player + "left this ARK!"),
+    (world_saved, r"World Save Complete"),
+    (server_crashed, r"Fatal error!?(?P<reason>.*)"),
+    (server_crashed, r"Unhandled Exception:?(?P<reason>.*)"),
+    (server_crashed, r"appError called:?(?P<reason>.*)"),
+]
+
+# Shorter literals than this are too common to be a useful filter
+min_keyword_length = 4
+
+
+class LogEvent:
+    __slots__ = ("kind", "line", "fields", "time", "source")
+
+    def __init__(self, kind, line, fields, event_time, source=None):
+        self.kind = kind
+        self.line = line
+        self.fields = fields
+        self.time = event_time
+        self.source = source
+
+    def __repr__(self):
+        return f"LogEvent({self.kind!r}, {self.fields!r})"
+
+
+def _escape_length(pattern, i):
+    # Length of the escape at pattern[i], "\x41", "\u00e9", "\N{name}" and "\12" are longer than two characters
+    escaped = pattern[i + 1:i + 2]
+    if escaped == "x":
+        return 4
+    if escaped == "u":
+        return 6
+    if escaped == "U":
+        return 10
+    if escaped == "N" and pattern[i + 2:i + 3] == "{":
+        end = pattern.find("}", i)
+        return end + 1 - i if end != -1 else len(pattern) - i
+    if escaped.isdigit():
+        end = i + 2
+        while end < len(pattern) and end < i + 4 and pattern[end].isdigit():
+            end += 1
+        return end - i
+    return 2
+
+
+def required_literal(pattern):
+    # Longest run of plain text that every match of the pattern has to contain. Only text outside of
+    # groups counts (a group may be optional), and a top level "|" means there is no single such text.
+    runs = []
+    run = ""
+    depth = 0
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "\\":
+            escaped = pattern[i + 1:i + 2]
+            if depth == 0 and escaped and not escaped.isalnum():
+                run += escaped
+                i += 2
+                continue
+            runs.append(run)
+            run = ""
+            i += _escape_length(pattern, i)
+            continue
+        if char == "[":
+            # Skip the character class, "]" right after "[" or "[^" is part of it
+            i += 2 if pattern[i + 1:i + 2] == "^" else 1
+            i += 1 if pattern[i:i + 1] == "]" else 0
+            while i < len(pattern) and pattern[i] != "]":
+                i += 2 if pattern[i] == "\\" else 1
+            runs.append(run)
+            run = ""
+            i += 1
+            continue
+        if char in "*?{" and run:
+            # The quantified character is optional
+            run = run[:-1]
+        if char == "{":
+            runs.append(run)
+            run = ""
+            i = pattern.find("}", i) + 1 or len(pattern)
+            continue
+        if char == "|" and depth == 0:
+            return None
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        if char in ".^$*+?{}()|" or depth > 0:
+            runs.append(run)
+            run = ""
+        else:
+            run += char
+        i += 1
+    runs.append(run)
+    longest = max(runs, key=len)
+    return longest if len(longest) >= min_keyword_length else None
+
+
+def trie_regex(words):
+    # "joined this ARK!", "joined the game" -> joined\ th(?:is\ ARK!|e\ game), so a line is scanned once
+    # however many words there are, instead of trying every alternative at every position
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def emit(node):
+        alternatives = [re.escape(char) + emit(child) for char, child in sorted(node.items()) if char]
+        if not alternatives:
+            return ""
+        body = alternatives[0] if len(alternatives) == 1 else "(?:" + "|".join(alternatives) + ")"
+        return f"(?:{body})?" if "" in node else body
+
+    return emit(trie)
+
+
+class LogPattern:
+    def __init__(self, kind, pattern, keyword=None, ignore_case=False):
+        self.kind = kind
+        self.pattern = pattern
+        self.regex = re.compile(pattern, re.IGNORECASE if ignore_case else 0)
+        # Case insensitive patterns (including inline (?i)) can't use the case sensitive keyword filter, and in
+        # verbose patterns ((?x)) whitespace and comments aren't literal text, so only an explicit keyword is used
+        if self.regex.flags & re.IGNORECASE:
+            self.keyword = None
+        elif self.regex.flags & re.VERBOSE:
+            self.keyword = keyword
+        else:
+            self.keyword = keyword or required_literal(pattern)
+
+
+class LogEventEngine:
+    # Turns server output lines into typed events. All registered patterns are checked in one pass:
+    # a single regex built from every pattern's required text finds which (few) patterns could match,
+    # and only those run. Subscribers are called on the reader thread, so they must be quick.
+    def __init__(self, patterns=default_patterns, source=None):
+        self.source = source
+        self.patterns = []
+        self.subscribers = []
+        self.lock = threading.Lock()
+        self.compiled = (None, {}, [])
+        self.lines = 0
+        self.events = 0
+        self.busy_seconds = 0.0
+        self.max_line_seconds = 0.0
+        self.subscriber_errors = 0
+        for kind, pattern in patterns:
+            self.register(kind, pattern, rebuild=False)
+        self.__rebuild()
+
+    def register(self, kind, pattern, keyword=None, ignore_case=False, rebuild=True):
+        entry = LogPattern(kind, pattern, keyword, ignore_case)
+        with self.lock:
+            self.patterns.append(entry)
+        if rebuild:
+            self.__rebuild()
+        return entry
+
+    def unregister(self, kind):
+        with self.lock:
+            self.patterns = [entry for entry in self.patterns if entry.kind != kind]
+        self.__rebuild()
+
+    def subscribe(self, callback, kinds=None):
+        # kinds=None gets every event
+        with self.lock:
+            self.subscribers = self.subscribers + [(callback, set(kinds) if kinds else None)]
+        return callback
+
+    def unsubscribe(self, callback):
+        with self.lock:
+            self.subscribers = [(subscriber, kinds) for subscriber, kinds in self.subscribers if subscriber is not callback]
+
+    def __rebuild(self):
+        with self.lock:
+            by_keyword = {}
+            always = []
+            for entry in self.patterns:
+                if entry.keyword:
+                    by_keyword.setdefault(entry.keyword, []).append(entry)
+                else:
+                    always.append(entry)
+
+            # The trie prefers the longest keyword, so a hit also has to try the keywords it starts with
+            candidates = {}
+            for keyword in by_keyword:
+                candidates[keyword] = [
+                    entry for other, entries in by_keyword.items() if keyword.startswith(other) for entry in entries
+                ]
+            # A lookahead consumes nothing, so the trie is tried at every position and keywords inside or
+            # overlapping another one ("this ARK" in "joined this ARK!") are still found
+            finder = re.compile("(?=(" + trie_regex(by_keyword) + "))") if by_keyword else None
+            # Swapped in one assignment, feed() never sees a half built state
+            self.compiled = (finder, candidates, always)
+
+    def feed(self, line, timestamp=None):
+        start = time.perf_counter()
+        finder, candidates, always = self.compiled
+
+        entries = []
+        if finder:
+            found = set()
+            for match in finder.finditer(line):
+                keyword = match.group(1)
+                if keyword in found:
+                    continue
+                found.add(keyword)
+                for entry in candidates[keyword]:
+                    if entry not in entries:
+                        entries.append(entry)
+        entries.extend(always)
+
+        events = []
+        for entry in entries:
+            match = entry.regex.search(line)
+            if match:
+                fields = {name: value.strip() for name, value in match.groupdict().items() if value is not None}
+                events.append(LogEvent(entry.kind, line, fields, timestamp or time.time(), self.source))
+
+        if events:
+            subscribers = self.subscribers
+            for event in events:
+                for callback, kinds in subscribers:
+                    if kinds is None or event.kind in kinds:
+                        try:
+                            callback(event)
+                        except Exception:
+                            # A broken subscriber must not stop the server's output from being read
+                            self.subscriber_errors += 1
+
+        elapsed = time.perf_counter() - start
+        self.lines += 1
+        self.events += len(events)
+        self.busy_seconds += elapsed
+        if elapsed > self.max_line_seconds:
+            self.max_line_seconds = elapsed
+        return events
+
+    def stats(self):
+        return {
+            "lines": self.lines,
+            "events": self.events,
+            "patterns": len(self.patterns),
+            "mean_line_seconds": self.busy_seconds / self.lines if self.lines else 0.0,
+            "max_line_seconds": self.max_line_seconds,
+            "subscriber_errors": self.subscriber_errors,
+        }
+
+
+class PlayerList:
+    # Who is online, kept up to date from join/leave events
+    def __init__(self):
+        self.players = {}
+        self.lock = threading.Lock()
+
+    def on_event(self, event):
+        player = event.fields.get("player")
+        if not player:
+            return
+        with self.lock:
+            if event.kind == player_joined:
+                self.players[player] = event.time
+            elif event.kind == player_left:
+                self.players.pop(player, None)
+
+    def clear(self):
+        with self.lock:
+            self.players.clear()
+
+    def names(self):
+        with self.lock:
+            return sorted(self.players)
+
+    def __len__(self):
+        return len(self.players)
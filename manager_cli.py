@@ -0,0 +1,442 @@
+import argparse
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+
+# Keep the imports here light: PyQt5 is only imported by the "gui" command
+
+
+class PrintSink:
+    # Stands in for the GUI's LogBuffer
+    def push(self, line):
+        print(line, flush=True)
+
+
+def _prefs_with_overrides(args):
+    from profile_store import ProfileStore
+
+    store = ProfileStore(args.store).load()
+    prefs = store.get_prefs(args.profile) or {}
+    if args.profile and not prefs:
+        raise SystemExit(f"No profile named '{args.profile}'. Saved profiles: {', '.join(store.names()) or 'none'}")
+    if args.install_path:
+        prefs["ArkServerInstall"] = args.install_path
+    if args.steam_cmd:
+        prefs["SteamCMD"] = args.steam_cmd
+    if args.shared_install:
+        prefs["SharedInstall"] = args.shared_install
+    if args.rcon_port:
+        prefs["ServerRCONPort"] = args.rcon_port
+    if args.password:
+        prefs["ServerAdminPassword"] = args.password
+    return prefs
+
+
+def _require(prefs, *keys):
+    missing = [key for key in keys if not prefs.get(key)]
+    if missing:
+        raise SystemExit(f"Missing settings: {', '.join(missing)} (save them in a GUI profile or pass them as options)")
+
+
+def _rcon_command(prefs, command):
+    from rcon import default_pool
+
+    _require(prefs, "ServerRCONPort", "ServerAdminPassword")
+    return default_pool.command(prefs.get("RconHost", "127.0.0.1"), prefs["ServerRCONPort"], prefs["ServerAdminPassword"], command)
+
+
+def command_profiles(args):
+    from profile_store import ProfileStore
+
+    store = ProfileStore(args.store).load()
+    for name in store.names():
+        install_path = store.get(name).get("ArkServerInstall", "")
+        print(f"{'*' if name == store.active else ' '} {name}    {install_path}")
+    return 0
+
+
+def command_gui(args):
+    import ASAServerManager
+    ASAServerManager.main()
+    return 0
+
+
+def command_install(args):
+    from server_config import run_setup_script, create_start_bat_content, create_game_user_settings_template
+
+    prefs = _prefs_with_overrides(args)
+    _require(prefs, "SteamCMD", "ArkServerInstall", "ServerName", "ServerAdminPassword", "ServerPort", "ServerQueryPort", "ServerMaxPlayers")
+    install_path = prefs["ArkServerInstall"]
+    return run_setup_script(
+        PrintSink(), prefs["SteamCMD"], install_path,
+        create_start_bat_content(install_path, prefs), create_game_user_settings_template(prefs),
+        shared_path=prefs.get("SharedInstall")
+    )
+
+
+def command_stage(args):
+    from staged_update import stage_update
+
+    prefs = _prefs_with_overrides(args)
+    _require(prefs, "SteamCMD", "ArkServerInstall")
+    return stage_update(PrintSink(), prefs["SteamCMD"], prefs["ArkServerInstall"])
+
+
+def _server_answers_rcon(prefs):
+    from rcon import RconError
+
+    if not (prefs.get("ServerRCONPort") and prefs.get("ServerAdminPassword")):
+        return False
+    try:
+        _rcon_command(prefs, "ListPlayers")
+    except (OSError, RconError):
+        return False
+    return True
+
+
+def command_switch(args):
+    from staged_update import StagedUpdateError, switch_builds
+
+    prefs = _prefs_with_overrides(args)
+    _require(prefs, "ArkServerInstall")
+    if _server_answers_rcon(prefs):
+        print("The server is running, stop it first (manager_cli.py stop), then switch builds.")
+        return 1
+    try:
+        print(switch_builds(prefs["ArkServerInstall"], rollback=args.rollback))
+    except StagedUpdateError as e:
+        print(e)
+        return 1
+    return 0
+
+
+def _daemon_client():
+    # The running background manager, or None
+    from manager_daemon import DaemonError, connect_daemon
+
+    try:
+        return connect_daemon()
+    except DaemonError:
+        return None
+
+
+def _daemon_owns(client, install_path):
+    return any(status["name"] == install_path for status in client.request("status")["servers"])
+
+
+def command_start(args):
+    from server_supervisor import start_bat_path
+
+    prefs = _prefs_with_overrides(args)
+    _require(prefs, "ArkServerInstall")
+    bat_path = start_bat_path(prefs["ArkServerInstall"])
+    if not os.path.isfile(bat_path):
+        print(f"Server start.bat file not found at {bat_path}! Install/Update server first.")
+        return 1
+
+    if args.background_manager:
+        return _start_in_daemon(prefs)
+
+    # Detached, so the server keeps running after this command exits
+    if os.name == "nt":
+        subprocess.Popen(
+            bat_path, shell=True, cwd=prefs["ArkServerInstall"],
+            creationflags=subprocess.CREATE_NEW_PROCESS_GROUP | subprocess.DETACHED_PROCESS
+        )
+    else:
+        subprocess.Popen(bat_path, shell=True, cwd=prefs["ArkServerInstall"], start_new_session=True)
+    print(f"Started server from {bat_path}.")
+    return 0
+
+
+def _start_in_daemon(prefs):
+    from manager_daemon import DaemonError, connect_daemon
+
+    install_path = prefs["ArkServerInstall"]
+    try:
+        client = connect_daemon(spawn=True)
+        status = client.request(
+            "start", server=install_path, install_path=install_path,
+            ports={"port": prefs.get("ServerPort"), "query_port": prefs.get("ServerQueryPort"), "rcon_port": prefs.get("ServerRCONPort")},
+            label=os.path.basename(os.path.normpath(install_path)) or install_path,
+            auto_restart=prefs.get("AutoRestart") == "True",
+            rcon_port=prefs.get("ServerRCONPort") or None, rcon_password=prefs.get("ServerAdminPassword") or None
+        )
+    except DaemonError as e:
+        print(f"Could not start the server in the background manager: {e}")
+        return 1
+    print(f"Started server at {install_path} in the background manager (pid {status.get('pid')}).")
+    return 0
+
+
+def command_stop(args):
+    from manager_daemon import DaemonError
+    from rcon import RconError
+
+    prefs = _prefs_with_overrides(args)
+    client = _daemon_client()
+    if client and prefs.get("ArkServerInstall") and _daemon_owns(client, prefs["ArkServerInstall"]):
+        try:
+            if args.message:
+                client.request("rcon", server=prefs["ArkServerInstall"], command=f"broadcast {args.message}")
+            client.request("stop", server=prefs["ArkServerInstall"])
+        except DaemonError as e:
+            print(f"Could not stop the server: {e}")
+            return 1
+        print("Server stopped by the background manager.")
+        return 0
+    try:
+        if args.message:
+            _rcon_command(prefs, f"broadcast {args.message}")
+        _rcon_command(prefs, "SaveWorld")
+        _rcon_command(prefs, "DoExit")
+    except (OSError, RconError) as e:
+        print(f"Could not stop the server over RCON: {e}")
+        return 1
+    print("Server saved and told to exit.")
+    return 0
+
+
+def command_status(args):
+    from rcon import RconError
+    from steam_update import installed_build_id, load_update_state
+
+    prefs = _prefs_with_overrides(args)
+    _require(prefs, "ArkServerInstall")
+    install_path = prefs["ArkServerInstall"]
+    state = load_update_state(install_path)
+
+    print(f"Install path:    {install_path}")
+    print(f"Installed build: {installed_build_id(install_path) or 'not installed'}")
+    print(f"Latest known:    {state.get('latest_build_id', 'unknown')}")
+
+    if prefs.get("ServerRCONPort") and prefs.get("ServerAdminPassword"):
+        try:
+            players = _rcon_command(prefs, "ListPlayers").strip()
+            print("Server:          running (RCON reachable)")
+            print(players or "No players connected.")
+        except (OSError, RconError) as e:
+            print(f"Server:          not reachable over RCON ({e})")
+            return 1
+    else:
+        print("Server:          unknown (no RCON port/password set)")
+    return 0
+
+
+def command_daemon(args):
+    from manager_daemon import DaemonError, ManagerDaemon
+
+    client = _daemon_client()
+    if args.shutdown:
+        if client is None:
+            print("The background manager is not running.")
+            return 1
+        try:
+            client.request("shutdown")
+        except DaemonError as e:
+            print(f"Could not shut the background manager down: {e}")
+            return 1
+        print("The background manager stopped its servers and exited.")
+        return 0
+    if client:
+        print("The background manager is already running.")
+        return 1
+
+    daemon = ManagerDaemon()
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # Servers don't outlive the manager that owns them
+        daemon.watchdog.stop()
+        daemon.supervisor.stop_all()
+    return 0
+
+
+def command_logs(args):
+    from manager_daemon import DaemonError
+
+    prefs = _prefs_with_overrides(args)
+    _require(prefs, "ArkServerInstall")
+    install_path = prefs["ArkServerInstall"]
+    client = _daemon_client()
+    if client is None:
+        print("The background manager is not running.")
+        return 1
+
+    def print_lines(server, lines):
+        print("\n".join(lines), flush=True)
+
+    try:
+        subscribed = client.follow(install_path, print_lines, since=args.since)
+    except DaemonError as e:
+        print(e)
+        return 1
+    try:
+        if args.follow:
+            while client.connected:
+                time.sleep(0.5)
+        else:
+            # Prints what the daemon has kept so far, then exits
+            while client.connected and client.follows[install_path][0] < subscribed["next_seq"]:
+                time.sleep(0.05)
+    except KeyboardInterrupt:
+        pass
+    client.close()
+    return 0
+
+
+def command_edit_setting(args):
+    from ini_model import load_ini, save_ini, settings_file_path
+
+    prefs = _prefs_with_overrides(args)
+    _require(prefs, "ArkServerInstall")
+    path = settings_file_path(prefs["ArkServerInstall"], args.file)
+    if not os.path.isfile(path):
+        print(f"Cannot find {args.file} at {path}")
+        return 1
+
+    settings = load_ini(path)
+    if args.value is None:
+        values = settings.get_all(args.section, args.key)
+        if not values:
+            print(f"{args.key} is not set in [{args.section}]")
+            return 1
+        for value in values:
+            print(value)
+        return 0
+
+    settings.set(args.section, args.key, args.value)
+    if save_ini(path, settings):
+        print(f"Set [{args.section}] {args.key}={args.value} in {args.file}")
+    else:
+        print(f"[{args.section}] {args.key} was already {args.value}")
+    return 0
+
+
+def command_backup(args):
+    from backup import BackupError, backup_server
+
+    prefs = _prefs_with_overrides(args)
+    _require(prefs, "ArkServerInstall")
+    try:
+        _, lines = backup_server(
+            prefs["ArkServerInstall"], label=args.label, keep_last=args.keep_last, keep_daily=args.keep_daily
+        )
+    except BackupError as e:
+        print(e)
+        return 1
+    for line in lines:
+        print(line)
+    return 0
+
+
+def command_backups(args):
+    from backup import BackupStore, backup_dir
+
+    prefs = _prefs_with_overrides(args)
+    _require(prefs, "ArkServerInstall")
+    store = BackupStore(backup_dir(prefs["ArkServerInstall"]))
+    snapshots = store.snapshots()
+    for snapshot_id in snapshots:
+        print(store.describe(snapshot_id))
+    print(f"{len(snapshots)} backups using {store.store_bytes() / 1024 ** 2:.1f} MB")
+    return 0
+
+
+def command_restore(args):
+    from backup import BackupError, BackupStore, backup_dir
+
+    prefs = _prefs_with_overrides(args)
+    _require(prefs, "ArkServerInstall")
+    store = BackupStore(backup_dir(prefs["ArkServerInstall"]))
+    try:
+        stats = store.restore(args.snapshot, safety_snapshot=not args.no_safety_backup)
+    except BackupError as e:
+        print(e)
+        return 1
+    print(
+        f"Restored {args.snapshot}: {stats['restored_files']} files written, {stats['removed_files']} removed, "
+        f"{stats['written_bytes'] / 1024 ** 2:.1f} MB in {stats['seconds']:.1f}s."
+    )
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="ARK: Survival Ascended server manager. Opens the GUI when no command is given.")
+    parser.add_argument("--profile", help="Saved server profile to use (defaults to the last one used in the GUI)")
+    parser.add_argument("--store", help="Profile store file (defaults to the per-user profiles.json)")
+    parser.add_argument("--install-path", help="ARK server install path (overrides the profile)")
+    parser.add_argument("--steam-cmd", help="SteamCMD path (overrides the profile)")
+    parser.add_argument("--shared-install", help="Shared game files path to link the server to (overrides the profile)")
+    parser.add_argument("--rcon-port", help="RCON port (overrides the profile)")
+    parser.add_argument("--password", help="Admin password used for RCON (overrides the profile)")
+    commands = parser.add_subparsers(dest="command")
+
+    commands.add_parser("gui", help="Open the manager window").set_defaults(handler=command_gui)
+    commands.add_parser("profiles", help="List saved server profiles").set_defaults(handler=command_profiles)
+    commands.add_parser("install", help="Install or update the server").set_defaults(handler=command_install)
+    start = commands.add_parser("start", help="Start the server in the background")
+    start.add_argument(
+        "--background-manager", action="store_true",
+        help="Run it under the background manager, which keeps its output and can restart it"
+    )
+    start.set_defaults(handler=command_start)
+    commands.add_parser(
+        "stage", help="Update a second copy of the game files, the running server is left alone"
+    ).set_defaults(handler=command_stage)
+
+    switch = commands.add_parser("switch", help="Switch a stopped server to the staged build")
+    switch.add_argument("--rollback", action="store_true", help="Switch back to the build it replaced instead")
+    switch.set_defaults(handler=command_switch)
+
+    stop = commands.add_parser("stop", help="Save the world and shut the server down over RCON")
+    stop.add_argument("--message", help="Broadcast this message before stopping")
+    stop.set_defaults(handler=command_stop)
+
+    commands.add_parser("status", help="Show installed build and whether the server answers RCON").set_defaults(handler=command_status)
+
+    daemon = commands.add_parser("daemon", help="Run the background manager that owns servers started in the background")
+    daemon.add_argument("--shutdown", action="store_true", help="Stop the running background manager and its servers")
+    daemon.set_defaults(handler=command_daemon)
+
+    logs = commands.add_parser("logs", help="Print the output of a server run by the background manager")
+    logs.add_argument("--follow", action="store_true", help="Keep printing new lines until interrupted")
+    logs.add_argument("--since", type=int, default=0, help="Start at this line number (0 is the oldest line still kept)")
+    logs.set_defaults(handler=command_logs)
+
+    backup = commands.add_parser("backup", help="Back up ShooterGame/Saved and prune old backups")
+    backup.add_argument("--label", help="Note stored with the backup")
+    backup.add_argument("--keep-last", type=int, default=24, help="Always keep this many of the newest backups")
+    backup.add_argument("--keep-daily", type=int, default=14, help="Also keep the newest backup of each of this many days")
+    backup.set_defaults(handler=command_backup)
+
+    commands.add_parser("backups", help="List backups").set_defaults(handler=command_backups)
+
+    restore = commands.add_parser("restore", help="Restore ShooterGame/Saved from a backup (stop the server first)")
+    restore.add_argument("snapshot", help="Backup name as shown by the backups command")
+    restore.add_argument("--no-safety-backup", action="store_true", help="Don't back up the current files before restoring")
+    restore.set_defaults(handler=command_restore)
+
+    edit = commands.add_parser("edit-setting", help="Show or change a value in GameUserSettings.ini/Game.ini")
+    edit.add_argument("file", choices=["GameUserSettings.ini", "Game.ini"])
+    edit.add_argument("section", help="Section name without brackets, e.g. ServerSettings")
+    edit.add_argument("key")
+    edit.add_argument("value", nargs="?", help="New value, omit to print the current one")
+    edit.set_defaults(handler=command_edit_setting)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    handler = getattr(args, "handler", command_gui)
+    return handler(args)
+
+
+if __name__ == "__main__":
+    # Needed for the integrity scanner's process pool in the PyInstaller build
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,542 @@
+import asyncio
+import json
+import os
+import secrets
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from itertools import islice
+
+from log_archive import LogArchive, archive_dir
+from log_events import server_ready, player_joined, player_left
+from profile_store import user_data_dir
+from rcon import default_pool
+from server_supervisor import ServerSupervisor, graceful_stop
+from server_watchdog import Watchdog, watchdog_state_path
+
+# The daemon owns the server processes so they keep running when the window closes or crashes.
+# Clients (the window, the CLI) talk to it with JSON lines over a localhost socket:
+#   request  {"id": 1, "cmd": "start", "args": {...}}
+#   reply    {"id": 1, "ok": true, "result": ...} or {"id": 1, "ok": false, "error": "..."}
+#   events   {"event": "log", "server": ..., "seq": 120, "lines": [...]}, {"event": "status", ...}
+# Every output line gets a sequence number, so a client that reconnects asks for the lines after
+# the last one it saw and misses nothing that is still in the history.
+
+protocol_version = 1
+# Lines kept per server for clients that attach later
+history_max_lines = 20000
+# New output is sent to clients in batches this often
+flush_interval = 0.05
+# A client catching up gets at most this many old lines per flush, so it can't starve the others
+catch_up_batch = 2000
+# A client that doesn't read its socket gets no more lines until its send buffer drains
+client_buffer_limit = 4 * 1024 * 1024
+# Messages from the daemon itself (watchdog restarts, ...)
+manager_channel = "manager"
+
+
+class DaemonError(Exception):
+    pass
+
+
+def daemon_state_path():
+    return os.path.join(user_data_dir(), "daemon.json")
+
+
+def load_daemon_state(path=None):
+    try:
+        with open(path or daemon_state_path(), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _save_daemon_state(path, state):
+    # Holds the access token, so only the current user can read it
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = path + ".tmp"
+    fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(temp_path, path)
+
+
+def _log_message(server, seq, encoded_lines):
+    # Lines are JSON encoded once when they arrive, a batch is just joined around them
+    return ('{"event": "log", "server": %s, "seq": %d, "lines": [%s]}\n' % (
+        json.dumps(server), seq, ", ".join(encoded_lines)
+    )).encode("utf-8")
+
+
+def _message(data):
+    return (json.dumps(data) + "\n").encode("utf-8")
+
+
+class LogHistory:
+    # Numbered output of one server. Reader threads push, the daemon's loop collects and sends.
+    def __init__(self, max_lines=history_max_lines):
+        self.lines = deque(maxlen=max_lines)
+        self.next_seq = 0
+        self.pending = []
+        self.lock = threading.Lock()
+
+    def push(self, line):
+        encoded = json.dumps(line)
+        with self.lock:
+            self.pending.append(encoded)
+
+    def collect(self):
+        # Numbers the lines pushed since the last call, returns (first seq, encoded lines)
+        with self.lock:
+            new, self.pending = self.pending, []
+        first = self.next_seq
+        self.lines.extend(new)
+        self.next_seq += len(new)
+        return first, new
+
+    def first_seq(self):
+        return self.next_seq - len(self.lines)
+
+    def since(self, seq, limit):
+        start = max(seq, self.first_seq())
+        index = start - self.first_seq()
+        return start, list(islice(self.lines, index, index + limit))
+
+
+class DaemonClientState:
+    # One connected client: where it is in each log it follows
+    def __init__(self, writer):
+        self.writer = writer
+        self.cursors = {}
+        self.authenticated = False
+
+    def write(self, data):
+        if not self.writer.is_closing():
+            self.writer.write(data)
+
+    def reply(self, request, result=None, error=None):
+        if error is None:
+            self.write(_message({"id": request.get("id"), "ok": True, "result": result}))
+        else:
+            self.write(_message({"id": request.get("id"), "ok": False, "error": error}))
+
+    def backlogged(self):
+        transport = self.writer.transport
+        return transport is None or transport.get_write_buffer_size() > client_buffer_limit
+
+
+class ManagerDaemon:
+    def __init__(self, host="127.0.0.1", port=0, state_path=None, supervisor=None, watchdog=None):
+        self.host = host
+        self.port = port
+        self.state_path = state_path or daemon_state_path()
+        self.token = secrets.token_hex(16)
+        self.supervisor = supervisor or ServerSupervisor()
+        self.histories = {manager_channel: LogHistory()}
+        self.watchdog = watchdog or Watchdog(log=self.log)
+        self.rcon = {}
+        self.clients = set()
+        self.changed = set()
+        self.lock = threading.Lock()
+        self.ready = threading.Event()
+        self.loop = None
+        self.stopped = None
+        self.thread = None
+        self.commands = {
+            "status": self.__status,
+            "start": self.__start_server,
+            "stop": self.__stop_server,
+            "rcon": self.__rcon,
+            "subscribe": self.__subscribe,
+            "unsubscribe": self.__unsubscribe,
+            "shutdown": self.__shutdown,
+        }
+
+    def log(self, line):
+        self.histories[manager_channel].push(line)
+
+    def serve_forever(self):
+        asyncio.run(self.__serve())
+
+    def start(self):
+        # Serves on a background thread, returns once clients can connect
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        self.ready.wait(10)
+        return self
+
+    def stop(self):
+        # Nothing to do when a client already shut the daemon down
+        if self.loop and self.stopped and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self.stopped.set)
+        if self.thread:
+            self.thread.join(10)
+
+    async def __serve(self):
+        self.loop = asyncio.get_running_loop()
+        self.stopped = asyncio.Event()
+        server = await asyncio.start_server(self.__handle_client, self.host, self.port, limit=1024 * 1024)
+        self.port = server.sockets[0].getsockname()[1]
+        _save_daemon_state(self.state_path, {"port": self.port, "token": self.token, "pid": os.getpid()})
+        self.watchdog.start()
+        self.log(f"Manager daemon listening on {self.host}:{self.port}")
+        self.ready.set()
+
+        flusher = asyncio.create_task(self.__flush_loop())
+        try:
+            await self.stopped.wait()
+        finally:
+            flusher.cancel()
+            server.close()
+            for client in list(self.clients):
+                client.writer.close()
+            self.watchdog.stop()
+            state = load_daemon_state(self.state_path)
+            if state and state.get("token") == self.token:
+                os.remove(self.state_path)
+
+    async def __handle_client(self, reader, writer):
+        client = DaemonClientState(writer)
+        try:
+            while True:
+                raw = await reader.readline()
+                if not raw:
+                    break
+                try:
+                    request = json.loads(raw)
+                except ValueError:
+                    client.reply({}, error="Requests must be JSON, one per line")
+                    continue
+
+                if not client.authenticated:
+                    # The token from the state file proves the client runs as the same user
+                    token = str(request.get("args", {}).get("token", ""))
+                    if request.get("cmd") != "hello" or not secrets.compare_digest(token, self.token):
+                        client.reply(request, error="Send hello with the daemon's token first")
+                        break
+                    client.authenticated = True
+                    self.clients.add(client)
+                    client.reply(request, {"version": protocol_version, "pid": os.getpid()})
+                    continue
+                # Slow commands (a graceful stop takes minutes) don't hold up the client's other requests
+                asyncio.create_task(self.__respond(client, request))
+        except (ConnectionError, ValueError):
+            pass
+        except asyncio.CancelledError:
+            # The daemon is shutting down
+            pass
+        finally:
+            self.clients.discard(client)
+            writer.close()
+
+    async def __respond(self, client, request):
+        handler = self.commands.get(request.get("cmd"))
+        if handler is None:
+            client.reply(request, error=f"Unknown command '{request.get('cmd')}'")
+            return
+        try:
+            result = await handler(client, **request.get("args", {}))
+        except Exception as e:
+            client.reply(request, error=str(e) or e.__class__.__name__)
+            return
+        client.reply(request, result)
+
+    def __instance(self, server):
+        instance = self.supervisor.get(server)
+        if instance is None:
+            raise DaemonError(f"Unknown server '{server}'")
+        return instance
+
+    def __changed(self, server):
+        with self.lock:
+            self.changed.add(server)
+
+    def __add_server(self, server, install_path, command, ports, label):
+        instance = self.supervisor.add(server, install_path, command=command, ports=ports, label=label)
+        history = LogHistory()
+        self.histories[server] = history
+        instance.listeners.append(history.push)
+        instance.on_start.append(lambda started: self.__changed(started.name))
+        instance.on_exit.append(lambda exited: self.__changed(exited.name))
+        # Clients show readiness and player counts without polling
+        instance.events.subscribe(lambda event: self.__changed(server), (server_ready, player_joined, player_left))
+        try:
+            archive = LogArchive(archive_dir(install_path))
+            instance.listeners.append(archive.append)
+            instance.on_exit.append(lambda _: archive.close())
+        except OSError as e:
+            self.log(f"Server log archive unavailable for {server}: {e}")
+        return instance
+
+    def __server_status(self, instance):
+        status = instance.status()
+        status["label"] = instance.label
+        status["install_path"] = instance.install_path
+        status["next_seq"] = self.histories[instance.name].next_seq
+        status["watchdog"] = self.watchdog.status(instance.name)
+        return status
+
+    async def __status(self, client):
+        with self.supervisor.lock:
+            instances = list(self.supervisor.instances.values())
+        return {"pid": os.getpid(), "servers": [self.__server_status(instance) for instance in instances]}
+
+    async def __start_server(self, client, server, install_path, command=None, ports=None, label=None,
+                             auto_restart=False, rcon_port=None, rcon_password=None):
+        instance = self.supervisor.get(server)
+        if instance is None:
+            instance = self.__add_server(server, install_path, command, ports, label)
+        elif ports:
+            instance.ports = ports
+
+        probe = None
+        if rcon_port and rcon_password:
+            self.rcon[server] = (rcon_port, rcon_password)
+            probe = lambda: default_pool.command("127.0.0.1", rcon_port, rcon_password, "ListPlayers")
+        if auto_restart:
+            self.watchdog.watch(instance, probe=probe, state_path=watchdog_state_path(install_path))
+        else:
+            self.watchdog.unwatch(server)
+
+        await asyncio.to_thread(instance.start)
+        return self.__server_status(instance)
+
+    async def __stop_server(self, client, server, timeout=120):
+        instance = self.__instance(server)
+        self.watchdog.unwatch(server)
+        rcon = self.rcon.get(server)
+        if rcon:
+            send_command = lambda command: default_pool.command("127.0.0.1", rcon[0], rcon[1], command)
+            await asyncio.to_thread(graceful_stop, instance, send_command, timeout)
+        else:
+            await asyncio.to_thread(instance.stop)
+        return self.__server_status(instance)
+
+    async def __rcon(self, client, server, command):
+        rcon = self.rcon.get(server)
+        if not rcon:
+            raise DaemonError(f"No RCON port/password known for '{server}', start it with them")
+        return await asyncio.to_thread(default_pool.command, "127.0.0.1", rcon[0], rcon[1], command)
+
+    async def __subscribe(self, client, server, since=None):
+        # since=None follows new lines only, since=0 replays everything still in the history first
+        history = self.histories.get(server)
+        if history is None:
+            raise DaemonError(f"Unknown server '{server}'")
+        client.cursors[server] = history.next_seq if since is None else max(0, int(since))
+        return {"first_seq": history.first_seq(), "next_seq": history.next_seq}
+
+    async def __unsubscribe(self, client, server):
+        client.cursors.pop(server, None)
+        return None
+
+    async def __shutdown(self, client):
+        # Servers are stopped (saved first when RCON is known) before the daemon goes
+        names = [instance.name for instance in self.supervisor.running()]
+        await asyncio.gather(*(self.__stop_server(client, name) for name in names))
+        # Late enough for the reply to go out
+        self.loop.call_later(0.2, self.stopped.set)
+        return None
+
+    async def __flush_loop(self):
+        while True:
+            self.flush()
+            await asyncio.sleep(flush_interval)
+
+    def flush(self):
+        with self.lock:
+            changed, self.changed = self.changed, set()
+        for server in changed:
+            instance = self.supervisor.get(server)
+            if instance:
+                message = _message({"event": "status", "server": server, "status": self.__server_status(instance)})
+                for client in list(self.clients):
+                    client.write(message)
+
+        for server, history in list(self.histories.items()):
+            first, new = history.collect()
+            # Built once and shared by every client that was up to date, which is almost all of them
+            broadcast = _log_message(server, first, new) if new else None
+            # Clients catching up from the same point (everyone who just reattached) share a batch too
+            catch_up = {}
+            for client in list(self.clients):
+                cursor = client.cursors.get(server)
+                if cursor is None or cursor >= history.next_seq or client.backlogged():
+                    continue
+                if broadcast and cursor == first:
+                    client.write(broadcast)
+                    client.cursors[server] = history.next_seq
+                    continue
+                if cursor < history.first_seq():
+                    client.write(_message({"event": "gap", "server": server, "missed": history.first_seq() - cursor}))
+                    cursor = history.first_seq()
+                if cursor not in catch_up:
+                    seq, lines = history.since(cursor, catch_up_batch)
+                    catch_up[cursor] = (seq + len(lines), _log_message(server, seq, lines))
+                client.cursors[server], message = catch_up[cursor]
+                client.write(message)
+
+
+class DaemonClient:
+    # Blocking client, requests can come from any thread. Log lines and status changes are handed to
+    # callbacks on the client's reader thread. connect() again after a lost connection resumes every
+    # followed log right after the last line received.
+    def __init__(self, state_path=None, timeout=150):
+        self.state_path = state_path
+        self.timeout = timeout
+        self.sock = None
+        self.lock = threading.Lock()
+        self.send_lock = threading.Lock()
+        self.pending = {}
+        self.next_id = 0
+        self.follows = {}
+        self.on_status = None
+        self.on_disconnect = None
+        self.connected = False
+
+    def connect(self):
+        state = load_daemon_state(self.state_path)
+        if not state:
+            raise DaemonError("The manager daemon is not running")
+        try:
+            self.sock = socket.create_connection(("127.0.0.1", state["port"]), timeout=5)
+        except OSError as e:
+            raise DaemonError(f"Cannot reach the manager daemon: {e}")
+        self.sock.settimeout(None)
+        self.connected = True
+        threading.Thread(target=self.__read, args=(self.sock,), daemon=True).start()
+
+        self.request("hello", token=state["token"])
+        for server, follow in list(self.follows.items()):
+            try:
+                self.request("subscribe", server=server, since=follow[0])
+            except DaemonError:
+                if not self.connected:
+                    raise
+                # A daemon that was restarted in the meantime doesn't know the old one's servers
+                self.follows.pop(server, None)
+        return self
+
+    def close(self):
+        self.connected = False
+        if self.sock:
+            try:
+                self.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self.sock.close()
+
+    def request(self, cmd, **args):
+        with self.lock:
+            self.next_id += 1
+            request_id = self.next_id
+            waiter = [threading.Event(), None]
+            self.pending[request_id] = waiter
+        data = (json.dumps({"id": request_id, "cmd": cmd, "args": args}) + "\n").encode("utf-8")
+        try:
+            with self.send_lock:
+                self.sock.sendall(data)
+        except (OSError, AttributeError) as e:
+            self.pending.pop(request_id, None)
+            raise DaemonError(f"Lost the connection to the manager daemon: {e}")
+
+        if not waiter[0].wait(self.timeout):
+            self.pending.pop(request_id, None)
+            raise DaemonError(f"The manager daemon didn't answer '{cmd}'")
+        response = waiter[1]
+        if response is None:
+            raise DaemonError("Lost the connection to the manager daemon")
+        if not response.get("ok"):
+            raise DaemonError(response.get("error"))
+        return response.get("result")
+
+    def follow(self, server, on_lines, since=None):
+        # on_lines(server, lines) is called on the reader thread
+        self.follows[server] = [since, on_lines]
+        result = self.request("subscribe", server=server, since=since)
+        if self.follows[server][0] is None:
+            self.follows[server][0] = result["next_seq"]
+        return result
+
+    def unfollow(self, server):
+        self.follows.pop(server, None)
+        self.request("unsubscribe", server=server)
+
+    def __read(self, sock):
+        try:
+            for raw in sock.makefile("rb"):
+                message = json.loads(raw)
+                if "id" in message:
+                    waiter = self.pending.pop(message["id"], None)
+                    if waiter:
+                        waiter[1] = message
+                        waiter[0].set()
+                elif message.get("event") == "log":
+                    self.__on_log(message)
+                elif message.get("event") == "gap":
+                    follow = self.follows.get(message["server"])
+                    if follow:
+                        follow[1](message["server"], [f"({message['missed']} older lines are no longer kept by the daemon)"])
+                elif message.get("event") == "status" and self.on_status:
+                    self.on_status(message["server"], message["status"])
+        except (OSError, ValueError):
+            pass
+        finally:
+            self.connected = False
+            for waiter in list(self.pending.values()):
+                waiter[0].set()
+            self.pending.clear()
+            if self.on_disconnect:
+                self.on_disconnect()
+
+    def __on_log(self, message):
+        follow = self.follows.get(message["server"])
+        if not follow:
+            return
+        seq, lines = message["seq"], message["lines"]
+        # A resubscribe can overlap what was already received, drop the repeats
+        if follow[0] is not None and seq < follow[0]:
+            lines = lines[follow[0] - seq:]
+        follow[0] = max(follow[0] or 0, seq + len(message["lines"]))
+        if lines:
+            follow[1](message["server"], lines)
+
+
+def daemon_command():
+    # The packaged exe runs the CLI when it gets arguments
+    if getattr(sys, "frozen", False):
+        return [sys.executable, "daemon"]
+    return [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "manager_cli.py"), "daemon"]
+
+
+def connect_daemon(spawn=False, timeout=15, state_path=None):
+    # Connects to the running daemon, or starts one in the background first when spawn is set
+    try:
+        return DaemonClient(state_path).connect()
+    except DaemonError:
+        if not spawn:
+            raise
+
+    popen_kwargs = {}
+    if os.name == "nt":
+        popen_kwargs["creationflags"] = (
+            subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP | getattr(subprocess, "CREATE_NO_WINDOW", 0)
+        )
+    else:
+        popen_kwargs["start_new_session"] = True
+    subprocess.Popen(
+        daemon_command(), stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        close_fds=True, **popen_kwargs
+    )
+
+    deadline = time.time() + timeout
+    while True:
+        time.sleep(0.2)
+        try:
+            return DaemonClient(state_path).connect()
+        except DaemonError:
+            if time.time() >= deadline:
+                raise DaemonError("The manager daemon didn't start")
@@ -0,0 +1,213 @@
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+default_metrics_port = 9797
+
+
+class Sample:
+    __slots__ = ("time", "cpu", "rss", "threads", "read_bytes", "write_bytes")
+
+    def __init__(self, sample_time, cpu, rss, threads, read_bytes, write_bytes):
+        self.time = sample_time
+        self.cpu = cpu
+        self.rss = rss
+        self.threads = threads
+        self.read_bytes = read_bytes
+        self.write_bytes = write_bytes
+
+
+class ServerMetrics:
+    def __init__(self, name, pid, started_at, history):
+        self.name = name
+        self.pid = pid
+        self.started_at = started_at
+        self.ready_at = None
+        self.samples = deque(maxlen=history)
+        self.processes = {}
+        self.ticks_since_refresh = None
+
+    def time_to_ready(self):
+        if self.ready_at is None:
+            return None
+        return self.ready_at - self.started_at
+
+    def latest(self):
+        return self.samples[-1] if self.samples else None
+
+
+class MetricsSampler:
+    # One thread samples every tracked server. Process handles are cached and the child process
+    # list is only re-walked every few ticks, so each tick costs about one oneshot() per process.
+    def __init__(self, interval=5.0, history=720, children_refresh_ticks=6):
+        self.interval = interval
+        self.history = history
+        self.children_refresh_ticks = children_refresh_ticks
+        self.servers = {}
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.last_tick_seconds = 0.0
+
+    @staticmethod
+    def available():
+        return psutil is not None
+
+    def track(self, name, pid, started_at=None):
+        with self.lock:
+            self.servers[name] = ServerMetrics(name, pid, started_at or time.time(), self.history)
+
+    def untrack(self, name):
+        with self.lock:
+            self.servers.pop(name, None)
+
+    def mark_ready(self, name, ready_at=None):
+        with self.lock:
+            server = self.servers.get(name)
+            if server and server.ready_at is None:
+                server.ready_at = ready_at or time.time()
+
+    def ready_subscriber(self, name):
+        # Log event subscriber that records time-to-ready from the server_ready event
+        def subscriber(event):
+            self.mark_ready(name, event.time)
+        return subscriber
+
+    def get(self, name):
+        with self.lock:
+            return self.servers.get(name)
+
+    def start(self):
+        if not self.available() or self.thread:
+            return False
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.__run, daemon=True)
+        self.thread.start()
+        return True
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=self.interval * 2)
+            self.thread = None
+
+    def __run(self):
+        while not self.stop_event.wait(self.interval):
+            start = time.perf_counter()
+            with self.lock:
+                servers = list(self.servers.values())
+            for server in servers:
+                self.sample(server)
+            self.last_tick_seconds = time.perf_counter() - start
+
+    def sample(self, server):
+        if server.ticks_since_refresh is None or server.ticks_since_refresh >= self.children_refresh_ticks:
+            self.__refresh_processes(server)
+            server.ticks_since_refresh = 0
+        server.ticks_since_refresh += 1
+
+        cpu = rss = threads = read_bytes = write_bytes = 0
+        for pid, process in list(server.processes.items()):
+            try:
+                with process.oneshot():
+                    cpu += process.cpu_percent(None)
+                    rss += process.memory_info().rss
+                    threads += process.num_threads()
+                    if hasattr(process, "io_counters"):
+                        counters = process.io_counters()
+                        read_bytes += counters.read_bytes
+                        write_bytes += counters.write_bytes
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                server.processes.pop(pid, None)
+
+        server.samples.append(Sample(time.time(), cpu, rss, threads, read_bytes, write_bytes))
+
+    def __refresh_processes(self, server):
+        try:
+            root = server.processes.get(server.pid) or psutil.Process(server.pid)
+            tree = [root] + root.children(recursive=True)
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            server.processes.clear()
+            return
+
+        processes = {}
+        for process in tree:
+            # Keep existing handles so cpu_percent keeps measuring from the previous tick
+            processes[process.pid] = server.processes.get(process.pid, process)
+        server.processes = processes
+
+    def render_text(self):
+        # Prometheus text exposition format
+        lines = [
+            "# HELP asa_server_cpu_percent CPU use of the server process tree.",
+            "# TYPE asa_server_cpu_percent gauge",
+            "# HELP asa_server_rss_bytes Resident memory of the server process tree.",
+            "# TYPE asa_server_rss_bytes gauge",
+            "# HELP asa_server_threads Thread count of the server process tree.",
+            "# TYPE asa_server_threads gauge",
+            "# HELP asa_server_read_bytes_total Bytes read by the server process tree.",
+            "# TYPE asa_server_read_bytes_total counter",
+            "# HELP asa_server_write_bytes_total Bytes written by the server process tree.",
+            "# TYPE asa_server_write_bytes_total counter",
+            "# HELP asa_server_uptime_seconds Time since the server was started.",
+            "# TYPE asa_server_uptime_seconds gauge",
+            "# HELP asa_server_time_to_ready_seconds Time from start to the server advertising for join.",
+            "# TYPE asa_server_time_to_ready_seconds gauge",
+        ]
+        now = time.time()
+        with self.lock:
+            servers = list(self.servers.values())
+
+        for server in servers:
+            label = '{server="%s"}' % server.name.replace("\\", "\\\\").replace('"', '\\"')
+            sample = server.latest()
+            if sample:
+                lines.append(f"asa_server_cpu_percent{label} {sample.cpu:.1f}")
+                lines.append(f"asa_server_rss_bytes{label} {sample.rss}")
+                lines.append(f"asa_server_threads{label} {sample.threads}")
+                lines.append(f"asa_server_read_bytes_total{label} {sample.read_bytes}")
+                lines.append(f"asa_server_write_bytes_total{label} {sample.write_bytes}")
+            lines.append(f"asa_server_uptime_seconds{label} {now - server.started_at:.0f}")
+            if server.time_to_ready() is not None:
+                lines.append(f"asa_server_time_to_ready_seconds{label} {server.time_to_ready():.1f}")
+
+        lines.append(f"asa_manager_sample_seconds {self.last_tick_seconds:.6f}")
+        return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    # Serves the sampler's numbers on http://127.0.0.1:<port>/metrics
+    def __init__(self, sampler, port=default_metrics_port, host="127.0.0.1"):
+        self.sampler = sampler
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(handler):
+                if handler.path.split("?")[0] != "/metrics":
+                    handler.send_error(404)
+                    return
+                body = sampler.render_text().encode("utf-8")
+                handler.send_response(200)
+                handler.send_header("Content-Type", "text/plain; version=0.0.4")
+                handler.send_header("Content-Length", str(len(body)))
+                handler.end_headers()
+                handler.wfile.write(body)
+
+            def log_message(handler, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
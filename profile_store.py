@@ -0,0 +1,163 @@
+import json
+import os
+import threading
+
+from ini_model import atomic_write_text
+from server_config import load_user_prefs, user_prefs_path
+
+schema_version = 1
+default_profile_name = "Default"
+
+# Field name -> type. Ports and player counts are stored as numbers, switches as booleans, everything else as text.
+profile_schema = {
+    "SteamCMD": str,
+    "ArkServerInstall": str,
+    "SharedInstall": str,
+    "ServerName": str,
+    "ServerAdminPassword": str,
+    "ServerPassword": str,
+    "ServerPort": int,
+    "ServerQueryPort": int,
+    "ServerMaxPlayers": int,
+    "ServerRCONPort": int,
+    "ServerLaunchOptions": str,
+    "MaintenanceSchedule": str,
+    "BackupSchedule": str,
+    "AutoRestart": bool,
+    "StagedUpdates": bool,
+    "BackgroundServers": bool,
+}
+
+
+def user_data_dir():
+    # Per-user location that doesn't depend on the directory the manager was started from
+    if os.name == "nt" and os.environ.get("APPDATA"):
+        return os.path.join(os.environ["APPDATA"], "ASAServerManager")
+    return os.path.join(os.environ.get("XDG_CONFIG_HOME") or os.path.expanduser(os.path.join("~", ".config")), "asa-server-manager")
+
+
+def default_store_path():
+    return os.path.join(user_data_dir(), "profiles.json")
+
+
+def coerce_profile(values):
+    profile = {}
+    for key, value_type in profile_schema.items():
+        value = values.get(key)
+        if value is None or value == "":
+            continue
+        if value_type is int:
+            try:
+                value = int(str(value).strip())
+            except ValueError:
+                raise ValueError(f"{key} must be a number, got '{value}'")
+        elif value_type is bool:
+            value = str(value).strip().lower() in ("1", "true", "yes", "on")
+        else:
+            value = str(value).strip()
+        profile[key] = value
+    return profile
+
+
+def profile_to_prefs(profile):
+    # Flat string values, the shape the GUI inputs and server_config helpers use
+    return {key: str(profile[key]) for key in profile_schema if key in profile}
+
+
+def _migrate_0_to_1(data):
+    # Version 0 is the old single profile "-Key: value" user.prefs file
+    return {
+        "schema_version": 1,
+        "active": default_profile_name,
+        "profiles": {default_profile_name: coerce_profile(data)},
+    }
+
+
+migrations = {
+    0: _migrate_0_to_1,
+}
+
+
+class ProfileStore:
+    # All profiles live in one JSON document: one parse on load, dict lookups afterwards,
+    # and an atomic rewrite only when something actually changed
+    def __init__(self, path=None, legacy_prefs_path=user_prefs_path):
+        self.path = path or default_store_path()
+        self.legacy_prefs_path = legacy_prefs_path
+        self.profiles = {}
+        self.active = None
+        self.dirty = False
+        self.lock = threading.Lock()
+
+    def load(self):
+        with self.lock:
+            data = None
+            if os.path.isfile(self.path):
+                with open(self.path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            elif self.legacy_prefs_path:
+                legacy = load_user_prefs(self.legacy_prefs_path)
+                if legacy is not None:
+                    data = {"schema_version": 0, **legacy}
+
+            if data is None:
+                self.profiles = {}
+                self.active = None
+                self.dirty = False
+                return self
+
+            migrated = False
+            version = data.get("schema_version", 0)
+            while version < schema_version:
+                data = migrations[version](data)
+                version = data["schema_version"]
+                migrated = True
+            if version > schema_version:
+                raise ValueError(f"{self.path} was written by a newer version of the manager (schema {version})")
+
+            self.profiles = {name: coerce_profile(profile) for name, profile in data.get("profiles", {}).items()}
+            self.active = data.get("active") if data.get("active") in self.profiles else next(iter(self.profiles), None)
+            self.dirty = migrated
+        return self
+
+    def names(self):
+        with self.lock:
+            return sorted(self.profiles, key=str.lower)
+
+    def get(self, name):
+        with self.lock:
+            profile = self.profiles.get(name)
+            return dict(profile) if profile is not None else None
+
+    def get_prefs(self, name=None):
+        profile = self.get(name or self.active)
+        return profile_to_prefs(profile) if profile is not None else None
+
+    def set(self, name, values):
+        profile = coerce_profile(values)
+        with self.lock:
+            if self.profiles.get(name) != profile:
+                self.profiles[name] = profile
+                self.dirty = True
+            if self.active != name:
+                self.active = name
+                self.dirty = True
+
+    def delete(self, name):
+        with self.lock:
+            if self.profiles.pop(name, None) is not None:
+                self.dirty = True
+                if self.active == name:
+                    self.active = next(iter(self.profiles), None)
+
+    def save(self):
+        # Returns False when there was nothing to write
+        with self.lock:
+            if not self.dirty:
+                return False
+            data = {"schema_version": schema_version, "active": self.active, "profiles": self.profiles}
+            text = json.dumps(data, indent=2, sort_keys=True)
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            atomic_write_text(self.path, text)
+            self.dirty = False
+            return True
@@ -0,0 +1,169 @@
+import asyncio
+import itertools
+import socket
+import struct
+import threading
+import time
+
+# Source RCON packet types
+SERVERDATA_AUTH = 3
+SERVERDATA_AUTH_RESPONSE = 2
+SERVERDATA_EXECCOMMAND = 2
+SERVERDATA_RESPONSE_VALUE = 0
+
+
+class RconError(Exception):
+    pass
+
+
+class RconAuthError(RconError):
+    pass
+
+
+def encode_packet(request_id, packet_type, body):
+    payload = struct.pack("<ii", request_id, packet_type) + body.encode("utf-8") + b"\x00\x00"
+    return struct.pack("<i", len(payload)) + payload
+
+
+def read_packet(sock):
+    size = struct.unpack("<i", _recv_exact(sock, 4))[0]
+    data = _recv_exact(sock, size)
+    request_id, packet_type = struct.unpack("<ii", data[:8])
+    body = data[8:-2].decode("utf-8", errors="replace")
+    return request_id, packet_type, body
+
+
+def _recv_exact(sock, size):
+    data = b""
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise RconError("Connection closed by server")
+        data += chunk
+    return data
+
+
+class RconClient:
+    # One authenticated connection to one server, reused across commands.
+    # Reconnects (and re-authenticates) transparently when the connection drops.
+    def __init__(self, host, port, password, timeout=5.0):
+        self.host = host
+        self.port = int(port)
+        self.password = password
+        self.timeout = timeout
+        self.sock = None
+        self.lock = threading.Lock()
+        self.request_ids = itertools.count(1)
+        self.last_latency = None
+
+    def connect(self):
+        self.close()
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        auth_id = next(self.request_ids)
+        sock.sendall(encode_packet(auth_id, SERVERDATA_AUTH, self.password))
+        while True:
+            request_id, packet_type, _ = read_packet(sock)
+            if packet_type == SERVERDATA_AUTH_RESPONSE:
+                if request_id == -1:
+                    sock.close()
+                    raise RconAuthError(f"RCON authentication failed for {self.host}:{self.port}")
+                break
+
+        self.sock = sock
+
+    def close(self):
+        if self.sock:
+            try:
+                self.sock.close()
+            except OSError:
+                pass
+            self.sock = None
+
+    def command(self, command):
+        return self.commands([command])[0]
+
+    def commands(self, commands):
+        # Pipelines all commands on the connection, then matches the replies by request id
+        with self.lock:
+            try:
+                return self.__send_pipelined(commands)
+            except (OSError, RconError) as e:
+                if isinstance(e, RconAuthError):
+                    raise
+                # Connection went stale (server restart, idle timeout), retry once on a fresh one
+                self.close()
+                return self.__send_pipelined(commands)
+
+    def __send_pipelined(self, commands):
+        if not self.sock:
+            self.connect()
+
+        start = time.perf_counter()
+        request_ids = [next(self.request_ids) for _ in commands]
+        # Long replies (ListPlayers on a full server) come in several packets. The server answers packets in
+        # the order they were sent, so an empty SERVERDATA_RESPONSE_VALUE after each command is echoed back
+        # once every packet of that command's reply is out: join the reply's packets until the echo arrives.
+        end_ids = [next(self.request_ids) for _ in commands]
+        self.sock.sendall(b"".join(
+            encode_packet(request_id, SERVERDATA_EXECCOMMAND, command) + encode_packet(end_id, SERVERDATA_RESPONSE_VALUE, "")
+            for request_id, end_id, command in zip(request_ids, end_ids, commands)
+        ))
+
+        parts = {request_id: [] for request_id in request_ids}
+        ends = dict(zip(end_ids, request_ids))
+        pending = set(request_ids)
+        while pending:
+            request_id, packet_type, body = read_packet(self.sock)
+            if packet_type != SERVERDATA_RESPONSE_VALUE:
+                continue
+            if request_id in pending:
+                parts[request_id].append(body)
+            elif request_id in ends:
+                # The echo can be followed by a second packet with the same id, ignored like any unknown id
+                pending.discard(ends.pop(request_id))
+
+        self.last_latency = (time.perf_counter() - start) / len(commands)
+        return ["".join(parts[request_id]) for request_id in request_ids]
+
+
+class RconPool:
+    # Keeps one client per server so repeated commands don't pay for a new login every time
+    def __init__(self, timeout=5.0):
+        self.timeout = timeout
+        self.clients = {}
+        self.lock = threading.Lock()
+
+    def get(self, host, port, password):
+        key = (host, int(port))
+        with self.lock:
+            client = self.clients.get(key)
+            if client is None or client.password != password:
+                if client:
+                    client.close()
+                client = RconClient(host, port, password, timeout=self.timeout)
+                self.clients[key] = client
+            return client
+
+    def command(self, host, port, password, command):
+        return self.get(host, port, password).command(command)
+
+    async def command_async(self, host, port, password, command):
+        return await asyncio.to_thread(self.command, host, port, password, command)
+
+    async def broadcast(self, servers, command):
+        # servers: iterable of (host, port, password). Returns replies (or the raised error) in order.
+        return await asyncio.gather(
+            *(self.command_async(host, port, password, command) for host, port, password in servers),
+            return_exceptions=True
+        )
+
+    def close(self):
+        with self.lock:
+            for client in self.clients.values():
+                client.close()
+            self.clients.clear()
+
+
+default_pool = RconPool()
@@ -0,0 +1,411 @@
+import asyncio
+import datetime
+import inspect
+import json
+import os
+import threading
+import time
+from collections import deque
+
+countdown_minutes = (15, 10, 5, 1)
+# A staged update starts this long before a scheduled restart, so it is ready by the time the server stops
+prepare_lead_minutes = 60
+
+
+class CronError(ValueError):
+    pass
+
+
+def _parse_cron_field(field, low, high):
+    values = set()
+    for part in field.split(","):
+        step = 1
+        if "/" in part:
+            part, step_text = part.split("/", 1)
+            step = int(step_text)
+            if step < 1:
+                raise CronError(f"Invalid step in '{field}'")
+
+        if part == "*":
+            start, end = low, high
+        elif "-" in part:
+            start_text, end_text = part.split("-", 1)
+            start, end = int(start_text), int(end_text)
+        else:
+            start = end = int(part)
+            if step != 1:
+                end = high
+
+        if start < low or end > high or start > end:
+            raise CronError(f"'{field}' is out of range {low}-{high}")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronSchedule:
+    # Standard 5 field cron: minute hour day-of-month month day-of-week (0 or 7 = Sunday), local time
+    def __init__(self, expression):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise CronError(f"Cron expression needs 5 fields, got '{expression}'")
+
+        try:
+            self.minutes = _parse_cron_field(fields[0], 0, 59)
+            self.hours = _parse_cron_field(fields[1], 0, 23)
+            self.days = _parse_cron_field(fields[2], 1, 31)
+            self.months = _parse_cron_field(fields[3], 1, 12)
+            weekdays = _parse_cron_field(fields[4], 0, 7)
+        except ValueError as e:
+            raise CronError(f"Invalid cron expression '{expression}': {e}")
+
+        # cron counts Sunday as 0, Python's weekday() counts Monday as 0
+        self.weekdays = {(day - 1) % 7 for day in weekdays}
+        self.any_day = fields[2] == "*"
+        self.any_weekday = fields[4] == "*"
+        self.expression = expression
+
+    def __day_matches(self, moment):
+        day_match = moment.day in self.days
+        weekday_match = moment.weekday() in self.weekdays
+        # Like cron, when both day fields are restricted either one matching is enough
+        if not self.any_day and not self.any_weekday:
+            return day_match or weekday_match
+        return day_match and weekday_match
+
+    def next_after(self, timestamp):
+        moment = datetime.datetime.fromtimestamp(timestamp).replace(second=0, microsecond=0)
+        moment += datetime.timedelta(minutes=1)
+        limit = moment + datetime.timedelta(days=366 * 5)
+
+        while moment < limit:
+            if moment.month not in self.months:
+                moment = (moment.replace(day=1) + datetime.timedelta(days=32)).replace(day=1, hour=0, minute=0)
+                continue
+            if not self.__day_matches(moment):
+                moment = (moment + datetime.timedelta(days=1)).replace(hour=0, minute=0)
+                continue
+            if moment.hour not in self.hours:
+                moment = (moment + datetime.timedelta(hours=1)).replace(minute=0)
+                continue
+            if moment.minute not in self.minutes:
+                moment += datetime.timedelta(minutes=1)
+                continue
+            return moment.timestamp()
+
+        raise CronError(f"'{self.expression}' never fires")
+
+
+class SystemClock:
+    def time(self):
+        return time.time()
+
+    async def sleep(self, seconds):
+        await asyncio.sleep(max(0, seconds))
+
+
+class Job:
+    # Runs on a cron schedule, after another job (its dependency) succeeds, or when a log event
+    # of kind `event` (optionally only from server `source`) is passed to MaintenanceScheduler.notify
+    def __init__(self, name, action, schedule=None, after=None, event=None, source=None, catch_up=True,
+                 catch_up_window=6 * 60 * 60):
+        if [schedule, after, event].count(None) != 2:
+            raise ValueError(f"Job '{name}' needs exactly one of a schedule, a job to run after or an event")
+
+        self.name = name
+        self.action = action
+        self.schedule = CronSchedule(schedule) if isinstance(schedule, str) else schedule
+        self.after = after
+        self.event = event
+        self.source = source
+        self.catch_up = catch_up
+        self.catch_up_window = catch_up_window
+        # Filled in by MaintenanceScheduler.add_job
+        self.dependents = []
+        self.running = False
+        self.last_run = None
+        self.last_result = None
+        self.jitter = deque(maxlen=500)
+
+
+class MaintenanceScheduler:
+    # One asyncio loop drives the jobs for every server
+    def __init__(self, clock=None, state_path=None, log=None):
+        self.clock = clock or SystemClock()
+        self.state_path = state_path
+        self.log = log or (lambda message: None)
+        self.jobs = {}
+        self.dependents = {}
+        self.loop = None
+        self.thread = None
+        self.stop_event = None
+        self.tasks = set()
+        self.cron_tasks = {}
+
+    def add_job(self, job):
+        if job.name in self.jobs:
+            raise ValueError(f"Job '{job.name}' already exists")
+        job.dependents = self.dependents.setdefault(job.name, [])
+        if job.after:
+            self.dependents.setdefault(job.after, []).append(job)
+        # Copied on write, notify() reads the jobs from other threads
+        self.jobs = {**self.jobs, job.name: job}
+        # Added to a running scheduler, the job's cron loop starts on the scheduler's loop
+        self.__call_on_loop(self.__start_job, job)
+        return job
+
+    def add_jobs(self, jobs):
+        for job in jobs:
+            self.add_job(job)
+
+    def remove_jobs(self, prefix):
+        # The removed jobs aren't scheduled again. A chain that is past its first job keeps the dependents
+        # it started with and runs to its end, so a server it stopped is started again.
+        removed = [job for name, job in self.jobs.items() if name.startswith(prefix)]
+        if not removed:
+            return []
+        self.jobs = {name: job for name, job in self.jobs.items() if not name.startswith(prefix)}
+        for job in removed:
+            self.dependents.pop(job.name, None)
+        for name, dependents in list(self.dependents.items()):
+            kept = [dependent for dependent in dependents if dependent not in removed]
+            if len(kept) != len(dependents):
+                self.dependents[name] = kept
+                if name in self.jobs:
+                    self.jobs[name].dependents = kept
+        self.__call_on_loop(self.__stop_jobs, removed)
+        return removed
+
+    def jitter_stats(self):
+        stats = {}
+        for name, job in self.jobs.items():
+            if job.jitter:
+                samples = sorted(job.jitter)
+                stats[name] = {
+                    "runs": len(samples),
+                    "mean": sum(samples) / len(samples),
+                    "max": samples[-1],
+                    "p95": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+                }
+        return stats
+
+    async def run(self):
+        self.loop = asyncio.get_running_loop()
+        self.stop_event = asyncio.Event()
+        saved_runs = self.__load_state()
+
+        for job in list(self.jobs.values()):
+            self.__start_job(job, saved_runs)
+
+        await self.stop_event.wait()
+        for task in list(self.tasks):
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+
+    def start_in_thread(self):
+        # Used by the GUI, the scheduler gets its own event loop on a background thread
+        def run_loop():
+            self.loop = asyncio.new_event_loop()
+            self.loop.run_until_complete(self.run())
+            self.loop.close()
+
+        self.thread = threading.Thread(target=run_loop, daemon=True)
+        self.thread.start()
+
+    def notify(self, event):
+        # Called from any thread (typically a server's output reader) with a log_events.LogEvent
+        jobs = [
+            job for job in self.jobs.values()
+            if job.event == event.kind and (job.source is None or job.source == event.source)
+        ]
+        if not jobs or not self.loop:
+            return
+        for job in jobs:
+            self.loop.call_soon_threadsafe(lambda job=job: self.__spawn(self.__run_job(job, self.clock.time())))
+
+    def stop(self):
+        if self.loop and self.stop_event:
+            self.loop.call_soon_threadsafe(self.stop_event.set)
+        elif self.stop_event:
+            self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=10)
+            self.thread = None
+
+    def __call_on_loop(self, callback, *args):
+        loop = self.loop
+        if not self.stop_event or self.stop_event.is_set() or not loop:
+            # Not running yet (run() starts every job it finds), or stopped
+            return
+        try:
+            loop.call_soon_threadsafe(callback, *args)
+        except RuntimeError:
+            # The loop closed in the meantime, the scheduler has stopped
+            pass
+
+    def __start_job(self, job, saved_runs=None):
+        # Skips jobs that were removed again, or already started by run()
+        if not job.schedule or job in self.cron_tasks or self.jobs.get(job.name) is not job:
+            return
+        saved_runs = self.__load_state() if saved_runs is None else saved_runs
+        if job.name in saved_runs:
+            job.last_run = saved_runs[job.name]
+        task = self.__spawn(self.__cron_loop(job))
+        self.cron_tasks[job] = task
+        task.add_done_callback(lambda task, job=job: self.cron_tasks.pop(job, None))
+
+    def __stop_jobs(self, jobs):
+        for job in jobs:
+            task = self.cron_tasks.pop(job, None)
+            if task:
+                task.cancel()
+
+    def __spawn(self, coroutine):
+        task = asyncio.ensure_future(coroutine)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return task
+
+    async def __cron_loop(self, job):
+        # Catch up a run that was missed while the manager wasn't running
+        if job.catch_up and job.last_run is not None:
+            missed = job.schedule.next_after(job.last_run)
+            now = self.clock.time()
+            if missed <= now and now - missed <= job.catch_up_window:
+                self.log(f"Catching up missed run of '{job.name}'")
+                await self.__run_job(job, missed)
+
+        while True:
+            scheduled = job.schedule.next_after(self.clock.time())
+            await self.clock.sleep(scheduled - self.clock.time())
+            await self.__run_job(job, scheduled)
+
+    async def __run_job(self, job, scheduled):
+        if job.running:
+            self.log(f"Skipping '{job.name}', the previous run hasn't finished")
+            return
+
+        job.running = True
+        started = self.clock.time()
+        job.jitter.append(started - scheduled)
+        try:
+            result = job.action()
+            if inspect.isawaitable(result):
+                result = await result
+            job.last_result = result if result is not None else True
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            job.last_result = False
+            self.log(f"Job '{job.name}' failed: {e}")
+        finally:
+            job.running = False
+            job.last_run = started
+            self.__save_state()
+
+        # Chained jobs only run when the one before them succeeded
+        if job.last_result is not False:
+            for dependent in job.dependents:
+                self.__spawn(self.__run_job(dependent, self.clock.time()))
+
+    def __load_state(self):
+        # {job name: last run}
+        if not self.state_path:
+            return {}
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return state.get("last_run", {})
+
+    def __save_state(self):
+        if not self.state_path:
+            return
+        state = {"last_run": {name: job.last_run for name, job in self.jobs.items() if job.last_run is not None}}
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.state_path)), exist_ok=True)
+            temp_path = self.state_path + ".tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(state, f)
+            os.replace(temp_path, self.state_path)
+        except OSError as e:
+            self.log(f"Could not save scheduler state: {e}")
+
+
+class LeadSchedule:
+    # Fires `lead` seconds before each time of another schedule
+    def __init__(self, schedule, lead):
+        self.schedule = schedule
+        self.lead = lead
+
+    def next_after(self, timestamp):
+        return self.schedule.next_after(timestamp + self.lead) - self.lead
+
+
+def restart_chain(server, schedule, send_command, stop_server, update_server, start_server, clock=None,
+                  countdown=countdown_minutes, log=None, backup=None, prepare=None, prepare_lead=prepare_lead_minutes):
+    # The nightly recipe from ScheduleTasks.md: countdown broadcasts, SaveWorld, stop, backup, update, start.
+    # The countdown begins `countdown[0]` minutes before the restart time given by `schedule`. `prepare`
+    # (staging the update while the server still runs) begins `prepare_lead` minutes before the countdown.
+    clock = clock or SystemClock()
+    log = log or (lambda message: None)
+    if not isinstance(schedule, CronSchedule):
+        schedule = CronSchedule(schedule)
+
+    lead = countdown[0] * 60 if countdown else 0
+
+    async def run_countdown():
+        start = clock.time()
+        for index, minutes in enumerate(countdown):
+            await clock.sleep(start + (countdown[0] - minutes) * 60 - clock.time())
+            await asyncio.to_thread(send_command, f"broadcast Server restart in {minutes} minute{'s' if minutes != 1 else ''}.")
+        await clock.sleep(start + lead - clock.time())
+
+    async def save_world():
+        await asyncio.to_thread(send_command, "SaveWorld")
+
+    async def back_up():
+        # Same for a failed backup, it is logged and the chain carries on
+        if backup:
+            try:
+                await asyncio.to_thread(backup)
+            except Exception as e:
+                log(f"Backup of '{server}' failed: {e}")
+
+    async def run_prepare():
+        try:
+            await asyncio.to_thread(prepare)
+        except Exception as e:
+            log(f"Preparing the update of '{server}' failed, it will update in place during the restart: {e}")
+
+    async def update():
+        # A failed update must not keep the server down, the restart still runs
+        try:
+            await asyncio.to_thread(update_server)
+        except Exception as e:
+            log(f"Update of '{server}' failed, restarting on the current build: {e}")
+
+    prefix = f"{server}:"
+    jobs = [
+        Job(prefix + "countdown", run_countdown, schedule=LeadSchedule(schedule, lead)),
+        Job(prefix + "save", save_world, after=prefix + "countdown"),
+        Job(prefix + "stop", lambda: asyncio.to_thread(stop_server), after=prefix + "save"),
+        Job(prefix + "stopped-backup", back_up, after=prefix + "stop"),
+        Job(prefix + "update", update, after=prefix + "stopped-backup"),
+        Job(prefix + "restart", lambda: asyncio.to_thread(start_server), after=prefix + "update"),
+    ]
+    if prepare:
+        jobs.insert(0, Job(prefix + "prepare", run_prepare, schedule=LeadSchedule(schedule, lead + prepare_lead * 60)))
+    return jobs
+
+
+def backup_chain(server, schedule, send_command, backup):
+    # Periodic backups while the server runs: SaveWorld first so the snapshot has a fresh, complete save
+    async def save_world():
+        await asyncio.to_thread(send_command, "SaveWorld")
+
+    prefix = f"{server}:"
+    return [
+        Job(prefix + "backup-save", save_world, schedule=schedule),
+        Job(prefix + "backup", lambda: asyncio.to_thread(backup), after=prefix + "backup-save"),
+    ]
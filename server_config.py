@@ -0,0 +1,195 @@
+import os
+import subprocess
+import sys
+import time
+
+from steam_update import plan_update, record_update_result
+from shared_install import load_instances, refresh_instances, register_instance, describe_refresh
+from steam_progress import SteamProgress, split_lines
+
+# Nothing in here imports Qt, so the headless CLI and scheduled tasks can use it cheaply
+
+
+def resource_path(relative_path):
+    # For the temp folder created by PYINSTALLER
+    try:
+        base_path = sys._MEIPASS
+    except Exception:
+        base_path = os.path.abspath(".")
+
+    return os.path.join(base_path, relative_path)
+
+
+ps1_path = resource_path("setup-asa-server.ps1")
+template_path = resource_path(os.path.join("data", "GameSettingsTemplate.ini"))
+user_prefs_path = os.path.join("data", "user.prefs")
+# SteamCMD prints several progress lines a second, the console gets one this often (all of them go to the log file)
+progress_log_interval = 5
+
+
+def powershell_executable():
+    # ASA_POWERSHELL swaps in another executable, e.g. pwsh or a stand-in script when running off Windows
+    return os.environ.get("ASA_POWERSHELL") or "powershell"
+
+# Keys of the old user.prefs file, read once to migrate it into the profile store
+prefs_keys = [
+    "SteamCMD", "ArkServerInstall", "ServerName", "ServerAdminPassword", "ServerPassword", "ServerPort",
+    "ServerQueryPort", "ServerMaxPlayers", "ServerRCONPort", "ServerLaunchOptions", "MaintenanceSchedule",
+]
+
+
+def load_user_prefs(path=user_prefs_path):
+    # Returns None when there are no prefs saved yet
+    if not os.path.exists(path):
+        return None
+
+    prefs = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line.startswith("-") or ":" not in line:
+                continue
+            key, value = line[1:].split(":", 1)
+            if key in prefs_keys:
+                prefs[key] = value.strip()
+    return prefs
+
+
+def create_start_bat_content(install_path, prefs):
+    server_exe_path = os.path.join(install_path, "ShooterGame", "Binaries", "Win64", "ArkAscendedServer.exe")
+    return f'"{server_exe_path}" TheIsland_WP?listen?SessionName={prefs.get("ServerName", "")} -server -log {prefs.get("ServerLaunchOptions", "")}'
+
+
+def create_game_user_settings_template(prefs):
+    return f"""[ServerSettings]
+ServerAdminPassword={prefs.get("ServerAdminPassword", "")}
+ServerPassword={prefs.get("ServerPassword", "")}
+SessionName={prefs.get("ServerName", "")}
+Port={prefs.get("ServerPort", "")}
+QueryPort={prefs.get("ServerQueryPort", "")}
+MaxPlayers={prefs.get("ServerMaxPlayers", "")}
+RCONEnabled={"True" if prefs.get("ServerRCONPort") else "False"}
+RCONPort={prefs.get("ServerRCONPort", "")}
+"""
+
+
+def write_server_files(install_path, start_bat_content, game_user_settings_template):
+    # What setup-asa-server.ps1 does after the download, for servers linked to a shared install
+    bat_path = os.path.join(install_path, "ShooterGame", "Binaries", "Win64", "start.bat")
+    os.makedirs(os.path.dirname(bat_path), exist_ok=True)
+    with open(bat_path, "w", encoding="utf-8") as f:
+        f.write(start_bat_content + "\n")
+
+    game_user_settings_path = os.path.join(install_path, "ShooterGame", "Saved", "Config", "WindowsServer", "GameUserSettings.ini")
+    if not os.path.exists(game_user_settings_path):
+        os.makedirs(os.path.dirname(game_user_settings_path), exist_ok=True)
+        with open(game_user_settings_path, "w", encoding="utf-8") as f:
+            f.write(game_user_settings_template)
+
+
+def steam_cmd_log_path(install_path):
+    return os.path.join(install_path, "steamapps", "asa_manager_steamcmd.log")
+
+
+def run_setup_script(log_buffer, steam_cmd_path, install_path, start_bat_content, game_user_settings_template,
+                     shared_path=None, busy_instances=(), progress=None):
+    # With a shared install SteamCMD only updates shared_path, then this server and every other one
+    # linked to it are refreshed from it in one pass. Linked servers hardlink the shared files, so SteamCMD
+    # patching them would change the files under any of them that is running (busy_instances): refuse instead.
+    def same_path(a, b):
+        return os.path.normcase(os.path.abspath(a)) == os.path.normcase(os.path.abspath(b))
+
+    if not shared_path or same_path(shared_path, install_path):
+        return _run_setup_ps1(log_buffer, steam_cmd_path, install_path, [
+            "-startBatContent", start_bat_content,
+            "-gameUserSettingsTemplate", game_user_settings_template
+        ], progress)
+
+    linked = load_instances(shared_path) + [install_path]
+    running = [path for path in linked if any(same_path(path, busy) for busy in busy_instances)]
+    if running:
+        for path in running:
+            log_buffer.push(f"{path} is running on the shared game files.")
+        log_buffer.push("Stop every server linked to the shared install before updating it.")
+        return 1
+
+    return_code = update_game_files(log_buffer, steam_cmd_path, shared_path, progress)
+    if return_code != 0:
+        return return_code
+
+    instances = register_instance(shared_path, install_path)
+    results, seconds = refresh_instances(shared_path, instances)
+    for line in describe_refresh(results):
+        log_buffer.push(line)
+    log_buffer.push(f"Refreshed {len(instances)} servers from {shared_path} in {seconds:.1f}s.")
+
+    write_server_files(install_path, start_bat_content, game_user_settings_template)
+    log_buffer.push(f"start.bat created at {os.path.join(install_path, 'ShooterGame', 'Binaries', 'Win64', 'start.bat')}.")
+    failed = any(stats and stats["failed"] for path, stats in results.items() if same_path(path, install_path))
+    return 1 if failed else 0
+
+
+def update_game_files(log_buffer, steam_cmd_path, install_path, progress=None):
+    # SteamCMD only, without writing start.bat or settings (shared installs, staged copies)
+    return _run_setup_ps1(log_buffer, steam_cmd_path, install_path, ["-gameFilesOnly"], progress)
+
+
+def _run_setup_ps1(log_buffer, steam_cmd_path, install_path, extra_args, progress=None):
+    # Only run SteamCMD's app_update when Steam has a newer build, and validate on its own slower schedule
+    start = time.perf_counter()
+    plan = plan_update(install_path, steam_cmd_path)
+    check_time = time.perf_counter() - start
+    log_buffer.push(plan.describe())
+
+    args = [
+        powershell_executable(), "-ExecutionPolicy", "Bypass", "-File", ps1_path,
+        "-steamCmdPath", steam_cmd_path,
+        "-installPath", install_path,
+    ] + extra_args
+    if not plan.run_update:
+        args.append("-skipAppUpdate")
+    if not plan.validate:
+        args.append("-skipValidate")
+
+    progress = progress or SteamProgress()
+    log_path = steam_cmd_log_path(install_path)
+    os.makedirs(os.path.dirname(log_path), exist_ok=True)
+    last_logged = {"time": 0.0, "phase": None}
+
+    def on_line(line):
+        log_file.write(line + "\n")
+        if not progress.feed(line):
+            log_buffer.push(line)
+            return
+        # Progress lines are summarized in the console, on a phase change and every few seconds
+        now = time.perf_counter()
+        snapshot = progress.snapshot()
+        if snapshot["phase"] != last_logged["phase"] or now - last_logged["time"] >= progress_log_interval:
+            last_logged["time"] = now
+            last_logged["phase"] = snapshot["phase"]
+            log_buffer.push(progress.describe(snapshot))
+
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        args,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        bufsize=0,
+        # Only exists on Windows
+        creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0)
+    )
+
+    with open(log_path, "w", encoding="utf-8", errors="replace") as log_file:
+        split_lines(process.stdout, on_line)
+
+    process.stdout.close()
+    return_code = process.wait()
+    script_time = time.perf_counter() - start
+    log_buffer.push(f"SteamCMD output saved to {log_path}")
+
+    if return_code == 0:
+        build_id = record_update_result(install_path, plan, {"build_check": check_time, "script": script_time})
+        log_buffer.push(f"Installed build: {build_id or 'unknown'}")
+    phases = dict(plan.timings, build_check=check_time, script=script_time)
+    log_buffer.push("Update timings: " + ", ".join(f"{name} {seconds:.1f}s" for name, seconds in phases.items()))
+    return return_code
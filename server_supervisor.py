@@ -0,0 +1,239 @@
+import os
+import signal
+import subprocess
+import threading
+import time
+
+from log_buffer import LogBuffer
+from log_events import LogEventEngine, PlayerList, player_joined, player_left, server_ready
+
+
+def start_bat_path(install_path):
+    return os.path.join(install_path, "ShooterGame", "Binaries", "Win64", "start.bat")
+
+
+def kill_process_tree(process):
+    # start.bat runs through a shell, so the server exe is a grandchild of the Popen handle
+    if process.poll() is not None:
+        return
+
+    if os.name == "nt":
+        subprocess.run(
+            ["taskkill", "/T", "/F", "/PID", str(process.pid)],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0)
+        )
+    else:
+        try:
+            os.killpg(process.pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+
+
+class ServerInstance:
+    # One server process with its own install path, ports and log stream
+    def __init__(self, name, install_path, command=None, ports=None, log_buffer=None, label=None):
+        self.name = name
+        self.label = label or name
+        self.install_path = install_path
+        self.command = command
+        self.ports = ports or {}
+        self.log_buffer = log_buffer or LogBuffer()
+        self.process = None
+        self.reader = None
+        self.started_at = None
+        self.exit_code = None
+        self.stopping = False
+        self.on_start = []
+        self.on_exit = []
+        # Extra consumers of every output line (log archive, ...), called on the reader thread
+        self.listeners = []
+        self.listener_errors = 0
+        self.failed_listeners = []
+        # Typed events parsed from the output (joins, saves, crashes, ...)
+        self.events = LogEventEngine(source=name)
+        self.players = PlayerList()
+        self.events.subscribe(self.players.on_event, (player_joined, player_left))
+        self.ready_at = None
+        self.last_output_at = None
+        self.events.subscribe(self.__on_ready, (server_ready,))
+        self.lock = threading.Lock()
+
+    def start(self):
+        with self.lock:
+            if self.is_running():
+                raise RuntimeError(f"Server '{self.name}' is already running")
+
+            command = self.command or start_bat_path(self.install_path)
+            popen_kwargs = {}
+            if os.name == "nt":
+                popen_kwargs["creationflags"] = subprocess.CREATE_NEW_PROCESS_GROUP
+            else:
+                popen_kwargs["start_new_session"] = True
+
+            self.process = subprocess.Popen(
+                command,
+                cwd=self.install_path if os.path.isdir(self.install_path) else None,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                shell=isinstance(command, str),
+                bufsize=1,
+                universal_newlines=True,
+                errors="replace",
+                **popen_kwargs
+            )
+            self.started_at = time.time()
+            self.ready_at = None
+            self.last_output_at = None
+            self.exit_code = None
+            self.stopping = False
+            self.players.clear()
+
+            self.reader = threading.Thread(target=self.__read_output, args=(self.process,), daemon=True)
+            self.reader.start()
+
+        for callback in list(self.on_start):
+            callback(self)
+
+    def stop(self, timeout=30):
+        with self.lock:
+            process = self.process
+            if not process or process.poll() is not None:
+                return
+            self.stopping = True
+
+        kill_process_tree(process)
+        try:
+            process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+    def is_running(self):
+        return self.process is not None and self.process.poll() is None
+
+    def status(self):
+        if self.is_running():
+            return {
+                "name": self.name,
+                "state": "running",
+                "pid": self.process.pid,
+                "uptime": time.time() - self.started_at,
+                "ready": self.ready_at is not None,
+                "players": self.players.names(),
+                "ports": self.ports,
+            }
+        return {
+            "name": self.name,
+            "state": "stopped" if self.exit_code is None or self.stopping else "exited",
+            "exit_code": self.exit_code,
+            "ports": self.ports,
+        }
+
+    def __listener_failed(self, listener, error):
+        self.listener_errors += 1
+        # Reported once per listener, it's called again for every line
+        if listener not in self.failed_listeners:
+            self.failed_listeners.append(listener)
+            self.log_buffer.push(f"Server output listener failed, its output is skipped: {error!r}")
+
+    def __on_ready(self, event):
+        self.ready_at = event.time
+
+    def __read_output(self, process):
+        for line in iter(process.stdout.readline, ''):
+            line = line.strip()
+            self.last_output_at = time.time()
+            self.log_buffer.push(line)
+            for listener in self.listeners:
+                try:
+                    listener(line)
+                except Exception as e:
+                    # A broken listener (a full disk under the log archive, ...) must not stop the output
+                    # from being read, or the server blocks once its stdout pipe fills up
+                    self.__listener_failed(listener, e)
+            self.events.feed(line)
+
+        process.stdout.close()
+        self.exit_code = process.wait()
+        self.players.clear()
+
+        for callback in list(self.on_exit):
+            callback(self)
+
+
+class ServerSupervisor:
+    # Owns any number of server instances running side by side
+    def __init__(self):
+        self.instances = {}
+        self.lock = threading.Lock()
+
+    def add(self, name, install_path, command=None, ports=None, log_buffer=None, label=None):
+        with self.lock:
+            instance = self.instances.get(name)
+            if instance and instance.is_running():
+                raise RuntimeError(f"Server '{name}' is running, stop it before changing it")
+
+            instance = ServerInstance(
+                name, install_path, command=command, ports=ports, log_buffer=log_buffer, label=label
+            )
+            self.instances[name] = instance
+            return instance
+
+    def get(self, name):
+        with self.lock:
+            return self.instances.get(name)
+
+    def remove(self, name):
+        with self.lock:
+            instance = self.instances.pop(name, None)
+        if instance:
+            instance.stop()
+
+    def start(self, name):
+        self.get(name).start()
+
+    def stop(self, name, timeout=30):
+        instance = self.get(name)
+        if instance:
+            instance.stop(timeout)
+
+    def is_running(self, name):
+        instance = self.get(name)
+        return instance is not None and instance.is_running()
+
+    def status(self):
+        with self.lock:
+            instances = list(self.instances.values())
+        return [instance.status() for instance in instances]
+
+    def running(self):
+        with self.lock:
+            return [instance for instance in self.instances.values() if instance.is_running()]
+
+    def stop_all(self, timeout=30):
+        # Stop in parallel so one slow server doesn't hold up the rest
+        threads = [threading.Thread(target=instance.stop, args=(timeout,)) for instance in self.running()]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+
+def graceful_stop(instance, send_command, timeout=120):
+    # Ask the server to save and exit over RCON first, only kill it if that doesn't work
+    if not instance.is_running():
+        return
+
+    instance.stopping = True
+    try:
+        send_command("DoExit")
+    except Exception:
+        pass
+    else:
+        deadline = time.time() + timeout
+        while time.time() < deadline and instance.is_running():
+            time.sleep(1)
+
+    instance.stop()
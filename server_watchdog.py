@@ -0,0 +1,313 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+
+from log_events import server_crashed
+
+# Restart delays double after each failed attempt: 10s, 20s, 40s ... up to 10 minutes
+default_backoff_initial = 10
+default_backoff_max = 10 * 60
+# More restarts than this inside the window means the server can't stay up, stop trying
+default_crash_loop_limit = 5
+default_crash_loop_window = 30 * 60
+# The backoff resets once a restarted server has been up this long
+default_stable_after = 10 * 60
+default_startup_timeout = 20 * 60
+default_heartbeat_timeout = None
+default_probe_interval = 60
+default_probe_failures = 3
+# How long a server that logged a crash gets to exit by itself (the crash reporter may keep it alive)
+crash_grace_seconds = 30
+incident_history = 200
+
+
+def watchdog_state_path(install_path):
+    return os.path.join(install_path, "steamapps", "asa_manager_watchdog.json")
+
+
+class WatchedServer:
+    def __init__(self, instance, restart, probe, state_path):
+        self.instance = instance
+        self.restart = restart
+        self.probe = probe
+        self.state_path = state_path
+        # watching, waiting (for a restart), stopped, crash-loop
+        self.state = "watching"
+        self.restart_at = None
+        self.restart_times = deque()
+        self.consecutive_failures = 0
+        self.killing = False
+        self.crash_seen_at = None
+        self.crash_reason = None
+        self.last_probe = 0.0
+        self.probe_failures = 0
+        self.incident = None
+        self.incidents = []
+
+
+class Watchdog:
+    # Restarts servers that exit unexpectedly, stop logging, stop answering RCON or log a crash.
+    # One thread checks every watched server; exits and crash lines are reported to it by the server's
+    # reader thread. Every incident (reason, downtime, time to recover) is kept per server on disk.
+    def __init__(self, interval=1.0, backoff_initial=default_backoff_initial, backoff_max=default_backoff_max,
+                 crash_loop_limit=default_crash_loop_limit, crash_loop_window=default_crash_loop_window,
+                 stable_after=default_stable_after, startup_timeout=default_startup_timeout,
+                 heartbeat_timeout=default_heartbeat_timeout, probe_interval=default_probe_interval,
+                 probe_failures=default_probe_failures, crash_grace=crash_grace_seconds, clock=time.time, log=None):
+        self.interval = interval
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.crash_loop_limit = crash_loop_limit
+        self.crash_loop_window = crash_loop_window
+        self.stable_after = stable_after
+        self.startup_timeout = startup_timeout
+        self.heartbeat_timeout = heartbeat_timeout
+        self.probe_interval = probe_interval
+        self.probe_failures = probe_failures
+        self.crash_grace = crash_grace
+        self.clock = clock
+        self.log = log or (lambda message: None)
+        self.servers = {}
+        self.hooked = set()
+        self.lock = threading.RLock()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def watch(self, instance, restart=None, probe=None, state_path=None):
+        # restart defaults to instance.start, probe is an optional callable that raises when the server
+        # doesn't answer (an RCON command, for example)
+        with self.lock:
+            server = self.servers.get(instance.name)
+            if server is None:
+                server = WatchedServer(instance, restart or instance.start, probe, state_path)
+                server.incidents = self.__load_incidents(state_path)
+                self.servers[instance.name] = server
+            else:
+                server.restart = restart or instance.start
+                server.probe = probe
+            if instance.name not in self.hooked:
+                instance.on_exit.append(lambda exited: self.__on_exit(exited.name))
+                instance.on_start.append(lambda started: self.__on_start(started.name))
+                instance.events.subscribe(lambda event: self.__on_crash_line(instance.name, event), (server_crashed,))
+                self.hooked.add(instance.name)
+            # Starting by hand clears a crash loop
+            server.state = "watching"
+            server.consecutive_failures = 0
+            server.restart_times.clear()
+        return server
+
+    def unwatch(self, name):
+        # The instance keeps its hooks, they do nothing while it isn't watched
+        with self.lock:
+            self.servers.pop(name, None)
+
+    def start(self):
+        if self.thread:
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.__run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=self.interval * 5)
+            self.thread = None
+
+    def status(self, name):
+        with self.lock:
+            server = self.servers.get(name)
+            if server is None:
+                return None
+            status = {"state": server.state, "incidents": len(server.incidents)}
+            if server.state == "waiting":
+                status["restart_in"] = max(0, server.restart_at - self.clock())
+            if server.incident:
+                status["reason"] = server.incident["reason"]
+            return status
+
+    def summary(self, name):
+        with self.lock:
+            server = self.servers.get(name)
+            incidents = list(server.incidents) if server else []
+        recovered = [incident for incident in incidents if incident.get("recovered_at")]
+        return {
+            "incidents": len(incidents),
+            "recovered": len(recovered),
+            "downtime": sum(incident["downtime"] for incident in recovered),
+            "mean_time_to_recover": (
+                sum(incident["time_to_recover"] for incident in recovered) / len(recovered) if recovered else None
+            ),
+            "last_reason": incidents[-1]["reason"] if incidents else None,
+        }
+
+    def __on_start(self, name):
+        with self.lock:
+            server = self.servers.get(name)
+            if server:
+                server.killing = False
+                server.crash_seen_at = None
+                server.probe_failures = 0
+                server.last_probe = self.clock()
+                if server.state == "stopped":
+                    server.state = "watching"
+
+    def __on_exit(self, name):
+        with self.lock:
+            server = self.servers.get(name)
+            if server is None or server.state != "watching":
+                return
+            instance = server.instance
+            if server.killing:
+                return
+            if instance.stopping:
+                server.state = "stopped"
+                return
+            if instance.exit_code == 0 and server.crash_seen_at is None:
+                self.log(f"Server '{instance.label}' exited cleanly, not restarting it.")
+                server.state = "stopped"
+                return
+            reason = server.crash_reason or f"exited with code {instance.exit_code}"
+            self.__failed(server, reason, self.clock())
+
+    def __on_crash_line(self, name, event):
+        with self.lock:
+            server = self.servers.get(name)
+            if server and server.crash_seen_at is None:
+                server.crash_seen_at = self.clock()
+                reason = event.fields.get("reason")
+                server.crash_reason = f"crashed: {reason}" if reason else "crashed"
+
+    def __run(self):
+        while not self.stop_event.wait(self.interval):
+            with self.lock:
+                servers = list(self.servers.values())
+            for server in servers:
+                try:
+                    self.check(server)
+                except Exception as e:
+                    self.log(f"Watchdog check of '{server.instance.label}' failed: {e}")
+
+    def check(self, server):
+        now = self.clock()
+        instance = server.instance
+
+        with self.lock:
+            if server.state == "waiting" and now >= server.restart_at:
+                self.__restart(server, now)
+                return
+            if server.state != "watching" or not instance.is_running():
+                return
+
+            # Close the incident once the restarted server is ready again
+            if server.incident and server.incident.get("restarted_at") and instance.ready_at:
+                self.__recovered(server, instance.ready_at)
+            if server.consecutive_failures and instance.ready_at and now - instance.ready_at >= self.stable_after:
+                server.consecutive_failures = 0
+
+            hang = None
+            last_output = instance.last_output_at or instance.started_at
+            down_since = last_output
+            if server.crash_seen_at and now - server.crash_seen_at >= self.crash_grace:
+                hang = server.crash_reason
+                down_since = server.crash_seen_at
+            elif instance.ready_at is None and self.startup_timeout and now - instance.started_at >= self.startup_timeout:
+                hang = f"was not ready after {self.startup_timeout:.0f}s"
+            elif self.heartbeat_timeout and now - last_output >= self.heartbeat_timeout:
+                hang = f"went silent, no log output for {now - last_output:.0f}s"
+            probe = server.probe if server.probe and instance.ready_at and now - server.last_probe >= self.probe_interval else None
+
+        if not hang and probe:
+            # Outside the lock, an unresponsive server can take the whole RCON timeout to answer
+            server.last_probe = now
+            try:
+                probe()
+                server.probe_failures = 0
+            except Exception as e:
+                server.probe_failures += 1
+                if server.probe_failures >= self.probe_failures:
+                    hang = f"stopped answering RCON ({e})"
+                    down_since = now - self.probe_interval * self.probe_failures
+
+        if hang:
+            self.log(f"Server '{instance.label}' {hang}, killing it.")
+            # Stays set until the next start, so the exit this causes isn't treated as a second failure
+            server.killing = True
+            instance.stop()
+            self.__failed(server, hang, down_since)
+
+    def __failed(self, server, reason, down_since):
+        now = self.clock()
+        with self.lock:
+            # A crash during a restart attempt extends the open incident instead of starting a new one
+            if server.incident is None:
+                server.incident = {"reason": reason, "down_since": down_since, "detected_at": now, "restarts": 0}
+            server.crash_seen_at = None
+            server.crash_reason = None
+            server.probe_failures = 0
+
+            while server.restart_times and now - server.restart_times[0] > self.crash_loop_window:
+                server.restart_times.popleft()
+            if len(server.restart_times) >= self.crash_loop_limit:
+                server.state = "crash-loop"
+                server.incident["gave_up_at"] = now
+                self.__close_incident(server)
+                self.log(
+                    f"Server '{server.instance.label}' {reason}. It was restarted {len(server.restart_times)} times in "
+                    f"{self.crash_loop_window / 60:.0f} minutes, giving up until it is started by hand."
+                )
+                return
+
+            delay = min(self.backoff_max, self.backoff_initial * 2 ** server.consecutive_failures)
+            server.consecutive_failures += 1
+            server.state = "waiting"
+            server.restart_at = now + delay
+            self.log(f"Server '{server.instance.label}' {reason}. Restarting in {delay:.0f}s.")
+
+    def __restart(self, server, now):
+        server.restart_times.append(now)
+        server.state = "watching"
+        try:
+            server.restart()
+        except Exception as e:
+            self.__failed(server, f"could not be restarted ({e})", now)
+            return
+        server.incident["restarted_at"] = now
+        server.incident["restarts"] += 1
+        self.log(f"Server '{server.instance.label}' restarted.")
+
+    def __recovered(self, server, ready_at):
+        incident = server.incident
+        incident["recovered_at"] = ready_at
+        incident["time_to_recover"] = ready_at - incident["detected_at"]
+        incident["downtime"] = ready_at - incident["down_since"]
+        self.log(
+            f"Server '{server.instance.label}' is back up, {incident['downtime']:.0f}s of downtime "
+            f"({incident['time_to_recover']:.0f}s to recover)."
+        )
+        self.__close_incident(server)
+
+    def __close_incident(self, server):
+        server.incidents.append(server.incident)
+        del server.incidents[:-incident_history]
+        server.incident = None
+        if server.state_path:
+            try:
+                os.makedirs(os.path.dirname(server.state_path), exist_ok=True)
+                temp_path = server.state_path + ".tmp"
+                with open(temp_path, "w", encoding="utf-8") as f:
+                    json.dump({"incidents": server.incidents}, f)
+                os.replace(temp_path, server.state_path)
+            except OSError as e:
+                self.log(f"Could not save watchdog history: {e}")
+
+    def __load_incidents(self, state_path):
+        if not state_path:
+            return []
+        try:
+            with open(state_path, "r", encoding="utf-8") as f:
+                return json.load(f).get("incidents", [])
+        except (OSError, ValueError):
+            return []
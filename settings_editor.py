@@ -0,0 +1,236 @@
+import os
+
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QPlainTextEdit, QComboBox, QLabel
+from PyQt5.QtGui import QSyntaxHighlighter, QTextCharFormat, QTextBlockUserData, QColor, QFont, QTextCursor
+from PyQt5.QtCore import QRegularExpression, QTimer
+
+from ini_model import known_settings, check_settings
+from server_config import template_path, create_game_user_settings_template
+
+# Wait this long after the last keystroke before validating the whole file again
+validate_delay_ms = 400
+# Blocks above/below the viewport that are highlighted too, so short scrolls don't show plain text
+highlight_margin = 50
+problems_shown = 3
+
+_known = None
+
+
+def default_known_settings():
+    # Keys from the Game.ini template and the GameUserSettings.ini the manager writes, read once
+    global _known
+    if _known is None:
+        known = {}
+        if os.path.isfile(template_path):
+            with open(template_path, "r", encoding="utf-8") as f:
+                known_settings(f.read(), known)
+        _known = known_settings(create_game_user_settings_template({}), known)
+    return _known
+
+
+class Highlighted(QTextBlockUserData):
+    # Marks a block whose formats are up to date
+    pass
+
+
+class IniHighlighter(QSyntaxHighlighter):
+    # Qt calls highlightBlock only for blocks that changed. On top of that, blocks outside the
+    # visible range are skipped until they are scrolled into view, so opening a 50k line file
+    # doesn't format every line up front.
+    def __init__(self, editor):
+        super().__init__(editor.document())
+        self.editor = editor
+        self.visible_range = (0, 200)
+
+        self.sectionFormat = QTextCharFormat()
+        self.sectionFormat.setForeground(QColor("#1f5fbf"))
+        self.sectionFormat.setFontWeight(QFont.Bold)
+        self.keyFormat = QTextCharFormat()
+        self.keyFormat.setForeground(QColor("#8a3ab9"))
+        self.numberFormat = QTextCharFormat()
+        self.numberFormat.setForeground(QColor("#b35c00"))
+        self.commentFormat = QTextCharFormat()
+        self.commentFormat.setForeground(QColor("#6a8a6a"))
+        self.problemFormat = QTextCharFormat()
+        self.problemFormat.setUnderlineStyle(QTextCharFormat.WaveUnderline)
+        self.problemFormat.setUnderlineColor(QColor("red"))
+        self.numberPattern = QRegularExpression(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+
+    def highlightBlock(self, text):
+        number = self.currentBlock().blockNumber()
+        first, last = self.visible_range
+        if number < first or number > last:
+            # Formatted when it's scrolled into view
+            if self.currentBlockUserData() is not None:
+                self.setCurrentBlockUserData(None)
+            return
+
+        stripped = text.lstrip()
+        indent = len(text) - len(stripped)
+        if stripped.startswith((";", "#")):
+            self.setFormat(0, len(text), self.commentFormat)
+        elif stripped.startswith("["):
+            self.setFormat(indent, len(stripped), self.sectionFormat)
+        elif "=" in text:
+            equals = text.index("=")
+            self.setFormat(indent, equals - indent, self.keyFormat)
+            matches = self.numberPattern.globalMatch(text, equals + 1)
+            while matches.hasNext():
+                match = matches.next()
+                self.setFormat(match.capturedStart(), match.capturedLength(), self.numberFormat)
+
+        if number in self.editor.problems:
+            self.setFormat(indent, len(stripped), self.problemFormat)
+        self.setCurrentBlockUserData(Highlighted())
+
+
+class SettingsEditor(QWidget):
+    # Plain text editor for GameUserSettings.ini/Game.ini with a section outline and
+    # validation that runs in the background once typing pauses
+    def __init__(self, run_job, known=None):
+        super().__init__()
+        self.run_job = run_job
+        self.known = known
+        self.problems = {}
+        self.sections = []
+        self.validatedRevision = None
+        self.validating = False
+
+        self.outlineSelector = QComboBox()
+        self.outlineSelector.setToolTip("Jump to a section")
+        self.outlineSelector.activated.connect(self.jump_to_section)
+        self.problemsLabel = QLabel("")
+        self.problemsLabel.setWordWrap(True)
+        self.problemsLabel.setStyleSheet("color: #b00020;")
+
+        self.textEdit = QPlainTextEdit()
+        self.textEdit.setLineWrapMode(QPlainTextEdit.NoWrap)
+        self.textEdit.setFont(QFont("Consolas", 10))
+        self.highlighter = IniHighlighter(self)
+
+        self.validateTimer = QTimer(self)
+        self.validateTimer.setSingleShot(True)
+        self.validateTimer.setInterval(validate_delay_ms)
+        self.validateTimer.timeout.connect(self.validate)
+        self.textEdit.document().contentsChange.connect(self.__contents_changed)
+        self.textEdit.verticalScrollBar().valueChanged.connect(self.highlight_visible)
+
+        outline_layout = QHBoxLayout()
+        outline_layout.addWidget(QLabel("Section:"))
+        outline_layout.addWidget(self.outlineSelector, 1)
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addLayout(outline_layout)
+        layout.addWidget(self.textEdit)
+        layout.addWidget(self.problemsLabel)
+
+    # The parts of the QPlainTextEdit API the settings page uses
+    def document(self):
+        return self.textEdit.document()
+
+    def toPlainText(self):
+        return self.textEdit.toPlainText()
+
+    def appendPlainText(self, text):
+        self.textEdit.appendPlainText(text)
+
+    def setPlainText(self, text):
+        self.highlighter.visible_range = (0, self.__visible_block_count() + highlight_margin)
+        self.problems = {}
+        self.validatedRevision = None
+        self.textEdit.setPlainText(text)
+        self.validate()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.highlight_visible()
+
+    def __visible_block_count(self):
+        return max(1, self.textEdit.viewport().height() // max(1, self.textEdit.fontMetrics().height()))
+
+    def __contents_changed(self, position, removed, added):
+        if removed or added:
+            self.validateTimer.start()
+
+    def highlight_visible(self):
+        first = self.textEdit.firstVisibleBlock()
+        if not first.isValid():
+            return
+        visible = self.__visible_block_count()
+        self.highlighter.visible_range = (
+            max(0, first.blockNumber() - highlight_margin), first.blockNumber() + visible + highlight_margin
+        )
+        document = self.document()
+        block = document.findBlockByNumber(self.highlighter.visible_range[0])
+        while block.isValid() and block.blockNumber() <= self.highlighter.visible_range[1]:
+            if block.userData() is None:
+                self.highlighter.rehighlightBlock(block)
+            block = block.next()
+
+    def validate(self):
+        # One pass at a time, a change during the pass starts another one when it's done
+        if self.validating:
+            self.validateTimer.start()
+            return
+        revision = self.document().revision()
+        if revision == self.validatedRevision:
+            return
+        self.validating = True
+
+        def check(text):
+            return check_settings(text, self.known if self.known is not None else default_known_settings())
+
+        def checked(result):
+            self.validating = False
+            if self.document().revision() != revision:
+                # Line numbers no longer match the text, the pending timer validates again
+                self.validateTimer.start()
+                return
+            self.validatedRevision = revision
+            self.show_results(*result)
+
+        def failed(error):
+            self.validating = False
+            self.problemsLabel.setText(f"Could not check settings: {error}")
+
+        self.run_job(check, self.toPlainText(), on_done=checked, on_error=failed)
+
+    def show_results(self, sections, problems):
+        if sections != self.sections:
+            self.sections = sections
+            self.outlineSelector.clear()
+            for line, name in sections:
+                self.outlineSelector.addItem(f"[{name}]  line {line + 1}")
+
+        previous = self.problems
+        self.problems = dict(problems)
+        # Only lines whose problem mark changed are formatted again, off screen ones when they come into view
+        document = self.document()
+        first, last = self.highlighter.visible_range
+        for line in set(previous) ^ set(self.problems):
+            block = document.findBlockByNumber(line)
+            if not block.isValid():
+                continue
+            if first <= line <= last:
+                self.highlighter.rehighlightBlock(block)
+            else:
+                block.setUserData(None)
+
+        if not problems:
+            self.problemsLabel.setText("")
+            return
+        lines = [f"Line {line + 1}: {problem}" for line, problem in problems[:problems_shown]]
+        if len(problems) > problems_shown:
+            lines.append(f"... and {len(problems) - problems_shown} more")
+        self.problemsLabel.setText("\n".join(lines))
+
+    def jump_to_section(self, index):
+        if not 0 <= index < len(self.sections):
+            return
+        block = self.document().findBlockByNumber(self.sections[index][0])
+        if not block.isValid():
+            return
+        cursor = QTextCursor(block)
+        self.textEdit.setTextCursor(cursor)
+        self.textEdit.centerCursor()
+        self.textEdit.setFocus()
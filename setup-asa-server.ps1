@@ -3,7 +3,13 @@ param (
     [string]$steamCmdPath,
     [string]$installPath,
     [string]$startBatContent,
-    [string]$gameUserSettingsTemplate
+    [string]$gameUserSettingsTemplate,
+    # Set by the manager when the installed build already matches the latest one on Steam
+    [switch]$skipAppUpdate,
+    # Set by the manager between the (slower) scheduled validate runs
+    [switch]$skipValidate,
+    # Set by the manager when updating a shared game file install, the servers get start.bat/settings themselves
+    [switch]$gameFilesOnly
 )
 
 # Create SteamCMD folder if it doesn't exist
@@ -12,6 +18,10 @@ if (-not (Test-Path $steamCmdPath)) {
 }
 
 $steamCmdExecutable = Join-Path $steamCmdPath 'steamcmd.exe'
+# Same override as the manager's ASA_STEAMCMD
+if ($env:ASA_STEAMCMD) {
+    $steamCmdExecutable = $env:ASA_STEAMCMD
+}
 
 # Install SteamCMD if missing
 if (-not (Test-Path $steamCmdExecutable)) {
@@ -37,14 +47,23 @@ if (-not (Test-Path $installPath)) {
 function Run-AppUpdate {
     param([string]$message)
     Write-Host $message
-    & $steamCmdExecutable +force_install_dir "$installPath" +login anonymous +app_update 2430930 validate +quit -console
+    if ($skipValidate) {
+        & $steamCmdExecutable +force_install_dir "$installPath" +login anonymous +app_update 2430930 +quit -console
+    } else {
+        & $steamCmdExecutable +force_install_dir "$installPath" +login anonymous +app_update 2430930 validate +quit -console
+    }
 }
 
+$serverExePath = Join-Path $installPath 'ShooterGame\Binaries\Win64\ArkAscendedServer.exe'
+
 # First install/update run
-Run-AppUpdate 'Running SteamCMD to install/update ARK server...'
+if ($skipAppUpdate -and (Test-Path $serverExePath)) {
+    Write-Host 'Installed build is already the latest, skipping SteamCMD app_update.'
+} else {
+    Run-AppUpdate 'Running SteamCMD to install/update ARK server...'
+}
 
 # Check if the main executable exists, retry if not
-$serverExePath = Join-Path $installPath 'ShooterGame\Binaries\Win64\ArkAscendedServer.exe'
 if (-not (Test-Path $serverExePath)) {
     Write-Host 'Server executable not found — retrying download...'
     Run-AppUpdate 'Retrying SteamCMD app_update...'
@@ -56,6 +75,11 @@ if (-not (Test-Path $serverExePath)) {
     exit 1
 }
 
+if ($gameFilesOnly) {
+    Write-Host 'Shared ARK server game files installed or updated successfully.'
+    exit 0
+}
+
 # Create start.bat after install is complete
 $startBatPath = Join-Path (Split-Path $serverExePath -Parent) 'start.bat'
 Set-Content -Path $startBatPath -Value $startBatContent
@@ -0,0 +1,181 @@
+import json
+import os
+import shutil
+import time
+
+from steam_update import manifest_path
+
+# Paths (relative to an install) that every server keeps to itself instead of linking to the shared copy:
+# world saves and config, backups, the per-server start.bat, downloaded mods and the manager's own state
+private_paths = {
+    os.path.normcase(os.path.join("ShooterGame", "Saved")),
+    os.path.normcase(os.path.join("ShooterGame", "SavedBackups")),
+    os.path.normcase(os.path.join("ShooterGame", "Binaries", "Win64", "start.bat")),
+    os.path.normcase(os.path.join("ShooterGame", "Binaries", "Win64", "ShooterGame")),
+    "steamapps",
+}
+_ficlone = 0x40049409
+
+
+def instances_path(shared_path):
+    return os.path.join(shared_path, "steamapps", "asa_manager_instances.json")
+
+
+def marker_path(install_path):
+    return os.path.join(install_path, "steamapps", "asa_manager_shared.json")
+
+
+def _is_private(relative_path):
+    relative_path = os.path.normcase(os.path.normpath(relative_path))
+    return any(relative_path == path or relative_path.startswith(path + os.sep) for path in private_paths)
+
+
+def list_tree(root):
+    # {relative path: stat} of the shared (non-private) files under root
+    files = {}
+    for directory, dirs, names in os.walk(root):
+        relative_root = os.path.relpath(directory, root)
+        dirs[:] = [name for name in dirs if not _is_private(os.path.join(relative_root, name))]
+        for name in names:
+            relative_path = os.path.normpath(os.path.join(relative_root, name))
+            if _is_private(relative_path):
+                continue
+            try:
+                files[relative_path] = os.stat(os.path.join(directory, name))
+            except OSError:
+                continue
+    return files
+
+
+def _reflink(source, target):
+    # Copy-on-write clone (Btrfs/XFS), raises OSError where the filesystem or platform can't do it
+    import fcntl
+    with open(source, "rb") as src, open(target, "wb") as dst:
+        fcntl.ioctl(dst.fileno(), _ficlone, src.fileno())
+    shutil.copystat(source, target)
+
+
+def link_file(source, target, hardlink=True):
+    # Hardlink (both trees on one volume), else reflink, else a plain copy. Returns how the file was placed.
+    # hardlink=False gives the target its own data, for copies that get patched in place.
+    if hardlink:
+        try:
+            os.link(source, target)
+            return "linked"
+        except OSError:
+            pass
+    if os.name != "nt":
+        try:
+            _reflink(source, target)
+            return "reflinked"
+        except (ImportError, OSError):
+            if os.path.exists(target):
+                os.remove(target)
+    shutil.copy2(source, target)
+    return "copied"
+
+
+def _same_file(source_stat, target_stat):
+    if (source_stat.st_dev, source_stat.st_ino) == (target_stat.st_dev, target_stat.st_ino):
+        return True
+    # Reflinked and copied files are separate files, but carry the source's size and mtime
+    return source_stat.st_size == target_stat.st_size and source_stat.st_mtime_ns == target_stat.st_mtime_ns
+
+
+def load_instances(shared_path):
+    try:
+        with open(instances_path(shared_path), "r", encoding="utf-8") as f:
+            return json.load(f).get("instances", [])
+    except (OSError, ValueError):
+        return []
+
+
+def _save_json(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(temp_path, path)
+
+
+def register_instance(shared_path, install_path):
+    instances = [path for path in load_instances(shared_path) if os.path.isdir(path)]
+    if not any(os.path.normcase(os.path.abspath(path)) == os.path.normcase(os.path.abspath(install_path)) for path in instances):
+        instances.append(os.path.abspath(install_path))
+    _save_json(instances_path(shared_path), {"instances": instances})
+    return instances
+
+
+def _refresh_one(shared_path, install_path, shared_files):
+    stats = {"linked": 0, "reflinked": 0, "copied": 0, "unchanged": 0, "removed": 0, "failed": []}
+    current = list_tree(install_path) if os.path.isdir(install_path) else {}
+
+    for relative_path, source_stat in shared_files.items():
+        target_stat = current.get(relative_path)
+        if target_stat is not None and _same_file(source_stat, target_stat):
+            stats["unchanged"] += 1
+            continue
+
+        source = os.path.join(shared_path, relative_path)
+        target = os.path.join(install_path, relative_path)
+        temp_path = target + ".asa_link.tmp"
+        try:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            if os.path.lexists(temp_path):
+                os.remove(temp_path)
+            placed = link_file(source, temp_path)
+            # Swap in with a rename so a file is never missing or half written
+            os.replace(temp_path, target)
+            stats[placed] += 1
+        except OSError as e:
+            # Typically a file the running server holds open on Windows
+            stats["failed"].append(f"{relative_path}: {e}")
+            if os.path.lexists(temp_path):
+                os.remove(temp_path)
+
+    for relative_path in current:
+        if relative_path not in shared_files:
+            try:
+                os.remove(os.path.join(install_path, relative_path))
+                stats["removed"] += 1
+            except OSError as e:
+                stats["failed"].append(f"{relative_path}: {e}")
+
+    # The copied manifest keeps installed_build_id() working for the instance
+    if os.path.isfile(manifest_path(shared_path)):
+        os.makedirs(os.path.dirname(manifest_path(install_path)), exist_ok=True)
+        shutil.copy2(manifest_path(shared_path), manifest_path(install_path))
+    _save_json(marker_path(install_path), {
+        "shared_path": os.path.abspath(shared_path),
+        "refreshed_at": time.time(),
+        "complete": not stats["failed"],
+    })
+    return stats
+
+
+def refresh_instances(shared_path, install_paths):
+    # One walk of the shared install, then every instance is brought in line with it.
+    # Returns {install path: stats}. None of the instances may be running (see run_setup_script).
+    start = time.perf_counter()
+    shared_files = list_tree(shared_path)
+
+    results = {}
+    for install_path in install_paths:
+        instance_start = time.perf_counter()
+        results[install_path] = _refresh_one(shared_path, install_path, shared_files)
+        results[install_path]["seconds"] = time.perf_counter() - instance_start
+    return results, time.perf_counter() - start
+
+
+def describe_refresh(results):
+    lines = []
+    for install_path, stats in results.items():
+        placed = ", ".join(f"{stats[key]} {key}" for key in ("linked", "reflinked", "copied") if stats[key]) or "nothing new"
+        lines.append(
+            f"{install_path}: {placed}, {stats['unchanged']} unchanged, {stats['removed']} removed in {stats['seconds']:.1f}s."
+        )
+        for failure in stats["failed"][:10]:
+            lines.append(f"  Could not update {failure}")
+        if stats["failed"]:
+            lines.append("  Stop this server and run Install/Update again to finish.")
+    return lines
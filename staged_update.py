@@ -0,0 +1,308 @@
+import json
+import os
+import shutil
+import time
+
+from server_config import update_game_files
+from shared_install import list_tree, link_file, marker_path
+from steam_update import manifest_path, installed_build_id, installed_state_flags, state_fully_installed
+
+# Blue/green updates: SteamCMD updates a second copy of the game files (<install>.staging) while the
+# server keeps running on the live one. Switching builds is a few directory renames while the server is
+# stopped, and the tree it replaced stays next to it (<install>.previous) for a one step rollback.
+
+# Everything in the install that belongs to this server rather than to the game build. These move
+# from the old tree to the new one on every switch, untouched.
+carried_paths = [
+    os.path.join("ShooterGame", "Saved"),
+    os.path.join("ShooterGame", "SavedBackups"),
+    os.path.join("ShooterGame", "Binaries", "Win64", "start.bat"),
+    os.path.join("ShooterGame", "Binaries", "Win64", "ShooterGame"),
+]
+# Manager state in steamapps (hash caches, watchdog incidents, this module's history) moves too
+carried_state_prefix = "asa_manager_"
+server_exe_path = os.path.join("ShooterGame", "Binaries", "Win64", "ArkAscendedServer.exe")
+history_limit = 50
+# A folder can stay locked for a moment after the server exits (virus scanners, the exiting process)
+rename_attempts = 5
+rename_retry_seconds = 1.0
+
+
+class StagedUpdateError(Exception):
+    pass
+
+
+def staging_path(install_path):
+    return os.path.normpath(install_path) + ".staging"
+
+
+def previous_path(install_path):
+    return os.path.normpath(install_path) + ".previous"
+
+
+def trash_path(install_path):
+    return os.path.normpath(install_path) + ".old"
+
+
+def staged_marker_path(install_path):
+    return os.path.join(install_path, "steamapps", "asa_manager_staged.json")
+
+
+def history_path(install_path):
+    return os.path.join(install_path, "steamapps", "asa_manager_switches.json")
+
+
+def _load_json(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _save_json(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    os.replace(temp_path, path)
+
+
+def _remove_tree(path):
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path, ignore_errors=True)
+    elif os.path.lexists(path):
+        os.remove(path)
+
+
+def remove_trash(install_path):
+    # The tree pushed out by the previous switch, deleted after the server is back up
+    _remove_tree(trash_path(install_path))
+
+
+def seed_staging(install_path, staging):
+    # Brings the staging copy in line with the live game files, so SteamCMD only downloads what changed.
+    # Files are reflinked or copied, never hardlinked: SteamCMD may patch files in place, and that must
+    # not reach the files the running server uses.
+    stats = {"reflinked": 0, "copied": 0, "unchanged": 0, "removed": 0, "recycled": False}
+    # The tree the last switch replaced is one build behind the live one. Reusing it as the staging copy
+    # leaves only the files that build changed to copy, instead of the whole install.
+    previous = previous_path(install_path)
+    if not os.path.lexists(staging) and os.path.isdir(previous):
+        os.rename(previous, staging)
+        stats["recycled"] = True
+    live_files = list_tree(install_path)
+    current = list_tree(staging) if os.path.isdir(staging) else {}
+
+    for relative_path, source_stat in live_files.items():
+        target_stat = current.get(relative_path)
+        if target_stat and target_stat.st_size == source_stat.st_size and target_stat.st_mtime_ns == source_stat.st_mtime_ns:
+            stats["unchanged"] += 1
+            continue
+        target = os.path.join(staging, relative_path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        if os.path.lexists(target):
+            os.remove(target)
+        stats[link_file(os.path.join(install_path, relative_path), target, hardlink=False)] += 1
+
+    for relative_path in current:
+        if relative_path not in live_files:
+            os.remove(os.path.join(staging, relative_path))
+            stats["removed"] += 1
+
+    # With the live manifest SteamCMD sees the installed build and only fetches the difference
+    os.makedirs(os.path.dirname(manifest_path(staging)), exist_ok=True)
+    shutil.copy2(manifest_path(install_path), manifest_path(staging))
+    return stats
+
+
+def verify_staging(staging):
+    problems = []
+    if not installed_build_id(staging):
+        problems.append("no app manifest with a build id")
+    flags = installed_state_flags(staging)
+    if flags != state_fully_installed:
+        problems.append(f"SteamCMD reports the app as not fully installed (StateFlags {flags})")
+    if not os.path.isfile(os.path.join(staging, server_exe_path)):
+        problems.append(f"{server_exe_path} is missing")
+    return problems
+
+
+def stage_update(log_buffer, steam_cmd_path, install_path, progress=None):
+    # Runs while the server is up. Returns 0 once a verified build is waiting in the staging copy.
+    if not installed_build_id(install_path):
+        log_buffer.push("Staged updates need an installed server, run a normal Install/Update first.")
+        return 1
+    if os.path.isfile(marker_path(install_path)):
+        log_buffer.push("This server uses a shared game file install, update that instead of staging a copy.")
+        return 1
+
+    staging = staging_path(install_path)
+    start = time.perf_counter()
+    remove_trash(install_path)
+    if os.path.exists(staged_marker_path(staging)):
+        os.remove(staged_marker_path(staging))
+
+    log_buffer.push(f"Preparing the staging copy at {staging}...")
+    try:
+        stats = seed_staging(install_path, staging)
+    except OSError as e:
+        log_buffer.push(f"Could not prepare the staging copy: {e}")
+        return 1
+    if stats["recycled"]:
+        log_buffer.push(
+            f"Reused the previous build from {previous_path(install_path)} as the staging copy, "
+            "there is nothing to roll back to until the next switch."
+        )
+    log_buffer.push(
+        f"Staging copy ready: {stats['reflinked']} reflinked, {stats['copied']} copied, {stats['unchanged']} unchanged, "
+        f"{stats['removed']} removed in {time.perf_counter() - start:.1f}s."
+    )
+
+    return_code = update_game_files(log_buffer, steam_cmd_path, staging, progress)
+    if return_code != 0:
+        log_buffer.push(f"SteamCMD failed on the staging copy (exit code {return_code}), the live server is unchanged.")
+        return return_code
+
+    problems = verify_staging(staging)
+    if problems:
+        for problem in problems:
+            log_buffer.push(f"Staged build not usable: {problem}")
+        return 1
+
+    info = {
+        "build_id": installed_build_id(staging),
+        "from_build": installed_build_id(install_path),
+        "staged_at": time.time(),
+        "seconds": time.perf_counter() - start,
+    }
+    _save_json(staged_marker_path(staging), info)
+    if info["build_id"] == info["from_build"]:
+        log_buffer.push(f"Staged copy verified, build {info['build_id']} is the same build the server runs.")
+    else:
+        log_buffer.push(f"Build {info['build_id']} is staged and verified, ready to switch from {info['from_build']}.")
+    return 0
+
+
+def staged_info(install_path):
+    # The verified staged build waiting to be switched to, or None
+    return _load_json(staged_marker_path(staging_path(install_path)))
+
+
+def _rename(source, target, moves):
+    for attempt in range(rename_attempts):
+        try:
+            os.rename(source, target)
+            break
+        except OSError:
+            if attempt == rename_attempts - 1:
+                raise
+            time.sleep(rename_retry_seconds)
+    moves.append((source, target))
+
+
+def _undo(moves):
+    for source, target in reversed(moves):
+        try:
+            os.rename(target, source)
+        except OSError:
+            pass
+
+
+def _carry_over(old_tree, new_tree, moves):
+    for relative_path in carried_paths:
+        source = os.path.join(old_tree, relative_path)
+        if not os.path.lexists(source):
+            continue
+        target = os.path.join(new_tree, relative_path)
+        _remove_tree(target)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        _rename(source, target, moves)
+
+    # Files the new tree already has describe its own build (update state, SteamCMD log), they stay
+    old_steamapps = os.path.join(old_tree, "steamapps")
+    new_steamapps = os.path.join(new_tree, "steamapps")
+    names = os.listdir(old_steamapps) if os.path.isdir(old_steamapps) else []
+    for name in names:
+        target = os.path.join(new_steamapps, name)
+        if name.startswith(carried_state_prefix) and not os.path.exists(target):
+            os.makedirs(new_steamapps, exist_ok=True)
+            _rename(os.path.join(old_steamapps, name), target, moves)
+
+
+def _switch(install_path, new_tree, old_tree_target):
+    # Moves this server's own files into new_tree, then puts new_tree in place of the live tree. Either
+    # every step happens or none does. The server must be stopped.
+    moves = []
+    start = time.perf_counter()
+    try:
+        if os.path.lexists(old_tree_target):
+            _remove_tree(trash_path(install_path))
+            _rename(old_tree_target, trash_path(install_path), moves)
+        _carry_over(install_path, new_tree, moves)
+        _rename(install_path, old_tree_target, moves)
+        _rename(new_tree, install_path, moves)
+    except OSError as e:
+        _undo(moves)
+        raise StagedUpdateError(f"Could not switch builds, the server was left on its current files: {e}")
+    return time.perf_counter() - start
+
+
+def swap_in(install_path):
+    info = staged_info(install_path)
+    if not info:
+        raise StagedUpdateError("No verified staged build to switch to, stage an update first.")
+    from_build = installed_build_id(install_path)
+    seconds = _switch(install_path, staging_path(install_path), previous_path(install_path))
+    os.remove(staged_marker_path(install_path))
+    return {
+        "action": "update", "from_build": from_build, "to_build": info["build_id"],
+        "staged_seconds": info.get("seconds"), "switch_seconds": seconds,
+    }
+
+
+def roll_back(install_path):
+    # The build that was replaced last goes back in, the one it replaces becomes the staging copy
+    previous = previous_path(install_path)
+    if not installed_build_id(previous):
+        raise StagedUpdateError(f"No previous build at {previous} to roll back to.")
+    from_build = installed_build_id(install_path)
+    to_build = installed_build_id(previous)
+    seconds = _switch(install_path, previous, staging_path(install_path))
+    return {"action": "rollback", "from_build": from_build, "to_build": to_build, "switch_seconds": seconds}
+
+
+def load_history(install_path):
+    return (_load_json(history_path(install_path)) or {}).get("switches", [])
+
+
+def finish_switch(install_path, entry, down_since=None):
+    # Records the switch once the server is back up, with the downtime measured from when it was stopped
+    entry["at"] = time.time()
+    entry["downtime_seconds"] = entry["at"] - down_since if down_since else None
+    history = (load_history(install_path) + [entry])[-history_limit:]
+    _save_json(history_path(install_path), {"switches": history})
+    remove_trash(install_path)
+    return describe_switch(entry)
+
+
+def describe_switch(entry):
+    verb = "Rolled back" if entry["action"] == "rollback" else "Switched"
+    line = f"{verb} from build {entry['from_build']} to {entry['to_build']}, files swapped in {entry['switch_seconds']:.1f}s"
+    if entry.get("downtime_seconds") is not None:
+        line += f", server down for {entry['downtime_seconds']:.0f}s"
+    return line + "."
+
+
+def switch_builds(install_path, stop_server=None, start_server=None, rollback=False):
+    # stop_server/start_server are left out when the server isn't running. The server is started again
+    # even when the switch fails, on whichever build is in place.
+    down_since = time.time() if stop_server else None
+    if stop_server:
+        stop_server()
+    try:
+        entry = roll_back(install_path) if rollback else swap_in(install_path)
+    finally:
+        if start_server:
+            start_server()
+    return finish_switch(install_path, entry, down_since)
@@ -0,0 +1,125 @@
+import locale
+import re
+import threading
+import time
+from collections import deque
+
+# " Update state (0x61) downloading, progress: 45.12 (5234567890 / 11602345678)"
+_progress_pattern = re.compile(r"Update state \((0x[0-9a-fA-F]+)\) ([^,]+), progress: ([\d.]+) \((\d+) / (\d+)\)")
+_success_pattern = re.compile(r"^Success! App '\d+'")
+_error_pattern = re.compile(r"^Error! App '\d+'")
+# Rate is measured over this many seconds of progress lines
+rate_window_seconds = 10
+# Read size for the SteamCMD/PowerShell pipe
+read_chunk_size = 64 * 1024
+
+
+def split_lines(stream, on_line, encoding=None):
+    # Reads a binary pipe in chunks and calls on_line for every line. SteamCMD redraws its progress
+    # with "\r", so a carriage return ends a line the same way "\n" does. Blank lines are dropped.
+    encoding = encoding or locale.getpreferredencoding(False)
+    pending = b""
+    while True:
+        chunk = stream.read(read_chunk_size)
+        if not chunk:
+            break
+        parts = re.split(b"[\r\n]+", pending + chunk)
+        pending = parts.pop()
+        for part in parts:
+            line = part.decode(encoding, errors="replace").strip()
+            if line:
+                on_line(line)
+    line = pending.decode(encoding, errors="replace").strip()
+    if line:
+        on_line(line)
+
+
+def format_bytes(count):
+    if count < 1024:
+        return f"{count:.0f} B"
+    for unit in ("KB", "MB", "GB"):
+        count /= 1024
+        if count < 1024 or unit == "GB":
+            return f"{count:.1f} {unit}"
+
+
+def format_seconds(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02}:{seconds:02}" if hours else f"{minutes}:{seconds:02}"
+
+
+class SteamProgress:
+    # Progress of a SteamCMD app_update, fed one output line at a time from the runner thread
+    # and read by whoever shows it (the GUI polls snapshot() on a timer)
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.phase = None
+        self.state = None
+        self.done = 0
+        self.total = 0
+        self.finished = None
+        self.samples = deque()
+        self.lines = 0
+        self.progress_lines = 0
+
+    def feed(self, line):
+        # Returns True for progress lines, which callers may leave out of the console
+        with self.lock:
+            self.lines += 1
+            match = _progress_pattern.search(line)
+            if not match:
+                if _success_pattern.match(line):
+                    self.finished = "success"
+                    self.done = self.total
+                elif _error_pattern.match(line):
+                    self.finished = "error"
+                return False
+
+            self.progress_lines += 1
+            state, phase, done, total = match.group(1), match.group(2).strip(), int(match.group(4)), int(match.group(5))
+            now = self.clock()
+            if phase != self.phase:
+                # Each phase (preallocating, downloading, verifying) counts its bytes from zero again
+                self.samples.clear()
+            self.phase = phase
+            self.state = state
+            self.done = done
+            self.total = total
+            self.samples.append((now, done))
+            while len(self.samples) > 2 and now - self.samples[0][0] > rate_window_seconds:
+                self.samples.popleft()
+            return True
+
+    def snapshot(self):
+        with self.lock:
+            rate = 0.0
+            if len(self.samples) > 1:
+                (start, start_done), (end, end_done) = self.samples[0], self.samples[-1]
+                if end > start:
+                    rate = max(0.0, (end_done - start_done) / (end - start))
+            eta = (self.total - self.done) / rate if rate and self.total else None
+            return {
+                "phase": self.phase,
+                "state": self.state,
+                "done": self.done,
+                "total": self.total,
+                "percent": 100.0 * self.done / self.total if self.total else 0.0,
+                "rate": rate,
+                "eta": eta,
+                "finished": self.finished,
+            }
+
+    def describe(self, snapshot=None):
+        snapshot = snapshot or self.snapshot()
+        if not snapshot["phase"]:
+            return "Waiting for SteamCMD..."
+        text = f"{snapshot['phase'].capitalize()}: {snapshot['percent']:.1f}%"
+        if snapshot["total"]:
+            text += f" ({format_bytes(snapshot['done'])} / {format_bytes(snapshot['total'])})"
+        if snapshot["rate"]:
+            text += f" at {format_bytes(snapshot['rate'])}/s"
+        if snapshot["eta"] is not None:
+            text += f", {format_seconds(snapshot['eta'])} left"
+        return text
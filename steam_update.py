@@ -0,0 +1,156 @@
+import json
+import os
+import re
+import subprocess
+import time
+
+ark_app_id = "2430930"
+# A full "validate" re-hashes the whole install, so only do it this often
+default_validate_interval = 7 * 24 * 60 * 60
+# How long a "latest build" answer from Steam is trusted before asking again
+default_latest_cache_seconds = 10 * 60
+
+_build_id_pattern = re.compile(r'"buildid"\s+"(\d+)"')
+_state_flags_pattern = re.compile(r'"StateFlags"\s+"(\d+)"')
+# StateFlags value of an app that is fully installed and up to date
+state_fully_installed = 4
+_public_branch_pattern = re.compile(r'"public"\s*\{[^{}]*?"buildid"\s+"(\d+)"', re.S)
+
+
+def manifest_path(install_path):
+    return os.path.join(install_path, "steamapps", f"appmanifest_{ark_app_id}.acf")
+
+
+def update_state_path(install_path):
+    return os.path.join(install_path, "steamapps", "asa_manager_update.json")
+
+
+def steam_cmd_executable(steam_cmd_path):
+    # ASA_STEAMCMD points at a different executable, e.g. a stand-in when running off Windows
+    return os.environ.get("ASA_STEAMCMD") or os.path.join(steam_cmd_path, "steamcmd.exe")
+
+
+def _manifest_value(install_path, pattern):
+    try:
+        with open(manifest_path(install_path), "r", encoding="utf-8", errors="replace") as f:
+            match = pattern.search(f.read())
+    except OSError:
+        return None
+    return match.group(1) if match else None
+
+
+def installed_build_id(install_path):
+    return _manifest_value(install_path, _build_id_pattern)
+
+
+def installed_state_flags(install_path):
+    flags = _manifest_value(install_path, _state_flags_pattern)
+    return int(flags) if flags else None
+
+
+def parse_latest_build_id(app_info_output):
+    match = _public_branch_pattern.search(app_info_output)
+    return match.group(1) if match else None
+
+
+def query_latest_build_id(steam_cmd_path, timeout=120):
+    result = subprocess.run(
+        [
+            steam_cmd_executable(steam_cmd_path), "+login", "anonymous",
+            "+app_info_update", "1", "+app_info_print", ark_app_id, "+quit"
+        ],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        universal_newlines=True,
+        errors="replace",
+        timeout=timeout,
+        creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0)
+    )
+    return parse_latest_build_id(result.stdout)
+
+
+def load_update_state(install_path):
+    try:
+        with open(update_state_path(install_path), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_update_state(install_path, state):
+    path = update_state_path(install_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(temp_path, path)
+
+
+class UpdatePlan:
+    def __init__(self, run_update, validate, installed, latest, reason, timings):
+        self.run_update = run_update
+        self.validate = validate
+        self.installed = installed
+        self.latest = latest
+        self.reason = reason
+        self.timings = timings
+
+    def describe(self):
+        if not self.run_update:
+            return f"Build {self.installed} is current, skipping SteamCMD app_update ({self.reason})."
+        action = "update with validate" if self.validate else "update without validate"
+        return f"Running SteamCMD {action}: {self.reason}."
+
+
+def plan_update(install_path, steam_cmd_path, validate_interval=default_validate_interval,
+                latest_cache_seconds=default_latest_cache_seconds, query_latest=query_latest_build_id, now=None):
+    now = time.time() if now is None else now
+    state = load_update_state(install_path)
+    timings = {}
+
+    start = time.perf_counter()
+    installed = installed_build_id(install_path)
+    timings["read_manifest"] = time.perf_counter() - start
+
+    validate_due = now - state.get("last_validate_at", 0) >= validate_interval
+
+    if installed is None:
+        return UpdatePlan(True, True, None, None, "no installed build found", timings)
+
+    latest = state.get("latest_build_id")
+    if latest is None or now - state.get("latest_checked_at", 0) >= latest_cache_seconds:
+        start = time.perf_counter()
+        try:
+            latest = query_latest(steam_cmd_path)
+        except (OSError, subprocess.SubprocessError):
+            latest = None
+        timings["query_latest"] = time.perf_counter() - start
+
+        if latest:
+            state["latest_build_id"] = latest
+            state["latest_checked_at"] = now
+            save_update_state(install_path, state)
+
+    if validate_due:
+        return UpdatePlan(True, True, installed, latest, "scheduled validate is due", timings)
+    if latest is None:
+        return UpdatePlan(True, False, installed, None, "could not determine the latest build", timings)
+    if latest != installed:
+        return UpdatePlan(True, False, installed, latest, f"build {installed} -> {latest}", timings)
+    return UpdatePlan(False, False, installed, latest, "no new build", timings)
+
+
+def record_update_result(install_path, plan, timings, now=None):
+    now = time.time() if now is None else now
+    state = load_update_state(install_path)
+    installed = installed_build_id(install_path)
+
+    if plan.validate:
+        state["last_validate_at"] = now
+    if installed:
+        state["installed_build_id"] = installed
+    if plan.run_update:
+        state["last_update_at"] = now
+    state["last_timings"] = dict(plan.timings, **timings)
+    save_update_state(install_path, state)
+    return installed
@@ -0,0 +1,76 @@
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+
+class NoSuchProcess(Exception):
+    pass
+
+
+class AccessDenied(Exception):
+    pass
+
+
+class FakeProcessSource:
+    # Stand-in for the parts of psutil the metrics sampler uses. Processes are made up with
+    # add(), report fixed numbers and disappear with remove(). Swap it in for metrics.psutil.
+    NoSuchProcess = NoSuchProcess
+    AccessDenied = AccessDenied
+
+    def __init__(self):
+        self.table = {}
+        self.children = {}
+        self.children_calls = 0
+        source = self
+
+        class Process:
+            def __init__(self, pid):
+                if pid not in source.table:
+                    raise NoSuchProcess(pid)
+                self.pid = pid
+
+            def __info(self):
+                info = source.table.get(self.pid)
+                if info is None:
+                    raise NoSuchProcess(self.pid)
+                return info
+
+            @contextmanager
+            def oneshot(self):
+                yield
+
+            def cpu_percent(self, interval=None):
+                return self.__info()["cpu"]
+
+            def memory_info(self):
+                return SimpleNamespace(rss=self.__info()["rss"])
+
+            def num_threads(self):
+                return self.__info()["threads"]
+
+            def io_counters(self):
+                info = self.__info()
+                return SimpleNamespace(read_bytes=info["read_bytes"], write_bytes=info["write_bytes"])
+
+            def children(self, recursive=False):
+                self.__info()
+                source.children_calls += 1
+                found = []
+                parents = [self.pid]
+                while parents:
+                    children = [pid for parent in parents for pid in source.children.get(parent, ())]
+                    found += children
+                    parents = children if recursive else []
+                return [Process(pid) for pid in found]
+
+        self.Process = Process
+
+    def add(self, pid, parent=None, cpu=0.0, rss=0, threads=1, read_bytes=0, write_bytes=0):
+        self.table[pid] = {
+            "parent": parent, "cpu": cpu, "rss": rss, "threads": threads, "read_bytes": read_bytes, "write_bytes": write_bytes
+        }
+        self.children.setdefault(parent, []).append(pid)
+
+    def remove(self, pid):
+        info = self.table.pop(pid, None)
+        if info:
+            self.children[info["parent"]].remove(pid)
@@ -0,0 +1,96 @@
+import socket
+import struct
+import threading
+
+from rcon import encode_packet, SERVERDATA_AUTH, SERVERDATA_AUTH_RESPONSE, SERVERDATA_EXECCOMMAND, SERVERDATA_RESPONSE_VALUE
+
+
+class FakeRconServer:
+    # Local Source RCON server for tests. Replies "<command> ok" to every command. Commands that
+    # arrive together (a pipelined batch) are answered in reverse order, so clients have to match
+    # replies by request id. Replies longer than packet_size are split over several packets, and an empty
+    # SERVERDATA_RESPONSE_VALUE is echoed after the reply to the command before it, like a Source server does.
+    def __init__(self, password="secret", replies=None, packet_size=4096):
+        self.password = password
+        self.replies = replies or {}
+        self.packet_size = packet_size
+        self.commands = []
+        self.logins = 0
+        self.connections = []
+        self.listener = socket.create_server(("127.0.0.1", 0))
+        self.port = self.listener.getsockname()[1]
+        threading.Thread(target=self.__accept, daemon=True).start()
+
+    def __accept(self):
+        while True:
+            try:
+                sock, _ = self.listener.accept()
+            except OSError:
+                return
+            self.connections.append(sock)
+            threading.Thread(target=self.__serve, args=(sock,), daemon=True).start()
+
+    def __serve(self, sock):
+        pending = b""
+        try:
+            while True:
+                chunk = sock.recv(65536)
+                if not chunk:
+                    break
+                pending += chunk
+                packets = []
+                while len(pending) >= 4:
+                    size = struct.unpack("<i", pending[:4])[0]
+                    if len(pending) < 4 + size:
+                        break
+                    request_id, packet_type = struct.unpack("<ii", pending[4:12])
+                    packets.append((request_id, packet_type, pending[12:4 + size - 2].decode("utf-8")))
+                    pending = pending[4 + size:]
+                sock.sendall(self.__answer(packets))
+        except OSError:
+            pass
+        sock.close()
+
+    def __answer(self, packets):
+        auth_replies = []
+        # One group per command, its reply packets then the echoes of what came after it
+        groups = []
+        for request_id, packet_type, body in packets:
+            if packet_type == SERVERDATA_AUTH:
+                ok = body == self.password
+                self.logins += ok
+                auth_replies.append(encode_packet(request_id if ok else -1, SERVERDATA_AUTH_RESPONSE, ""))
+            elif packet_type == SERVERDATA_EXECCOMMAND:
+                self.commands.append(body)
+                reply = self.replies.get(body, f"{body} ok")
+                groups.append([
+                    encode_packet(request_id, SERVERDATA_RESPONSE_VALUE, reply[i:i + self.packet_size])
+                    for i in range(0, max(len(reply), 1), self.packet_size)
+                ])
+            elif packet_type == SERVERDATA_RESPONSE_VALUE:
+                echo = [encode_packet(request_id, SERVERDATA_RESPONSE_VALUE, ""),
+                        encode_packet(request_id, SERVERDATA_RESPONSE_VALUE, "\x00\x01\x00\x00")]
+                if groups:
+                    groups[-1] += echo
+                else:
+                    groups.append(echo)
+        return b"".join(auth_replies + [packet for group in reversed(groups) for packet in group])
+
+    def drop_connections(self):
+        # What a server restart looks like to a connected client
+        for sock in self.connections:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            sock.close()
+        self.connections = []
+
+    def close(self):
+        # shutdown wakes the accept thread, close alone leaves the port listening on Linux
+        try:
+            self.listener.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.listener.close()
+        self.drop_connections()
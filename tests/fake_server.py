@@ -0,0 +1,45 @@
+import argparse
+import sys
+import time
+
+# Stands in for start.bat/ArkAscendedServer.exe in tests: prints a log, then exits, crashes or hangs
+
+ready_line = "Server has completed startup and is now advertising for join."
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lines", type=int, default=0, help="Print this many log lines first")
+    parser.add_argument("--rate", type=int, default=0, help="Lines per second, 0 prints them as fast as possible")
+    parser.add_argument("--ready", action="store_true", help="Print the startup complete line")
+    parser.add_argument("--then", choices=["run", "exit", "crash", "hang", "fatal"], default="run")
+    parser.add_argument("--after", type=float, default=0.0, help="Seconds before --then happens")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    for number in range(args.lines):
+        print(f"log line {number}")
+        # Written in bursts of a millisecond's worth of lines, like a busy server flushing its log
+        if args.rate and number % max(1, args.rate // 1000) == 0:
+            sys.stdout.flush()
+            time.sleep(max(0.0, start + number / args.rate - time.perf_counter()))
+    if args.ready:
+        print(ready_line)
+    sys.stdout.flush()
+    time.sleep(args.after)
+
+    if args.then == "exit":
+        return 0
+    if args.then == "crash":
+        print("Segmentation fault", flush=True)
+        return 3
+    if args.then == "fatal":
+        # Logs a crash but keeps the process alive, like the crash reporter does
+        print("Fatal error! Access violation", flush=True)
+    # run/hang/fatal: stay up without printing anything until killed
+    while True:
+        time.sleep(1)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
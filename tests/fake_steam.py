@@ -0,0 +1,119 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+# Stand-ins for steamcmd.exe and powershell running setup-asa-server.ps1, selected by the first argument.
+# Driven by environment variables so a test can publish a new build between runs:
+#   FAKE_STEAM_BUILD     build id Steam reports and app_update installs
+#   FAKE_STEAM_CALLS     file that gets one JSON line per invocation
+#   FAKE_STEAM_PROGRESS  number of "Update state" progress lines app_update prints (default 20)
+#   FAKE_STEAM_FAIL      exit code app_update returns without installing anything
+
+app_id = "2430930"
+server_exe = os.path.join("ShooterGame", "Binaries", "Win64", "ArkAscendedServer.exe")
+game_files = [os.path.join("ShooterGame", "Content", "Paks", f"pak{number}.pak") for number in range(3)]
+
+
+def record(kind, args):
+    path = os.environ.get("FAKE_STEAM_CALLS")
+    if path:
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"kind": kind, "args": args}) + "\n")
+
+
+def write(text):
+    sys.stdout.buffer.write(text.encode("utf-8"))
+    sys.stdout.buffer.flush()
+
+
+def steamcmd(args):
+    record("steamcmd", args)
+    build = os.environ.get("FAKE_STEAM_BUILD", "100")
+    if "+app_info_print" in args:
+        write(f'"{app_id}"\n{{\n\t"depots"\n\t{{\n\t\t"branches"\n\t\t{{\n\t\t\t"public"\n\t\t\t{{\n'
+              f'\t\t\t\t"buildid"\t\t"{build}"\n\t\t\t}}\n\t\t}}\n\t}}\n}}\n')
+        return 0
+    if "+app_update" not in args:
+        return 0
+
+    install_path = args[args.index("+force_install_dir") + 1]
+    write("Redirecting stderr to 'steamcmd.log'\nLogging in user 'anonymous' to Steam Public...OK\n")
+    if os.environ.get("FAKE_STEAM_FAIL"):
+        write(f"Error! App '{app_id}' state is 0x202 after update job.\n")
+        return int(os.environ["FAKE_STEAM_FAIL"])
+
+    total = 1000000
+    count = int(os.environ.get("FAKE_STEAM_PROGRESS", "20"))
+    for number in range(count):
+        done = total * number // max(1, count)
+        # SteamCMD redraws its progress with carriage returns
+        write(f" Update state (0x61) downloading, progress: {100.0 * done / total:.2f} ({done} / {total})\r")
+    if "validate" in args:
+        write(f" Update state (0x81) verifying update, progress: 100.00 ({total} / {total})\n")
+
+    for relative_path in [server_exe] + game_files:
+        path = os.path.join(install_path, relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        current = open(path, encoding="utf-8").read() if os.path.exists(path) else None
+        # Only files of another build are rewritten, like a real delta update
+        if current != f"{relative_path} build {build}":
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(f"{relative_path} build {build}")
+    manifest = os.path.join(install_path, "steamapps", f"appmanifest_{app_id}.acf")
+    os.makedirs(os.path.dirname(manifest), exist_ok=True)
+    with open(manifest, "w", encoding="utf-8") as f:
+        f.write(f'"AppState"\n{{\n\t"appid"\t\t"{app_id}"\n\t"StateFlags"\t\t"4"\n\t"buildid"\t\t"{build}"\n}}\n')
+    write(f"Success! App '{app_id}' fully installed.\n")
+    return 0
+
+
+def powershell(args):
+    # Does what setup-asa-server.ps1 does, with ASA_STEAMCMD as the SteamCMD executable
+    record("powershell", args)
+    options = {}
+    switches = set()
+    index = args.index("-File") + 2
+    while index < len(args):
+        name = args[index].lstrip("-")
+        if name in ("skipAppUpdate", "skipValidate", "gameFilesOnly"):
+            switches.add(name)
+            index += 1
+        else:
+            options[name] = args[index + 1]
+            index += 2
+
+    install_path = options["installPath"]
+    os.makedirs(install_path, exist_ok=True)
+    exe_path = os.path.join(install_path, server_exe)
+    if "skipAppUpdate" in switches and os.path.exists(exe_path):
+        write("Installed build is already the latest, skipping SteamCMD app_update.\n")
+    else:
+        command = [os.environ["ASA_STEAMCMD"], "+force_install_dir", install_path, "+login", "anonymous", "+app_update", app_id]
+        if "skipValidate" not in switches:
+            command.append("validate")
+        sys.stdout.flush()
+        return_code = subprocess.call(command + ["+quit"])
+        if return_code:
+            return return_code
+    if not os.path.exists(exe_path):
+        write("ERROR: ARK server executable still missing after install attempts.\n")
+        return 1
+    if "gameFilesOnly" in switches:
+        return 0
+
+    with open(os.path.join(os.path.dirname(exe_path), "start.bat"), "w", encoding="utf-8") as f:
+        f.write(options.get("startBatContent", "") + "\n")
+    settings = os.path.join(install_path, "ShooterGame", "Saved", "Config", "WindowsServer", "GameUserSettings.ini")
+    if not os.path.exists(settings):
+        os.makedirs(os.path.dirname(settings), exist_ok=True)
+        with open(settings, "w", encoding="utf-8") as f:
+            f.write(options.get("gameUserSettingsTemplate", ""))
+    write("ARK server installed or updated successfully.\n")
+    return 0
+
+
+if __name__ == "__main__":
+    handler = steamcmd if sys.argv[1] == "steamcmd" else powershell
+    sys.exit(handler(sys.argv[2:]))
@@ -0,0 +1,56 @@
+import json
+import os
+import sys
+import time
+
+tests_dir = os.path.dirname(os.path.abspath(__file__))
+
+
+def fake_server_command(*args):
+    return [sys.executable, os.path.join(tests_dir, "fake_server.py"), *args]
+
+
+def wait_for(condition, timeout=10.0, interval=0.01):
+    deadline = time.time() + timeout
+    while not condition():
+        if time.time() > deadline:
+            raise AssertionError("Timed out waiting for the condition")
+        time.sleep(interval)
+
+
+class FakeSteam:
+    # Points ASA_STEAMCMD/ASA_POWERSHELL at fake_steam.py and lets a test publish builds
+    def __init__(self, directory, monkeypatch, build="100"):
+        self.calls_path = os.path.join(directory, "fake_steam_calls.jsonl")
+        self.monkeypatch = monkeypatch
+        script = os.path.join(tests_dir, "fake_steam.py")
+        for kind, variable in (("steamcmd", "ASA_STEAMCMD"), ("powershell", "ASA_POWERSHELL")):
+            path = os.path.join(directory, f"fake_{kind}")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(f'#!/bin/sh\nexec "{sys.executable}" "{script}" {kind} "$@"\n')
+            os.chmod(path, 0o755)
+            monkeypatch.setenv(variable, path)
+        monkeypatch.setenv("FAKE_STEAM_CALLS", self.calls_path)
+        self.publish(build)
+
+    def publish(self, build):
+        self.monkeypatch.setenv("FAKE_STEAM_BUILD", str(build))
+
+    def calls(self, kind=None):
+        if not os.path.exists(self.calls_path):
+            return []
+        with open(self.calls_path, "r", encoding="utf-8") as f:
+            calls = [json.loads(line) for line in f]
+        return [call["args"] for call in calls if kind is None or call["kind"] == kind]
+
+    def app_updates(self):
+        return [args for args in self.calls("steamcmd") if "+app_update" in args]
+
+
+class LineSink:
+    # Collects what would go to the console
+    def __init__(self):
+        self.lines = []
+
+    def push(self, line):
+        self.lines.append(line)
@@ -0,0 +1,72 @@
+import os
+import time
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+QtCore = pytest.importorskip("PyQt5.QtCore")
+QtWidgets = pytest.importorskip("PyQt5.QtWidgets")
+
+import ini_model
+from ASAServerManager import BackgroundJob
+
+# Each file open takes this long, like an install drive on a slow network share
+slow_open_seconds = 0.5
+timer_interval_ms = 10
+
+
+@pytest.fixture
+def app():
+    return QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+
+@pytest.fixture
+def slow_files(monkeypatch):
+    def slow_open(*args, **kwargs):
+        time.sleep(slow_open_seconds)
+        return open(*args, **kwargs)
+
+    monkeypatch.setattr(ini_model, "open", slow_open, raising=False)
+    ini_model._cache.clear()
+
+
+def run_in_background(app, fn, *args):
+    # Runs fn as the window does and counts how often a timer fired on the GUI thread meanwhile
+    ticks = []
+    timer = QtCore.QTimer()
+    timer.setInterval(timer_interval_ms)
+    timer.timeout.connect(lambda: ticks.append(time.perf_counter()))
+    results = []
+    job = BackgroundJob(fn, *args)
+    job.signals.finished.connect(results.append)
+    job.signals.failed.connect(results.append)
+    timer.start()
+    QtCore.QThreadPool.globalInstance().start(job)
+    deadline = time.time() + 10
+    while not results and time.time() < deadline:
+        app.processEvents(QtCore.QEventLoop.AllEvents, 50)
+    timer.stop()
+    return results, ticks
+
+
+def longest_gap(ticks):
+    return max((b - a for a, b in zip(ticks, ticks[1:])), default=0.0)
+
+
+def test_timers_keep_firing_during_a_slow_load(app, slow_files, tmp_path):
+    path = tmp_path / "GameUserSettings.ini"
+    path.write_text("[ServerSettings]\nXPMultiplier=2\n", encoding="utf-8")
+    results, ticks = run_in_background(app, ini_model.read_ini_text, str(path))
+    assert results == ["[ServerSettings]\nXPMultiplier=2\n"]
+    # The load took at least slow_open_seconds, the GUI thread kept servicing its timer throughout
+    assert len(ticks) >= slow_open_seconds * 1000 / timer_interval_ms / 2
+    assert longest_gap(ticks) < 0.2
+
+
+def test_timers_keep_firing_during_a_slow_save(app, slow_files, tmp_path):
+    path = tmp_path / "Game.ini"
+    path.write_text("[/script/shootergame.shootergamemode]\n", encoding="utf-8")
+    results, ticks = run_in_background(app, ini_model.save_ini_text, str(path), "[/script/shootergame.shootergamemode]\nA=1\n")
+    assert results == [True]
+    assert path.read_text(encoding="utf-8").endswith("A=1\n")
+    assert longest_gap(ticks) < 0.2
@@ -0,0 +1,182 @@
+import os
+import random
+import time
+
+import pytest
+
+from backup import BackupError, BackupStore, backup_dir, backup_server, chunk_boundaries, chunk_max_size, list_source_files, saved_dir
+
+
+def random_bytes(size, seed):
+    return random.Random(seed).randbytes(size)
+
+
+def write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def make_saved_tree(directory):
+    write(os.path.join(directory, "SavedArks", "TheIsland_WP", "TheIsland_WP.ark"), random_bytes(3 * 1024 * 1024, 1))
+    write(os.path.join(directory, "SavedArks", "TheIsland_WP", "123.arkprofile"), random_bytes(20 * 1024, 2))
+    write(os.path.join(directory, "Config", "WindowsServer", "GameUserSettings.ini"), b"[ServerSettings]\nRCONEnabled=True\n")
+    write(os.path.join(directory, "Logs", "ShooterGame.log"), b"log noise\n" * 100)
+    write(os.path.join(directory, "Crashes", "dump.dmp"), random_bytes(64 * 1024, 3))
+
+
+def read_tree(directory):
+    tree = {}
+    for relative_path in list_source_files(directory):
+        with open(os.path.join(directory, relative_path), "rb") as f:
+            tree[relative_path] = f.read()
+    return tree
+
+
+def bump_mtime(path):
+    # Changed files are found by size and mtime, make sure a quick rewrite doesn't keep the old mtime
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+
+def test_chunk_boundaries_survive_an_insertion():
+    data = random_bytes(8 * 1024 * 1024, 4)
+    edited = data[:1000] + b"inserted bytes" + data[1000:]
+
+    def chunks(buffer):
+        start, result = 0, set()
+        for end in chunk_boundaries(buffer):
+            assert 0 < end - start <= chunk_max_size
+            result.add(buffer[start:end])
+            start = end
+        assert start == len(buffer)
+        return result
+
+    before, after = chunks(data), chunks(edited)
+    assert len(before) > 4
+    # Only the chunk holding the insertion changes
+    assert len(before - after) == 1
+
+
+def test_excluded_dirs_are_skipped(tmp_path):
+    make_saved_tree(str(tmp_path))
+    files = list_source_files(str(tmp_path))
+    assert "Config/WindowsServer/GameUserSettings.ini" in files
+    assert not [path for path in files if path.startswith(("Logs/", "Crashes/"))]
+
+
+def test_second_backup_stores_only_what_changed(tmp_path):
+    source = str(tmp_path / "Saved")
+    make_saved_tree(source)
+    store = BackupStore(str(tmp_path / "store"))
+
+    first = store.create(source, label="first", workers=1)
+    assert first.stats["files"] == 3
+    assert first.stats["changed_files"] == 3
+    assert first.stats["new_chunks"] > 0
+
+    ark_path = os.path.join(source, "SavedArks", "TheIsland_WP", "TheIsland_WP.ark")
+    with open(ark_path, "r+b") as f:
+        f.seek(2 * 1024 * 1024)
+        f.write(b"a dino moved")
+    bump_mtime(ark_path)
+
+    second = store.create(source, workers=1)
+    assert second.stats["files"] == 3
+    assert second.stats["changed_files"] == 1
+    assert second.stats["read_bytes"] == os.path.getsize(ark_path)
+    # One or two chunks around the edit are new, the rest of the map is shared with the first backup
+    assert 1 <= second.stats["new_chunks"] <= 2
+    assert second.stats["stored_bytes"] < first.stats["stored_bytes"] / 3
+    assert second.dedupe_ratio() > 3
+    assert "dedupe ratio" in second.summary_lines()[1]
+
+    unchanged = store.create(source, workers=1)
+    assert unchanged.stats["changed_files"] == 0
+    assert unchanged.dedupe_ratio() is None
+    assert "already in the store" in unchanged.summary_lines()[1]
+
+    assert store.snapshots() == sorted([first.snapshot_id, second.snapshot_id, unchanged.snapshot_id])
+    assert store.latest()["id"] == unchanged.snapshot_id
+    assert "(first)" in store.describe(first.snapshot_id)
+
+
+def test_restore_brings_back_the_snapshot_and_keeps_a_safety_copy(tmp_path):
+    source = str(tmp_path / "Saved")
+    make_saved_tree(source)
+    store = BackupStore(str(tmp_path / "store"))
+    original = read_tree(source)
+    first = store.create(source, workers=1)
+
+    profile_path = os.path.join(source, "SavedArks", "TheIsland_WP", "123.arkprofile")
+    write(profile_path, b"wiped")
+    bump_mtime(profile_path)
+    write(os.path.join(source, "SavedArks", "TheIsland_WP", "456.arkprofile"), b"new player")
+    damaged = read_tree(source)
+
+    stats = store.restore(first.snapshot_id, workers=1)
+    assert stats["restored_files"] == 1
+    assert stats["removed_files"] == 1
+    assert stats["written_bytes"] == len(original["SavedArks/TheIsland_WP/123.arkprofile"])
+    assert read_tree(source) == original
+
+    # The state we restored over was backed up first, so the restore can be undone
+    safety = store.latest()
+    assert safety["label"] == f"before restoring {first.snapshot_id}"
+    store.restore(safety["id"], safety_snapshot=False, workers=1)
+    assert read_tree(source) == damaged
+
+    target = str(tmp_path / "elsewhere")
+    store.restore(first.snapshot_id, target_dir=target, workers=1)
+    assert read_tree(target) == original
+
+
+def test_restore_of_an_unknown_snapshot_fails(tmp_path):
+    store = BackupStore(str(tmp_path / "store"))
+    with pytest.raises(BackupError):
+        store.restore("20000101-000000")
+    with pytest.raises(BackupError):
+        store.create(str(tmp_path / "missing"))
+
+
+def test_prune_keeps_recent_and_daily_snapshots_and_frees_chunks(tmp_path):
+    source = str(tmp_path / "Saved")
+    store = BackupStore(str(tmp_path / "store"))
+    ark_path = os.path.join(source, "SavedArks", "map.ark")
+    created = []
+    for number in range(4):
+        write(ark_path, random_bytes(512 * 1024, 10 + number))
+        bump_mtime(ark_path)
+        created.append(store.create(source, workers=1).snapshot_id)
+
+    # Pretend the oldest backup was taken yesterday
+    snapshots_dir = os.path.join(store.directory, "snapshots")
+    yesterday = time.strftime("%Y%m%d", time.localtime(time.time() - 86400)) + "-120000"
+    os.rename(os.path.join(snapshots_dir, created[0] + ".json"), os.path.join(snapshots_dir, yesterday + ".json"))
+
+    size_before = store.store_bytes()
+    removed, freed = store.prune(keep_last=1, keep_daily=2)
+    # The newest overall, the newest of today (the same one) and the only one of yesterday survive
+    assert store.snapshots() == sorted([yesterday, created[3]])
+    assert sorted(removed) == sorted(created[1:3])
+    assert freed > 0
+    assert store.store_bytes() == size_before - freed
+
+    assert store.prune(keep_last=1, keep_daily=2) == ([], 0)
+
+
+def test_backup_server_snapshots_saved_and_prunes(tmp_path):
+    install = str(tmp_path / "server")
+    make_saved_tree(saved_dir(install))
+
+    result, lines = backup_server(install, label="manual", keep_last=1, keep_daily=0, workers=1)
+    assert result.stats["files"] == 3
+    assert lines == result.summary_lines()
+    assert os.path.isdir(backup_dir(install))
+
+    ini_path = os.path.join(saved_dir(install), "Config", "WindowsServer", "GameUserSettings.ini")
+    write(ini_path, b"[ServerSettings]\nRCONEnabled=False\n")
+    bump_mtime(ini_path)
+    result, lines = backup_server(install, keep_last=1, keep_daily=0, workers=1)
+    assert lines[-1].startswith("Pruned 1 old backups")
+    assert BackupStore(backup_dir(install)).snapshots() == [result.snapshot_id]
@@ -0,0 +1,40 @@
+import os
+
+from benchmarks.cases import cases
+from benchmarks.runner import compare, load_baselines, main, run_cases, save_baselines
+
+
+def test_compare_flags_cases_past_the_threshold():
+    lines, regressions = compare(
+        {"fast": 0.9, "slightly_slower": 1.2, "slower": 1.3, "new": 1.0},
+        {"fast": 1.0, "slightly_slower": 1.0, "slower": 1.0},
+        threshold=0.25,
+    )
+    assert regressions == ["slower"]
+    assert lines[2].endswith("REGRESSION")
+    assert lines[3].endswith("no baseline")
+
+
+def test_saving_keeps_the_baselines_of_skipped_cases(tmp_path):
+    path = str(tmp_path / "baselines.json")
+    assert load_baselines(path) == {"results": {}}
+    save_baselines({"a": 1.0, "b": 2.0}, path)
+    save_baselines({"a": 0.5}, path)
+    assert load_baselines(path)["results"] == {"a": 0.5, "b": 2.0}
+
+
+def test_cases_run_against_the_stand_ins(tmp_path):
+    environ = dict(os.environ)
+    results = run_cases(["prefs_load", "setup_script", "append_output"], repeat=1, log=lambda line: None)
+    assert {"prefs_load", "setup_script"} <= set(results)
+    assert all(seconds > 0 for seconds in results.values())
+    assert dict(os.environ) == environ
+
+
+def test_main_fails_on_a_regression(tmp_path, capsys):
+    path = str(tmp_path / "baselines.json")
+    assert main(["prefs_load", "--repeat", "1", "--baselines", path, "--update-baseline"]) == 0
+    save_baselines({"prefs_load": 1e-9}, path)
+    assert main(["prefs_load", "--repeat", "1", "--baselines", path]) == 1
+    assert "REGRESSION" in capsys.readouterr().out
+    assert set(cases) >= set(load_baselines(path)["results"])
@@ -0,0 +1,192 @@
+import os
+
+import pytest
+
+import ini_model
+import server_config
+from ini_model import (
+    IniDocument, atomic_write_text, check_settings, known_settings, load_ini, read_ini_text, save_ini, save_ini_text
+)
+
+game_ini = (
+    "; Game.ini for the island\r\n"
+    "[/script/shooterGame.shooterGameMode]\r\n"
+    "OverridePlayerLevelEngramPoints=5\r\n"
+    "OverridePlayerLevelEngramPoints=8\r\n"
+    "OverridePlayerLevelEngramPoints=12\r\n"
+    "  # spawns below\r\n"
+    "ConfigAddNPCSpawnEntriesContainer=(NPCSpawnEntriesContainerClassString=\"DinoSpawnEntries_Beach_C\")\r\n"
+    "bDisableStructurePlacementCollision = True\r\n"
+    "\r\n"
+    "[ServerSettings]\r\n"
+    "XPMultiplier=1.0\r\n"
+)
+mode = "/Script/ShooterGame.ShooterGameMode"
+
+
+def write(path, text):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write(text)
+
+
+def read(path):
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        return f.read()
+
+
+def test_round_trip_keeps_the_text():
+    for text in (game_ini, game_ini.replace("\r\n", "\n"), game_ini.rstrip("\r\n"), ""):
+        assert IniDocument(text).to_text() == text
+
+
+def test_lookups_ignore_case():
+    document = IniDocument(game_ini)
+    assert document.section_names() == ["/script/shooterGame.shooterGameMode", "ServerSettings"]
+    assert document.get("serversettings", "xpmultiplier") == "1.0"
+    assert document.get(mode, "bDisableStructurePlacementCollision") == "True"
+    assert document.get(mode, "Missing", "default") == "default"
+    assert document.get("Missing", "XPMultiplier") is None
+    assert document.keys(mode) == [
+        "OverridePlayerLevelEngramPoints", "ConfigAddNPCSpawnEntriesContainer", "bDisableStructurePlacementCollision"
+    ]
+
+
+def test_repeated_keys():
+    document = IniDocument(game_ini)
+    assert document.get_all(mode, "OverridePlayerLevelEngramPoints") == ["5", "8", "12"]
+
+    # Fewer values: the first ones are changed in place, the rest removed
+    document.set_all(mode, "OverridePlayerLevelEngramPoints", [6, 9])
+    assert document.get_all(mode, "OverridePlayerLevelEngramPoints") == ["6", "9"]
+    # More values: the extra ones go after the last line of the section
+    document.set_all(mode, "OverridePlayerLevelEngramPoints", [6, 9, 13, 20])
+    text = document.to_text()
+    assert "OverridePlayerLevelEngramPoints=6\r\nOverridePlayerLevelEngramPoints=9\r\n  # spawns below" in text
+    assert text.endswith("bDisableStructurePlacementCollision = True\r\nOverridePlayerLevelEngramPoints=13\r\n"
+                         "OverridePlayerLevelEngramPoints=20\r\n\r\n[ServerSettings]\r\nXPMultiplier=1.0\r\n")
+
+    document.remove(mode, "OverridePlayerLevelEngramPoints")
+    assert document.get_all(mode, "OverridePlayerLevelEngramPoints") == []
+    assert "OverridePlayerLevelEngramPoints" not in document.to_text()
+
+
+def test_set_changes_only_that_line():
+    document = IniDocument(game_ini)
+    document.set(mode, "bDisableStructurePlacementCollision", "True")
+    assert not document.modified
+
+    document.set("ServerSettings", "XPMultiplier", 2.5)
+    document.set("ServerSettings", "TamingSpeedMultiplier", 3)
+    document.set("SessionSettings", "SessionName", "Island")
+    assert document.modified
+    assert document.to_text() == game_ini.replace("XPMultiplier=1.0\r\n", "XPMultiplier=2.5\r\nTamingSpeedMultiplier=3\r\n") + (
+        "\r\n[SessionSettings]\r\nSessionName=Island\r\n"
+    )
+
+
+def test_read_is_cached_by_size_and_mtime(tmp_path):
+    path = str(tmp_path / "Game.ini")
+    write(path, "[A]\nKey=1\n")
+    assert read_ini_text(path) == "[A]\nKey=1\n"
+
+    # Same size and mtime looks unchanged, the cached text comes back
+    stat = os.stat(path)
+    write(path, "[A]\nKey=2\n")
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert read_ini_text(path) == "[A]\nKey=1\n"
+
+    write(path, "[A]\nKey=22\n")
+    assert read_ini_text(path) == "[A]\nKey=22\n"
+
+
+def test_save_writes_only_changes(tmp_path):
+    path = str(tmp_path / "GameUserSettings.ini")
+    write(path, game_ini)
+    document = load_ini(path)
+    assert save_ini(path, document) is False
+
+    document.set("ServerSettings", "XPMultiplier", "2.0")
+    assert save_ini(path, document) is True
+    assert read(path) == game_ini.replace("XPMultiplier=1.0", "XPMultiplier=2.0")
+    assert not document.modified and not any(line.modified for line in document.lines)
+
+    # Editor text has "\n" line endings, the file keeps its own
+    assert save_ini_text(path, read(path).replace("\r\n", "\n")) is False
+    assert save_ini_text(path, "[ServerSettings]\nXPMultiplier=3.0\n") is True
+    assert read(path) == "[ServerSettings]\r\nXPMultiplier=3.0\r\n"
+
+
+def test_a_failed_save_leaves_the_old_file(tmp_path, monkeypatch):
+    path = str(tmp_path / "Game.ini")
+    write(path, game_ini)
+
+    def replace(source, target):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(ini_model.os, "replace", replace)
+    with pytest.raises(OSError):
+        atomic_write_text(path, "[half")
+    monkeypatch.undo()
+
+    assert read(path) == game_ini
+    assert os.listdir(str(tmp_path)) == ["Game.ini"]
+
+
+template = (
+    "[ServerSettings]\n"
+    ";XPMultiplier=1.0\n"
+    "ServerPVE=False\n"
+    "; MaxTamedDinos=5000\n"
+    "ConfigAddNPCSpawnEntriesContainer=(x)\n"
+    "OverridePlayerLevelEngramPoints=5\n"
+)
+
+
+def test_known_settings_include_commented_out_keys():
+    known = known_settings(template)
+    assert known["xpmultiplier"] == ("XPMultiplier", "1.0")
+    assert known["maxtameddinos"] == ("MaxTamedDinos", "5000")
+    assert set(known) == {
+        "xpmultiplier", "serverpve", "maxtameddinos", "configaddnpcspawnentriescontainer", "overrideplayerlevelengrampoints"
+    }
+
+
+def test_check_settings_reports_likely_mistakes():
+    text = "\n".join([
+        "MaxTamedDinos=1",
+        "[ServerSettings]",
+        "XPMultiplier=fast",
+        "ServerPVE=yes",
+        "XPMultiplyer=2",
+        "OverridePlayerLevelEngramPoints[3]=7",
+        "ConfigAddNPCSpawnEntriesContainer=((a)",
+        "CustomKey=(b",
+        "[Broken",
+        "just text",
+        "; comment",
+        "",
+        "[/Script/Engine.GameSession]",
+        "MaxPlayers=70",
+        "ServerPVE=true",
+    ])
+    sections, problems = check_settings(text, known_settings(template))
+    assert sections == [(1, "ServerSettings"), (12, "/Script/Engine.GameSession")]
+    assert problems == [
+        (0, "MaxTamedDinos is outside of any [section]"),
+        (2, "XPMultiplier should be a number, like 1.0"),
+        (3, "ServerPVE should be True or False"),
+        (4, "Unknown key XPMultiplyer, did you mean XPMultiplier?"),
+        (6, "ConfigAddNPCSpawnEntriesContainer has unbalanced parentheses"),
+        (7, "CustomKey has unbalanced parentheses"),
+        (8, "Section header is missing its closing ]"),
+        (9, "Not a setting, expected Key=Value"),
+    ]
+
+
+def test_the_file_the_manager_writes_passes():
+    prefs = {"ServerAdminPassword": "secret", "ServerName": "Island", "ServerPort": 7777, "ServerQueryPort": 27015,
+             "ServerMaxPlayers": 70, "ServerRCONPort": 27020}
+    text = server_config.create_game_user_settings_template(prefs)
+    with open(server_config.template_path, "r", encoding="utf-8") as f:
+        known = known_settings(f.read(), known_settings(text))
+    assert check_settings(text, known) == ([(0, "ServerSettings")], [])
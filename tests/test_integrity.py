@@ -0,0 +1,105 @@
+import os
+
+import integrity
+from integrity import compare, list_files, main, scan, verify
+
+game_files = {
+    "ShooterGame/Binaries/Win64/ArkAscendedServer.exe": "server",
+    "ShooterGame/Content/Paks/pakchunk0.pak": "pak",
+    "Engine/Binaries/ThirdParty/lib.dll": "lib",
+}
+# Each server's own files, never part of the check
+own_files = {
+    "ShooterGame/Binaries/Win64/start.bat": "start",
+    "ShooterGame/Binaries/Win64/ShooterGame/Mods/123/mod.pak": "mod",
+    "ShooterGame/Saved/SavedArks/TheIsland_WP.ark": "world",
+    "ShooterGame/SavedBackups/old.ark": "backup",
+    "steamapps/appmanifest_2430930.acf": "manifest",
+}
+
+
+def write(install_path, files):
+    for relative_path, text in files.items():
+        path = os.path.join(install_path, *relative_path.split("/"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+
+def make_install(tmp_path):
+    install_path = str(tmp_path / "server")
+    write(install_path, {**game_files, **own_files})
+    return install_path
+
+
+def test_only_game_files_are_listed(tmp_path):
+    install_path = make_install(tmp_path)
+    assert sorted(list_files(install_path)) == sorted(game_files)
+
+
+def test_second_scan_uses_the_cache(tmp_path):
+    install_path = make_install(tmp_path)
+    hashes, stats = scan(install_path, workers=2)
+    assert (stats["files"], stats["hashed"], stats["cached"]) == (3, 3, 0)
+
+    write(install_path, {"ShooterGame/Content/Paks/pakchunk0.pak": "patched pak"})
+    os.utime(os.path.join(install_path, "ShooterGame", "Content", "Paks", "pakchunk0.pak"), ns=(1, 1))
+    new_hashes, stats = scan(install_path, workers=2)
+    assert (stats["hashed"], stats["cached"]) == (1, 2)
+    changed = [path for path in hashes if hashes[path] != new_hashes[path]]
+    assert changed == ["ShooterGame/Content/Paks/pakchunk0.pak"]
+
+
+def test_verify_reports_against_the_baseline(tmp_path):
+    install_path = make_install(tmp_path)
+    result = verify(install_path, workers=2)
+    assert result.baseline_created and result.ok()
+
+    # The server's own files change all the time without being reported
+    write(install_path, {"ShooterGame/Binaries/Win64/start.bat": "new options", "ShooterGame/Saved/new.ini": "x"})
+    result = verify(install_path, workers=2)
+    assert result.ok() and "All game files match the baseline." in result.summary_lines()
+
+    os.remove(os.path.join(install_path, "Engine", "Binaries", "ThirdParty", "lib.dll"))
+    write(install_path, {"ShooterGame/Binaries/Win64/ArkAscendedServer.exe": "tampered", "extra.txt": "extra"})
+    result = verify(install_path, workers=2)
+    assert not result.ok()
+    assert result.missing == ["Engine/Binaries/ThirdParty/lib.dll"]
+    assert result.modified == ["ShooterGame/Binaries/Win64/ArkAscendedServer.exe"]
+    assert result.added == ["extra.txt"]
+    assert main([install_path, "--workers", "2"]) == 1
+
+    assert verify(install_path, workers=2, update_baseline=True).baseline_created
+    assert verify(install_path, workers=2).ok()
+
+
+def test_unreadable_files_are_not_reported_missing(tmp_path, monkeypatch):
+    install_path = make_install(tmp_path)
+    verify(install_path, workers=1)
+    write(install_path, {"ShooterGame/Content/Paks/pakchunk0.pak": "locked for a moment"})
+
+    real_hash_file = integrity.hash_file
+
+    def hash_file(path):
+        if path.endswith("pakchunk0.pak"):
+            raise PermissionError("in use")
+        return real_hash_file(path)
+
+    # The pool's workers are forked from this process, so they hash with the patched function
+    monkeypatch.setattr(integrity, "hash_file", hash_file)
+    result = verify(install_path, workers=1)
+    assert result.unreadable == ["ShooterGame/Content/Paks/pakchunk0.pak"]
+    assert (result.missing, result.modified, result.added) == ([], [], [])
+    assert not result.ok()
+    assert "Unreadable files: 1" in result.summary_lines()
+
+    # Nothing is cached for it, the next scan reads it again
+    monkeypatch.undo()
+    result = verify(install_path, workers=1)
+    assert result.modified == ["ShooterGame/Content/Paks/pakchunk0.pak"] and not result.unreadable
+
+
+def test_compare():
+    baseline = {"a": "1", "b": "2", "c": "3"}
+    assert compare(baseline, {"a": "1", "b": "x", "d": "4", "c": None}) == ([], ["b"], ["d"], ["c"])
+    assert compare(baseline, {"b": "2", "e": None}) == (["a", "c"], [], [], ["e"])
@@ -0,0 +1,96 @@
+import time
+
+from helpers import wait_for
+from log_archive import LogArchive, LogArchiveReader, list_segments
+
+
+def test_lines_come_back_in_order_with_their_times(tmp_path):
+    archive = LogArchive(str(tmp_path), block_max_bytes=1024)
+    for number in range(1000):
+        archive.append(f"line {number}", timestamp=1000.0 + number)
+    archive.close()
+
+    reader = LogArchiveReader(str(tmp_path))
+    assert list(reader.lines()) == [(1000.0 + number, f"line {number}") for number in range(1000)]
+    assert [line for _, line in reader.lines(start_time=1500, end_time=1502)] == ["line 500", "line 501", "line 502"]
+
+
+def test_search_with_time_range_and_limit(tmp_path):
+    archive = LogArchive(str(tmp_path), block_max_bytes=512)
+    for number in range(500):
+        archive.append(f"Bob joined this ARK!" if number % 50 == 0 else f"noise {number}", timestamp=float(number))
+    archive.close()
+
+    reader = LogArchiveReader(str(tmp_path))
+    assert [timestamp for timestamp, _ in reader.search("joined")] == [float(number) for number in range(0, 500, 50)]
+    assert [timestamp for timestamp, _ in reader.search("JOINED", start_time=100, end_time=300)] == [100.0, 150.0, 200.0, 250.0, 300.0]
+    assert len(list(reader.search("joined", limit=3))) == 3
+
+
+def test_unusual_line_separators_stay_inside_their_line(tmp_path):
+    # str.splitlines() splits on these, the archive must only split on "\n"
+    odd_lines = ["group\x1dseparator", "next\x85line", "line separator", "para graph", "carriage\rreturn"]
+    archive = LogArchive(str(tmp_path))
+    for number, line in enumerate(odd_lines):
+        archive.append(line, timestamp=float(number))
+    archive.close()
+
+    reader = LogArchiveReader(str(tmp_path))
+    assert [line for _, line in reader.lines()] == odd_lines
+    assert [line for _, line in reader.search("separator")] == [odd_lines[0], odd_lines[2]]
+
+
+def test_segments_rotate_and_old_ones_are_pruned(tmp_path):
+    archive = LogArchive(str(tmp_path), segment_max_bytes=4096, block_max_bytes=1024, max_segments=3)
+    for number in range(20000):
+        archive.append(f"line {number} {'x' * (number % 37)}", timestamp=float(number))
+    archive.close()
+
+    segments = list_segments(str(tmp_path))
+    assert len(segments) == 3
+    lines = [line for _, line in LogArchiveReader(str(tmp_path)).lines()]
+    # What is left is the newest part of the log, without gaps
+    assert lines[-1].startswith("line 19999")
+    first = int(lines[0].split()[1])
+    assert [int(line.split()[1]) for line in lines] == list(range(first, 20000))
+
+
+def test_appending_after_close_continues_the_segment(tmp_path):
+    archive = LogArchive(str(tmp_path))
+    archive.append("before restart", timestamp=1.0)
+    archive.close()
+    archive.append("after restart", timestamp=2.0)
+    archive.close()
+    reopened = LogArchive(str(tmp_path))
+    reopened.append("new manager", timestamp=3.0)
+    reopened.close()
+
+    segment = LogArchiveReader(str(tmp_path)).segments()[0]
+    assert [block.first_line for block in segment.blocks] == [0, 1, 2]
+    assert [line for _, line in LogArchiveReader(str(tmp_path)).lines()] == ["before restart", "after restart", "new manager"]
+
+
+def test_a_quiet_server_tail_is_written_without_another_append(tmp_path):
+    archive = LogArchive(str(tmp_path), block_max_age=0.2)
+    archive.append("last line before a quiet hour")
+    reader = LogArchiveReader(str(tmp_path))
+    wait_for(lambda: list(reader.search("quiet hour")), timeout=5)
+    # The timer of a block that was already written does nothing
+    archive.append("next")
+    archive.flush()
+    time.sleep(0.3)
+    assert sum(len(segment.blocks) for segment in reader.segments()) == 2
+
+
+def test_anchored_patterns_are_found(tmp_path):
+    archive = LogArchive(str(tmp_path))
+    for number in range(5):
+        archive.append(f"Bob joined {number}", timestamp=float(number))
+    archive.close()
+
+    reader = LogArchiveReader(str(tmp_path))
+    assert [line for _, line in reader.search("^Bob")] == [f"Bob joined {number}" for number in range(5)]
+    assert [line for _, line in reader.search("joined 3$")] == ["Bob joined 3"]
+    assert [line for _, line in reader.search(r"\ABob joined 4\Z")] == ["Bob joined 4"]
+    assert [line for _, line in reader.search(r"(?<!\S)Bob")] == [f"Bob joined {number}" for number in range(5)]
+    assert list(reader.search("^joined")) == []
@@ -0,0 +1,56 @@
+import threading
+
+from log_buffer import LogBuffer
+
+
+def test_drain_in_batches_keeps_the_order():
+    log_buffer = LogBuffer()
+    for number in range(25):
+        log_buffer.push(f"line {number}")
+    assert log_buffer.pending() == 25
+    assert log_buffer.drain(10) == [f"line {number}" for number in range(10)]
+    assert log_buffer.drain(10) == [f"line {number}" for number in range(10, 20)]
+    assert log_buffer.drain() == [f"line {number}" for number in range(20, 25)]
+    assert log_buffer.drain() == []
+
+
+def test_oldest_lines_are_dropped_when_full():
+    log_buffer = LogBuffer(max_lines=100)
+    for number in range(250):
+        log_buffer.push(f"line {number}")
+    assert log_buffer.drain() == [f"line {number}" for number in range(150, 250)]
+    assert log_buffer.stats() == (150, 0)
+
+
+def test_repeated_lines_are_coalesced():
+    log_buffer = LogBuffer()
+    for line in ["start", "spam", "spam", "spam", "end", "end"]:
+        log_buffer.push(line)
+    assert log_buffer.drain() == ["start", "spam", "(previous line repeated 2 more times)", "end", "(previous line repeated 1 more times)"]
+    assert log_buffer.stats() == (0, 3)
+
+    # A run still going on when the GUI drains is reported then, and counting starts over
+    log_buffer.push("end")
+    assert log_buffer.drain() == ["(previous line repeated 1 more times)"]
+
+
+def test_pushing_from_many_threads():
+    log_buffer = LogBuffer(max_lines=100000)
+
+    def push(thread):
+        for number in range(5000):
+            log_buffer.push(f"{thread} {number}")
+
+    threads = [threading.Thread(target=push, args=(thread,)) for thread in range(8)]
+    for thread in threads:
+        thread.start()
+    drained = []
+    while any(thread.is_alive() for thread in threads):
+        drained.extend(log_buffer.drain(1000))
+    for thread in threads:
+        thread.join()
+    drained.extend(log_buffer.drain())
+
+    assert len(drained) == 40000
+    for thread in range(8):
+        assert [line for line in drained if line.startswith(f"{thread} ")] == [f"{thread} {number}" for number in range(5000)]
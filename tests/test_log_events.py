@@ -0,0 +1,135 @@
+import re
+
+import pytest
+
+from log_events import (
+    LogEventEngine, LogPattern, PlayerList, player_joined, player_left, required_literal, server_crashed, server_ready,
+    trie_regex, world_saved
+)
+
+
+def kinds(events):
+    return [event.kind for event in events]
+
+
+@pytest.mark.parametrize("pattern, literal", [
+    (r"Server has completed startup", "Server has completed startup"),
+    (r"(?P<player>.+) joined this ARK!", " joined this ARK!"),
+    (r"Fatal error!?(?P<reason>.*)", "Fatal error"),
+    (r"World Save Complete\.", "World Save Complete."),
+    (r"Saving \d+ tribes", "Saving "),
+    (r"colou?r changed", "r changed"),
+    (r"[abc]+ dino", " dino"),
+    (r"cat|dog", None),
+    (r"(optional text)?x", None),
+    (r"ab", None),
+    (r"Server \x41RK started", "RK started"),
+    (r"Server \u0041RK started", "RK started"),
+    (r"Server \U00000041RK started", "RK started"),
+    (r"Server \N{LATIN CAPITAL LETTER A}RK started", "RK started"),
+    (r"(ARK) said \1234 times", "4 times"),
+])
+def test_required_literal(pattern, literal):
+    assert required_literal(pattern) == literal
+
+
+def test_escapes_in_the_keyword_still_fire():
+    engine = LogEventEngine([("hex", r"Server \x41RK started"), ("unicode", r"Server \u0041RK started")])
+    assert kinds(engine.feed("Server ARK started")) == ["hex", "unicode"]
+
+
+def test_trie_regex_matches_each_word_and_prefers_the_longest():
+    words = ["joined this ARK!", "joined the game", "joined"]
+    regex = re.compile(trie_regex(words))
+    for word in words:
+        assert regex.fullmatch(word)
+    assert regex.match("joined this ARK! again").group() == "joined this ARK!"
+    assert regex.match("joined the server").group() == "joined"
+
+
+def test_default_patterns():
+    engine = LogEventEngine(source="island")
+    events = engine.feed("2024.01.05_10.00.00: Bob Smith [UniqueNetId:0002abc Platform:None] joined this ARK!", timestamp=5.0)
+    assert kinds(events) == [player_joined]
+    assert events[0].fields == {"player": "Bob Smith", "player_id": "0002abc"}
+    assert (events[0].time, events[0].source) == (5.0, "island")
+
+    assert kinds(engine.feed("Alice left this ARK!")) == [player_left]
+    assert kinds(engine.feed("Server has completed startup and is now advertising for join.")) == [server_ready]
+    assert kinds(engine.feed("World Save Complete")) == [world_saved]
+    events = engine.feed("Fatal error! Access violation")
+    assert kinds(events) == [server_crashed] and events[0].fields == {"reason": "Access violation"}
+    assert engine.feed("log line 42") == []
+    assert engine.stats()["lines"] == 6 and engine.stats()["events"] == 5
+
+
+def test_nested_keywords_both_fire():
+    engine = LogEventEngine([("joined", "joined this ARK!"), ("ark", "this ARK")])
+    assert kinds(engine.feed("Bob joined this ARK!")) == ["joined", "ark"]
+    assert kinds(engine.feed("this ARK is mine")) == ["ark"]
+
+
+def test_overlapping_keywords_both_fire():
+    engine = LogEventEngine([("first", "abcd"), ("second", "cdef")])
+    assert kinds(engine.feed("xxabcdefxx")) == ["first", "second"]
+    assert kinds(engine.feed("xxcdefxx")) == ["second"]
+
+
+def test_keywords_sharing_a_prefix_both_fire():
+    engine = LogEventEngine([("short", "World Save"), ("long", "World Save Complete")])
+    assert kinds(engine.feed("World Save Complete")) == ["short", "long"]
+    assert kinds(engine.feed("World Save started")) == ["short"]
+
+
+def test_patterns_without_a_usable_keyword_always_run():
+    assert LogPattern("x", r"(?x) World \s Save  # comment").keyword is None
+    assert LogPattern("x", r"(?x) World \s Save", keyword="World").keyword == "World"
+    assert LogPattern("x", r"world save", ignore_case=True).keyword is None
+    assert LogPattern("x", r"(?i)world save").keyword is None
+
+    engine = LogEventEngine([("verbose", r"(?x) World \s Save"), ("caseless", r"(?i)fatal")])
+    assert kinds(engine.feed("World Save")) == ["verbose"]
+    assert kinds(engine.feed("FATAL")) == ["caseless"]
+
+
+def test_register_and_unregister():
+    engine = LogEventEngine([])
+    engine.register("tamed", r"(?P<player>\w+) Tamed a (?P<dino>\w+)")
+    events = engine.feed("Bob Tamed a Raptor")
+    assert kinds(events) == ["tamed"] and events[0].fields == {"player": "Bob", "dino": "Raptor"}
+    engine.unregister("tamed")
+    assert engine.feed("Bob Tamed a Raptor") == []
+
+
+def test_subscribers_get_their_kinds_and_errors_are_counted():
+    engine = LogEventEngine()
+    everything, crashes = [], []
+    engine.subscribe(everything.append)
+    engine.subscribe(crashes.append, kinds=[server_crashed])
+
+    def broken(event):
+        raise RuntimeError("boom")
+
+    engine.subscribe(broken)
+    engine.feed("World Save Complete")
+    engine.feed("Unhandled Exception: EXCEPTION_ACCESS_VIOLATION")
+    assert kinds(everything) == [world_saved, server_crashed]
+    assert kinds(crashes) == [server_crashed]
+    assert engine.stats()["subscriber_errors"] == 2
+
+    engine.unsubscribe(broken)
+    engine.feed("World Save Complete")
+    assert engine.stats()["subscriber_errors"] == 2
+
+
+def test_player_list_follows_joins_and_leaves():
+    engine = LogEventEngine()
+    players = PlayerList()
+    engine.subscribe(players.on_event, kinds=[player_joined, player_left])
+    engine.feed("Bob joined this ARK!", timestamp=1.0)
+    engine.feed("Alice [UniqueNetId:123] joined this ARK!", timestamp=2.0)
+    engine.feed("Bob left this ARK!", timestamp=3.0)
+    assert players.names() == ["Alice"]
+    assert len(players) == 1
+    players.clear()
+    assert players.names() == []
@@ -0,0 +1,114 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from fake_rcon import FakeRconServer
+from helpers import FakeSteam
+from ini_model import settings_file_path
+import manager_cli
+from profile_store import ProfileStore, default_store_path
+
+repo_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def install_path(tmp_path):
+    return str(tmp_path / "server")
+
+
+@pytest.fixture
+def profile(install_path):
+    store = ProfileStore(default_store_path(), legacy_prefs_path=None)
+    store.set("Island", {
+        "SteamCMD": "unused", "ArkServerInstall": install_path, "ServerName": "Island", "ServerAdminPassword": "secret",
+        "ServerPort": 7777, "ServerQueryPort": 27015, "ServerMaxPlayers": 70,
+    })
+    store.save()
+    return store
+
+
+def run(capsys, *args):
+    code = manager_cli.main(list(args))
+    return code, capsys.readouterr().out
+
+
+def write_settings(install_path, text):
+    path = settings_file_path(install_path, "GameUserSettings.ini")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write(text)
+    return path
+
+
+def test_profiles_lists_the_saved_profiles(profile, install_path, capsys):
+    code, out = run(capsys, "profiles")
+    assert code == 0
+    assert out.split() == ["*", "Island", install_path]
+
+
+def test_missing_settings_are_named(tmp_path):
+    store_path = str(tmp_path / "empty.json")
+    with open(store_path, "w", encoding="utf-8") as f:
+        f.write('{"schema_version": 1, "profiles": {}}')
+    with pytest.raises(SystemExit, match="Missing settings: ArkServerInstall"):
+        manager_cli.main(["--store", store_path, "status"])
+    with pytest.raises(SystemExit, match="No profile named 'Ragnarok'"):
+        manager_cli.main(["--store", store_path, "--profile", "Ragnarok", "status"])
+
+
+def test_install_then_status(profile, install_path, tmp_path, monkeypatch, capsys):
+    FakeSteam(str(tmp_path), monkeypatch, build="100")
+    code, out = run(capsys, "install")
+    assert code == 0 and "Installed build: 100" in out
+
+    code, out = run(capsys, "status")
+    assert code == 0
+    assert "Installed build: 100" in out
+    assert "Server:          unknown (no RCON port/password set)" in out
+
+
+def test_status_and_stop_over_rcon(profile, capsys):
+    server = FakeRconServer(replies={"ListPlayers": "0. Bob, 0002abc"})
+    try:
+        code, out = run(capsys, "--rcon-port", str(server.port), "status")
+        assert code == 0 and "running (RCON reachable)" in out and "0. Bob, 0002abc" in out
+
+        code, out = run(capsys, "--rcon-port", str(server.port), "stop", "--message", "Back soon")
+        assert code == 0
+        assert server.commands[-3:] == ["broadcast Back soon", "SaveWorld", "DoExit"]
+    finally:
+        server.close()
+
+
+def test_edit_setting(profile, install_path, capsys):
+    path = write_settings(install_path, "; keep me\r\n[ServerSettings]\r\nXPMultiplier=1.0\r\n")
+    code, out = run(capsys, "edit-setting", "GameUserSettings.ini", "ServerSettings", "XPMultiplier")
+    assert (code, out) == (0, "1.0\n")
+
+    code, out = run(capsys, "edit-setting", "GameUserSettings.ini", "ServerSettings", "XPMultiplier", "2.0")
+    assert code == 0 and out.startswith("Set [ServerSettings] XPMultiplier=2.0")
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        assert f.read() == "; keep me\r\n[ServerSettings]\r\nXPMultiplier=2.0\r\n"
+
+    code, out = run(capsys, "edit-setting", "GameUserSettings.ini", "ServerSettings", "Missing")
+    assert code == 1 and "Missing is not set" in out
+
+
+def test_commands_never_import_qt(profile, install_path):
+    # PyQt5 can't be imported at all in this process, so any import of it fails the command
+    write_settings(install_path, "[ServerSettings]\r\nXPMultiplier=1.0\r\n")
+    prelude = "import runpy, sys\nsys.modules['PyQt5'] = None\nrunpy.run_path('gui_main.py', run_name='__main__')\n"
+    for args in (["--help"], ["profiles"], ["status"], ["edit-setting", "GameUserSettings.ini", "ServerSettings", "XPMultiplier"]):
+        result = subprocess.run(
+            [sys.executable, "-c", prelude, *args], cwd=repo_dir, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+            universal_newlines=True
+        )
+        assert result.returncode == 0, result.stdout
+
+    # Without a command the launcher opens the window, which is where PyQt5 is needed
+    result = subprocess.run(
+        [sys.executable, "-c", prelude], cwd=repo_dir, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True
+    )
+    assert result.returncode != 0 and "PyQt5" in result.stdout
@@ -0,0 +1,183 @@
+import json
+import os
+import socket
+import sys
+
+import pytest
+
+from helpers import fake_server_command, wait_for
+from manager_daemon import DaemonClient, DaemonError, ManagerDaemon, history_max_lines, load_daemon_state
+
+
+def counting_server_command(count, delay=0.002):
+    # Keeps printing for a while, so lines arrive while a client is away
+    return [sys.executable, "-c", f"import time\nfor i in range({count}):\n    print(f'line {{i}}', flush=True)\n    time.sleep({delay})\n"]
+
+
+@pytest.fixture
+def state_path(tmp_path):
+    return str(tmp_path / "daemon.json")
+
+
+@pytest.fixture
+def daemon(state_path):
+    daemon = ManagerDaemon(state_path=state_path).start()
+    yield daemon
+    daemon.supervisor.stop_all(timeout=5)
+    daemon.stop()
+
+
+def connect(state_path):
+    return DaemonClient(state_path, timeout=20).connect()
+
+
+class Follower:
+    def __init__(self):
+        self.lines = []
+
+    def __call__(self, server, lines):
+        self.lines.extend(lines)
+
+
+def start(client, tmp_path, server, command):
+    install_path = tmp_path / server
+    install_path.mkdir(exist_ok=True)
+    return client.request("start", server=server, install_path=str(install_path), command=command, label=server)
+
+
+def test_clients_need_the_token(daemon, state_path):
+    state = load_daemon_state(state_path)
+    with socket.create_connection(("127.0.0.1", state["port"]), timeout=5) as sock:
+        sock.sendall(b'{"id": 1, "cmd": "status", "args": {}}\n')
+        reply = json.loads(sock.makefile("rb").readline())
+        assert reply == {"id": 1, "ok": False, "error": "Send hello with the daemon's token first"}
+        # The daemon hangs up after that
+        assert sock.makefile("rb").readline() == b""
+
+    with socket.create_connection(("127.0.0.1", state["port"]), timeout=5) as sock:
+        sock.sendall(b'{"id": 1, "cmd": "hello", "args": {"token": "guess"}}\n')
+        assert json.loads(sock.makefile("rb").readline())["ok"] is False
+
+    assert os.stat(state_path).st_mode & 0o077 == 0 or os.name == "nt"
+
+
+def test_errors_come_back_as_replies(daemon, state_path):
+    client = connect(state_path)
+    with pytest.raises(DaemonError, match="Unknown command 'bogus'"):
+        client.request("bogus")
+    with pytest.raises(DaemonError, match="Unknown server 'nowhere'"):
+        client.request("stop", server="nowhere")
+    with pytest.raises(DaemonError, match="Unknown server 'nowhere'"):
+        client.follow("nowhere", Follower())
+    # The connection is still usable
+    assert client.request("status")["servers"] == []
+    client.close()
+
+
+def test_start_follow_and_stop(daemon, state_path, tmp_path):
+    client = connect(state_path)
+    statuses = []
+    client.on_status = lambda server, status: statuses.append(status["state"])
+
+    status = start(client, tmp_path, "island", fake_server_command("--lines", "5", "--ready"))
+    assert status["state"] == "running" and status["label"] == "island"
+    follower = Follower()
+    client.follow("island", follower, since=0)
+    wait_for(lambda: len(follower.lines) == 6)
+    assert follower.lines[:5] == [f"log line {number}" for number in range(5)]
+    wait_for(lambda: client.request("status")["servers"][0]["ready"])
+
+    assert client.request("stop", server="island")["state"] == "stopped"
+    wait_for(lambda: statuses and statuses[-1] == "stopped")
+    client.close()
+
+
+def test_reconnect_resumes_without_losing_lines(daemon, state_path, tmp_path):
+    client = connect(state_path)
+    disconnects = []
+    client.on_disconnect = lambda: disconnects.append(True)
+    start(client, tmp_path, "island", counting_server_command(400))
+    follower = Follower()
+    client.follow("island", follower, since=0)
+    wait_for(lambda: len(follower.lines) >= 50)
+
+    # The connection drops while the server keeps printing
+    client.sock.shutdown(socket.SHUT_RDWR)
+    wait_for(lambda: disconnects)
+    assert not client.connected
+    with pytest.raises(DaemonError):
+        client.request("status")
+    seen = len(follower.lines)
+    wait_for(lambda: daemon.histories["island"].next_seq > seen + 50)
+
+    client.connect()
+    wait_for(lambda: len(follower.lines) >= 400)
+    assert follower.lines == [f"line {number}" for number in range(400)]
+    client.close()
+
+
+def test_replay_reports_lines_that_are_gone(daemon, state_path, tmp_path):
+    client = connect(state_path)
+    extra = 500
+    start(client, tmp_path, "island", fake_server_command("--lines", str(history_max_lines + extra - 1), "--ready"))
+    wait_for(lambda: daemon.histories["island"].next_seq == history_max_lines + extra, timeout=30)
+
+    follower = Follower()
+    client.follow("island", follower, since=0)
+    wait_for(lambda: len(follower.lines) == history_max_lines + 1, timeout=30)
+    assert follower.lines[0] == f"({extra} older lines are no longer kept by the daemon)"
+    assert follower.lines[1] == f"log line {extra}"
+    assert follower.lines[-1].startswith("Server has completed startup")
+    client.close()
+
+
+def test_every_client_gets_every_line(daemon, state_path, tmp_path):
+    clients = [connect(state_path) for _ in range(20)]
+    start(clients[0], tmp_path, "island", counting_server_command(300, delay=0.001))
+    followers = []
+    for client in clients:
+        follower = Follower()
+        client.follow("island", follower, since=0)
+        followers.append(follower)
+
+    expected = [f"line {number}" for number in range(300)]
+    wait_for(lambda: all(len(follower.lines) >= 300 for follower in followers))
+    assert all(follower.lines == expected for follower in followers)
+    for client in clients:
+        client.close()
+
+
+def test_shutdown_stops_servers_and_removes_the_state_file(daemon, state_path, tmp_path):
+    client = connect(state_path)
+    disconnects = []
+    client.on_disconnect = lambda: disconnects.append(True)
+    start(client, tmp_path, "island", fake_server_command("--ready"))
+    instance = daemon.supervisor.get("island")
+    assert instance.is_running()
+
+    client.request("shutdown")
+    wait_for(lambda: disconnects)
+    daemon.thread.join(10)
+    assert not instance.is_running()
+    assert load_daemon_state(state_path) is None
+    with pytest.raises(DaemonError, match="not running"):
+        connect(state_path)
+
+
+def test_reconnect_to_a_restarted_daemon_drops_its_unknown_servers(state_path, tmp_path):
+    first = ManagerDaemon(state_path=state_path).start()
+    client = connect(state_path)
+    start(client, tmp_path, "island", fake_server_command("--ready"))
+    client.follow("island", Follower())
+    first.supervisor.stop_all(timeout=5)
+    first.stop()
+    wait_for(lambda: not client.connected)
+
+    second = ManagerDaemon(state_path=state_path).start()
+    try:
+        client.connect()
+        assert client.follows == {}
+        assert client.request("status")["servers"] == []
+        client.close()
+    finally:
+        second.stop()
@@ -0,0 +1,105 @@
+import urllib.error
+import urllib.request
+
+import pytest
+
+import metrics
+from fake_psutil import FakeProcessSource
+from metrics import MetricsSampler, MetricsServer, Sample
+
+
+@pytest.fixture
+def processes(monkeypatch):
+    source = FakeProcessSource()
+    monkeypatch.setattr(metrics, "psutil", source)
+    return source
+
+
+def test_render_text(monkeypatch):
+    monkeypatch.setattr(metrics.time, "time", lambda: 1000.0)
+    sampler = MetricsSampler()
+    sampler.track('C:\\ARK\\"Island"', 100, started_at=880.0)
+    sampler.get('C:\\ARK\\"Island"').samples.append(Sample(995.0, 12.5, 2048, 40, 100, 200))
+    sampler.mark_ready('C:\\ARK\\"Island"', ready_at=925.25)
+    sampler.track("Ragnarok", 200, started_at=990.0)
+    sampler.last_tick_seconds = 0.0015
+
+    text = sampler.render_text()
+    assert text.endswith("\n")
+    lines = text.splitlines()
+    assert "# TYPE asa_server_cpu_percent gauge" in lines
+    assert "# TYPE asa_server_read_bytes_total counter" in lines
+    label = '{server="C:\\\\ARK\\\\\\"Island\\""}'
+    assert [line for line in lines if not line.startswith("#")] == [
+        f"asa_server_cpu_percent{label} 12.5",
+        f"asa_server_rss_bytes{label} 2048",
+        f"asa_server_threads{label} 40",
+        f"asa_server_read_bytes_total{label} 100",
+        f"asa_server_write_bytes_total{label} 200",
+        f"asa_server_uptime_seconds{label} 120",
+        f"asa_server_time_to_ready_seconds{label} 45.2",
+        # Not sampled yet, only the uptime
+        'asa_server_uptime_seconds{server="Ragnarok"} 10',
+        "asa_manager_sample_seconds 0.001500",
+    ]
+
+
+def test_sampling_sums_the_process_tree(processes):
+    # start.bat, the server it runs and a crash reporter the server started
+    processes.add(100, cpu=0.5, rss=1000, threads=2)
+    processes.add(101, parent=100, cpu=50.0, rss=500000, threads=60, read_bytes=10, write_bytes=20)
+    processes.add(102, parent=101, cpu=1.0, rss=3000, threads=3)
+    sampler = MetricsSampler(children_refresh_ticks=3)
+    sampler.track("Island", 100)
+    server = sampler.get("Island")
+
+    sampler.sample(server)
+    sample = server.latest()
+    assert (sample.cpu, sample.rss, sample.threads, sample.read_bytes, sample.write_bytes) == (51.5, 504000, 65, 10, 20)
+
+    # A process that exits is dropped on the next tick, a new one shows up when the tree is walked again
+    processes.remove(102)
+    processes.add(103, parent=101, rss=7)
+    sampler.sample(server)
+    assert server.latest().rss == 501000 and sorted(server.processes) == [100, 101]
+    sampler.sample(server)
+    assert processes.children_calls == 1
+    sampler.sample(server)
+    assert processes.children_calls == 2
+    assert server.latest().rss == 501007 and sorted(server.processes) == [100, 101, 103]
+
+    # The whole server is gone
+    for pid in (100, 101, 103):
+        processes.remove(pid)
+    for _ in range(3):
+        sampler.sample(server)
+    assert server.processes == {} and server.latest().rss == 0
+
+    sampler.untrack("Island")
+    assert sampler.get("Island") is None
+
+
+def test_history_is_bounded(processes):
+    processes.add(100, rss=1)
+    sampler = MetricsSampler(history=5)
+    sampler.track("Island", 100)
+    for _ in range(20):
+        sampler.sample(sampler.get("Island"))
+    assert len(sampler.get("Island").samples) == 5
+
+
+def test_metrics_endpoint():
+    sampler = MetricsSampler()
+    sampler.track("Island", 100)
+    server = MetricsServer(sampler, port=0)
+    server.start()
+    try:
+        url = "http://127.0.0.1:%d" % server.httpd.server_address[1]
+        with urllib.request.urlopen(url + "/metrics?x=1", timeout=5) as response:
+            assert response.headers["Content-Type"] == "text/plain; version=0.0.4"
+            assert 'asa_server_uptime_seconds{server="Island"}' in response.read().decode("utf-8")
+        with pytest.raises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(url + "/other", timeout=5)
+        assert error.value.code == 404
+    finally:
+        server.stop()
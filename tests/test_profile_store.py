@@ -0,0 +1,107 @@
+import json
+import os
+import time
+
+import pytest
+
+from profile_store import ProfileStore, schema_version
+
+
+legacy_prefs = """-SteamCMD: C:\\steamcmd
+-ArkServerInstall: C:\\ARKServer
+-ServerName: My Island Server
+-ServerAdminPassword: hunter2
+-ServerPort: 7777
+-ServerQueryPort: 27015
+-ServerMaxPlayers: 70
+-ServerRCONPort: 27020
+-ServerLaunchOptions: -NoBattlEye -mods=931874,928102 -ActiveEvent=Summer
+-NotAKey: ignored
+"""
+
+
+@pytest.fixture
+def store_path(tmp_path):
+    return str(tmp_path / "profiles.json")
+
+
+def test_old_user_prefs_are_migrated(tmp_path, store_path):
+    legacy_path = tmp_path / "user.prefs"
+    legacy_path.write_text(legacy_prefs, encoding="utf-8")
+
+    store = ProfileStore(store_path, legacy_prefs_path=str(legacy_path)).load()
+    assert store.names() == ["Default"]
+    assert store.active == "Default"
+    profile = store.get("Default")
+    # Values with spaces are kept whole, numbers are typed
+    assert profile["ServerLaunchOptions"] == "-NoBattlEye -mods=931874,928102 -ActiveEvent=Summer"
+    assert profile["ServerName"] == "My Island Server"
+    assert profile["ServerPort"] == 7777 and profile["ServerMaxPlayers"] == 70
+    assert "NotAKey" not in profile
+
+    # The migration is written out once, in the current schema
+    assert store.save()
+    with open(store_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    assert data["schema_version"] == schema_version
+    assert data["profiles"]["Default"]["ServerRCONPort"] == 27020
+    assert not ProfileStore(store_path, legacy_prefs_path=str(legacy_path)).load().dirty
+
+
+def test_no_prefs_at_all(tmp_path, store_path):
+    store = ProfileStore(store_path, legacy_prefs_path=str(tmp_path / "missing.prefs")).load()
+    assert store.names() == [] and store.active is None
+    assert not store.save()
+    assert not os.path.exists(store_path)
+
+
+def test_profiles_round_trip_and_save_only_when_changed(store_path):
+    store = ProfileStore(store_path, legacy_prefs_path=None).load()
+    store.set("Island", {"ArkServerInstall": "C:\\Island", "ServerPort": "7777", "AutoRestart": "True"})
+    store.set("Center", {"ArkServerInstall": "C:\\Center", "ServerPort": "7779", "AutoRestart": "False"})
+    assert store.save()
+    assert not store.save()
+    mtime = os.stat(store_path).st_mtime_ns
+
+    reloaded = ProfileStore(store_path, legacy_prefs_path=None).load()
+    assert reloaded.names() == ["Center", "Island"]
+    assert reloaded.active == "Center"
+    assert reloaded.get("Island") == {"ArkServerInstall": "C:\\Island", "ServerPort": 7777, "AutoRestart": True}
+    # The GUI gets flat strings back, booleans as "True"/"False"
+    assert reloaded.get_prefs("Center") == {"ArkServerInstall": "C:\\Center", "ServerPort": "7779", "AutoRestart": "False"}
+
+    reloaded.set("Center", {"ArkServerInstall": "C:\\Center", "ServerPort": 7779, "AutoRestart": False})
+    assert not reloaded.save()
+    assert os.stat(store_path).st_mtime_ns == mtime
+
+    reloaded.delete("Center")
+    assert reloaded.active == "Island"
+    assert reloaded.save()
+
+
+def test_bad_values_and_newer_schemas_are_rejected(store_path):
+    store = ProfileStore(store_path, legacy_prefs_path=None).load()
+    with pytest.raises(ValueError, match="ServerPort must be a number"):
+        store.set("Island", {"ServerPort": "seven"})
+
+    with open(store_path, "w", encoding="utf-8") as f:
+        json.dump({"schema_version": schema_version + 1, "profiles": {}}, f)
+    with pytest.raises(ValueError, match="newer version"):
+        ProfileStore(store_path, legacy_prefs_path=None).load()
+
+
+def test_hundreds_of_profiles_load_quickly(store_path):
+    store = ProfileStore(store_path, legacy_prefs_path=None).load()
+    for number in range(500):
+        store.set(f"map{number:03d}", {
+            "ArkServerInstall": f"D:\\Servers\\map{number}", "ServerName": f"Cluster map {number}",
+            "ServerPort": 7777 + number * 2, "ServerLaunchOptions": "-NoBattlEye -mods=931874,928102",
+        })
+    store.save()
+
+    start = time.perf_counter()
+    reloaded = ProfileStore(store_path, legacy_prefs_path=None).load()
+    seconds = time.perf_counter() - start
+    assert len(reloaded.names()) == 500
+    assert reloaded.get("map250")["ServerPort"] == 7777 + 500
+    assert seconds < 1.0
@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+
+from fake_rcon import FakeRconServer
+from rcon import RconClient, RconPool, RconAuthError
+
+
+@pytest.fixture
+def server():
+    server = FakeRconServer()
+    yield server
+    server.close()
+
+
+def test_command_round_trip(server):
+    client = RconClient("127.0.0.1", server.port, "secret")
+    assert client.command("SaveWorld") == "SaveWorld ok"
+    assert client.last_latency is not None
+    client.close()
+
+
+def test_wrong_password(server):
+    with pytest.raises(RconAuthError):
+        RconClient("127.0.0.1", server.port, "wrong").command("SaveWorld")
+
+
+def test_pipelined_replies_are_matched_by_id(server):
+    client = RconClient("127.0.0.1", server.port, "secret")
+    commands = [f"broadcast {i}" for i in range(50)]
+    assert client.commands(commands) == [f"{command} ok" for command in commands]
+    assert server.logins == 1
+    client.close()
+
+
+def test_reconnects_after_the_server_drops_the_connection(server):
+    client = RconClient("127.0.0.1", server.port, "secret")
+    client.command("ListPlayers")
+    server.drop_connections()
+    assert client.command("ListPlayers") == "ListPlayers ok"
+    assert server.logins == 2
+    client.close()
+
+
+def test_pool_keeps_one_login_per_server(server):
+    pool = RconPool()
+    for _ in range(10):
+        pool.command("127.0.0.1", server.port, "secret", "ListPlayers")
+    assert server.logins == 1
+    pool.close()
+
+
+def test_broadcast_to_many_servers():
+    servers = [FakeRconServer() for _ in range(5)]
+    pool = RconPool()
+    try:
+        replies = asyncio.run(pool.broadcast([("127.0.0.1", server.port, "secret") for server in servers], "SaveWorld"))
+        assert replies == ["SaveWorld ok"] * 5
+        servers[0].close()
+        pool.close()
+        replies = asyncio.run(pool.broadcast([("127.0.0.1", server.port, "secret") for server in servers], "SaveWorld"))
+        # One server being down doesn't fail the others
+        assert isinstance(replies[0], OSError)
+        assert replies[1:] == ["SaveWorld ok"] * 4
+    finally:
+        pool.close()
+        for server in servers:
+            server.close()
+
+
+def test_replies_over_several_packets_are_joined():
+    players = "\n".join(f"{i}. Player{i}, 0002{i:028d}" for i in range(70))
+    server = FakeRconServer(replies={"ListPlayers": players}, packet_size=100)
+    client = RconClient("127.0.0.1", server.port, "secret")
+    try:
+        assert client.command("ListPlayers") == players
+        # Pipelined, each reply still ends at its own echo
+        assert client.commands(["ListPlayers", "SaveWorld", "ListPlayers"]) == [players, "SaveWorld ok", players]
+        assert client.command("SaveWorld") == "SaveWorld ok"
+    finally:
+        client.close()
+        server.close()
@@ -0,0 +1,256 @@
+import asyncio
+import datetime
+import heapq
+import itertools
+import json
+import threading
+import time
+
+import pytest
+
+from helpers import wait_for
+from log_events import LogEvent, server_crashed
+from scheduler import CronError, CronSchedule, Job, LeadSchedule, MaintenanceScheduler, backup_chain, restart_chain
+
+
+def at(*args):
+    return datetime.datetime(*args).timestamp()
+
+
+class FakeClock:
+    # Virtual time: sleepers wake in deadline order as fast as the test can run them. Time only moves
+    # up to `until`, later sleeps never finish, so each scheduled job runs once per window.
+    def __init__(self, now, until):
+        self.now = now
+        self.until = until
+        self.sleepers = []
+        self.order = itertools.count()
+
+    def time(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self.sleepers, (self.now + max(0, seconds), next(self.order), future))
+        await future
+
+    async def drive(self):
+        while True:
+            # Real time for work handed to threads (RCON commands, stop/start) to finish first
+            await asyncio.sleep(0.005)
+            if self.sleepers and self.sleepers[0][0] <= self.until:
+                deadline, _, future = heapq.heappop(self.sleepers)
+                self.now = max(self.now, deadline)
+                if not future.done():
+                    future.set_result(None)
+
+
+async def run_until(scheduler, clock, done, timeout=10, during=None):
+    driver = asyncio.ensure_future(clock.drive())
+    runner = asyncio.ensure_future(scheduler.run())
+    if during:
+        asyncio.ensure_future(during)
+    deadline = time.time() + timeout
+    while not done() and time.time() < deadline:
+        await asyncio.sleep(0.01)
+    scheduler.stop()
+    await runner
+    driver.cancel()
+    assert done(), "the scheduled jobs didn't finish"
+
+
+def test_cron_fields():
+    schedule = CronSchedule("*/15 4-5 * * *")
+    assert schedule.minutes == {0, 15, 30, 45}
+    assert schedule.hours == {4, 5}
+    assert CronSchedule("0 4 * * 7").weekdays == CronSchedule("0 4 * * 0").weekdays == {6}
+    assert CronSchedule("5/20 * * * *").minutes == {5, 25, 45}
+    for expression in ("* * * *", "60 * * * *", "*/0 * * * *", "0 4 31-1 * *", "a * * * *"):
+        with pytest.raises(CronError):
+            CronSchedule(expression)
+
+
+def test_next_run_times():
+    # 2026-10-17 is a Saturday
+    assert CronSchedule("0 4 * * *").next_after(at(2026, 10, 17, 3, 59)) == at(2026, 10, 17, 4, 0)
+    assert CronSchedule("0 4 * * *").next_after(at(2026, 10, 17, 4, 0)) == at(2026, 10, 18, 4, 0)
+    assert CronSchedule("30 4 * * 1-5").next_after(at(2026, 10, 17, 12, 0)) == at(2026, 10, 19, 4, 30)
+    assert CronSchedule("0 0 1 1 *").next_after(at(2026, 10, 17)) == at(2027, 1, 1)
+    # Both day fields restricted: either one matching is enough, like cron
+    assert CronSchedule("0 6 1 * 1").next_after(at(2026, 10, 17)) == at(2026, 10, 19, 6, 0)
+    with pytest.raises(CronError):
+        CronSchedule("0 0 30 2 *").next_after(at(2026, 10, 17))
+
+
+def test_lead_schedule_fires_before_the_schedule():
+    schedule = LeadSchedule(CronSchedule("0 4 * * *"), 15 * 60)
+    assert schedule.next_after(at(2026, 10, 17, 3, 0)) == at(2026, 10, 17, 3, 45)
+    assert schedule.next_after(at(2026, 10, 17, 3, 45)) == at(2026, 10, 18, 3, 45)
+
+
+def test_job_needs_exactly_one_trigger():
+    with pytest.raises(ValueError):
+        Job("both", lambda: None, schedule="0 4 * * *", after="other")
+    with pytest.raises(ValueError):
+        Job("none", lambda: None)
+
+
+def test_restart_chain_runs_in_order_at_the_right_times():
+    restart_at = at(2026, 10, 17, 4, 0)
+    clock = FakeClock(restart_at - 90 * 60, until=restart_at + 60 * 60)
+    steps = []
+
+    def step(name):
+        return lambda *args: steps.append((name,) + args + (clock.time(),))
+
+    jobs = restart_chain(
+        "island", "0 4 * * *", step("rcon"), step("stop"), step("update"), step("start"), clock=clock,
+        backup=step("backup"), prepare=step("prepare")
+    )
+    scheduler = MaintenanceScheduler(clock=clock)
+    scheduler.add_jobs(jobs)
+    asyncio.run(run_until(scheduler, clock, lambda: steps and steps[-1][0] == "start"))
+
+    minute = 60
+    assert steps == [
+        ("prepare", restart_at - 75 * minute),
+        ("rcon", "broadcast Server restart in 15 minutes.", restart_at - 15 * minute),
+        ("rcon", "broadcast Server restart in 10 minutes.", restart_at - 10 * minute),
+        ("rcon", "broadcast Server restart in 5 minutes.", restart_at - 5 * minute),
+        ("rcon", "broadcast Server restart in 1 minute.", restart_at - 1 * minute),
+        ("rcon", "SaveWorld", restart_at),
+        ("stop", restart_at),
+        ("backup", restart_at),
+        ("update", restart_at),
+        ("start", restart_at),
+    ]
+    assert scheduler.jitter_stats()["island:countdown"]["max"] == 0
+
+
+def test_a_failed_update_still_restarts_but_a_failed_stop_does_not():
+    restart_at = at(2026, 10, 17, 4, 0)
+    clock = FakeClock(restart_at - 20 * 60, until=restart_at + 60)
+    steps = []
+    messages = []
+
+    def broken_update():
+        raise OSError("disk full")
+
+    jobs = restart_chain(
+        "island", "0 4 * * *", lambda command: None, lambda: steps.append("stop"), broken_update,
+        lambda: steps.append("start"), clock=clock, log=messages.append
+    )
+    scheduler = MaintenanceScheduler(clock=clock, log=messages.append)
+    scheduler.add_jobs(jobs)
+    asyncio.run(run_until(scheduler, clock, lambda: "start" in steps))
+    assert steps == ["stop", "start"]
+    assert any("Update of 'island' failed" in message for message in messages)
+
+    def broken_stop():
+        raise RuntimeError("still running")
+
+    clock = FakeClock(restart_at - 20 * 60, until=restart_at + 60)
+    steps = []
+    jobs = restart_chain(
+        "island", "0 4 * * *", lambda command: None, broken_stop, lambda: steps.append("update"),
+        lambda: steps.append("start"), clock=clock
+    )
+    scheduler = MaintenanceScheduler(clock=clock, log=messages.append)
+    scheduler.add_jobs(jobs)
+    asyncio.run(run_until(scheduler, clock, lambda: scheduler.jobs["island:stop"].last_result is False))
+    assert steps == []
+
+
+def test_missed_run_is_caught_up_after_a_restart_of_the_manager(tmp_path):
+    state_path = str(tmp_path / "scheduler.json")
+    with open(state_path, "w", encoding="utf-8") as f:
+        json.dump({"last_run": {"backup": at(2026, 10, 17, 2, 0)}}, f)
+    # The 03:00 run was missed, the manager comes back at 03:30
+    clock = FakeClock(at(2026, 10, 17, 3, 30), until=at(2026, 10, 17, 3, 30))
+    runs = []
+    scheduler = MaintenanceScheduler(clock=clock, state_path=state_path)
+    scheduler.add_job(Job("backup", lambda: runs.append(clock.time()), schedule="0 * * * *"))
+    asyncio.run(run_until(scheduler, clock, lambda: runs))
+    assert runs == [at(2026, 10, 17, 3, 30)]
+    assert scheduler.jobs["backup"].jitter[0] == 30 * 60
+    with open(state_path, "r", encoding="utf-8") as f:
+        assert json.load(f)["last_run"]["backup"] == at(2026, 10, 17, 3, 30)
+
+
+def test_many_servers_share_one_loop():
+    restart_at = at(2026, 10, 17, 4, 0)
+    clock = FakeClock(restart_at - 20 * 60, until=restart_at + 60)
+    started = []
+    scheduler = MaintenanceScheduler(clock=clock)
+    for number in range(50):
+        scheduler.add_jobs(restart_chain(
+            f"map{number}", "0 4 * * *", lambda command: None, lambda: None, lambda: None,
+            lambda number=number: started.append(number), clock=clock
+        ))
+    asyncio.run(run_until(scheduler, clock, lambda: len(started) == 50, timeout=30))
+    assert sorted(started) == list(range(50))
+
+
+def test_changing_one_servers_jobs_leaves_restarts_under_way_alone():
+    restart_at = at(2026, 10, 17, 4, 0)
+    clock = FakeClock(restart_at - 20 * 60, until=restart_at + 60 * 60)
+    steps = []
+    release = threading.Event()
+
+    def chain(server, schedule):
+        def update():
+            steps.append((server, "update", clock.time()))
+            release.wait(10)
+
+        return restart_chain(
+            server, schedule, lambda command: None, lambda: steps.append((server, "stop", clock.time())), update,
+            lambda: steps.append((server, "start", clock.time())), clock=clock
+        )
+
+    scheduler = MaintenanceScheduler(clock=clock)
+    scheduler.add_jobs(chain("island", "0 4 * * *") + chain("center", "0 4 * * *"))
+    old_countdown = scheduler.jobs["center:countdown"]
+
+    async def edit_while_updating():
+        while sum(step[1] == "update" for step in steps) < 2:
+            await asyncio.sleep(0.005)
+        # Both servers are down for their update: center gets a new time, island's schedule is cleared
+        scheduler.remove_jobs("center:")
+        scheduler.add_jobs(chain("center", "30 4 * * *"))
+        assert [job.name for job in scheduler.remove_jobs("island:")][:2] == ["island:countdown", "island:save"]
+        release.set()
+
+    asyncio.run(run_until(
+        scheduler, clock, lambda: sum(step[:2] == ("center", "start") for step in steps) == 2,
+        during=edit_while_updating()
+    ))
+    # The restarts under way still brought both servers back
+    assert [step[1] for step in steps if step[0] == "island"] == ["stop", "update", "start"]
+    assert sorted(step[1] for step in steps if step[0] == "center") == ["start", "start", "stop", "stop", "update", "update"]
+    assert ("center", "stop", restart_at + 30 * 60) in steps
+    assert not any(name.startswith("island:") for name in scheduler.jobs)
+    assert scheduler.jobs["center:countdown"] is not old_countdown
+
+
+def test_backup_chain_saves_the_world_first():
+    clock = FakeClock(at(2026, 10, 17, 3, 59), until=at(2026, 10, 17, 4, 0))
+    steps = []
+    scheduler = MaintenanceScheduler(clock=clock)
+    scheduler.add_jobs(backup_chain("island", CronSchedule("0 * * * *"), steps.append, lambda: steps.append("backup")))
+    asyncio.run(run_until(scheduler, clock, lambda: "backup" in steps))
+    assert steps == ["SaveWorld", "backup"]
+
+
+def test_event_jobs_run_when_notified():
+    scheduler = MaintenanceScheduler()
+    ran = threading.Event()
+    scheduler.add_job(Job("crash-backup", ran.set, event=server_crashed, source="island"))
+    scheduler.start_in_thread()
+    try:
+        wait_for(lambda: scheduler.loop is not None and scheduler.stop_event is not None)
+        scheduler.notify(LogEvent(server_crashed, "Fatal error!", {}, time.time(), "center"))
+        assert not ran.wait(0.2)
+        scheduler.notify(LogEvent(server_crashed, "Fatal error!", {}, time.time(), "island"))
+        assert ran.wait(5)
+    finally:
+        scheduler.stop()
@@ -0,0 +1,87 @@
+import time
+
+from helpers import fake_server_command, wait_for
+from server_supervisor import ServerSupervisor, graceful_stop
+
+
+def test_instances_run_side_by_side_with_their_own_output(tmp_path):
+    supervisor = ServerSupervisor()
+    count = 30
+    for number in range(count):
+        install_path = tmp_path / f"map{number}"
+        install_path.mkdir()
+        supervisor.add(f"map{number}", str(install_path), command=fake_server_command("--lines", str(number + 1), "--ready"))
+
+    start = time.perf_counter()
+    for number in range(count):
+        supervisor.start(f"map{number}")
+    assert len(supervisor.running()) == count
+
+    try:
+        for number in range(count):
+            instance = supervisor.get(f"map{number}")
+            wait_for(lambda: instance.ready_at is not None)
+            lines = instance.log_buffer.drain()
+            assert lines[:-1] == [f"log line {line}" for line in range(number + 1)]
+        statuses = supervisor.status()
+        assert {status["state"] for status in statuses} == {"running"}
+        assert all(status["ready"] for status in statuses)
+        # Dozens of servers start in about the time of a few (each start is one Popen)
+        assert time.perf_counter() - start < 30
+    finally:
+        supervisor.stop_all(timeout=5)
+    assert supervisor.running() == []
+    assert {status["state"] for status in supervisor.status()} == {"stopped"}
+
+
+def test_stopping_one_instance_leaves_the_others_running(tmp_path):
+    supervisor = ServerSupervisor()
+    for name in ("island", "center"):
+        supervisor.add(name, str(tmp_path), command=fake_server_command())
+        supervisor.start(name)
+    try:
+        supervisor.stop("island", timeout=5)
+        assert not supervisor.is_running("island")
+        assert supervisor.is_running("center")
+    finally:
+        supervisor.stop_all(timeout=5)
+
+
+def test_exit_is_reported(tmp_path):
+    supervisor = ServerSupervisor()
+    instance = supervisor.add("crashy", str(tmp_path), command=fake_server_command("--then", "crash"))
+    exited = []
+    instance.on_exit.append(lambda exited_instance: exited.append(exited_instance.exit_code))
+    instance.start()
+    wait_for(lambda: exited)
+    assert exited == [3]
+    assert instance.status()["state"] == "exited"
+
+
+def test_a_failing_listener_does_not_stop_the_output(tmp_path):
+    supervisor = ServerSupervisor()
+    instance = supervisor.add("server", str(tmp_path), command=fake_server_command("--lines", "500", "--then", "exit"))
+    received = []
+
+    def full_disk(line):
+        raise OSError(28, "No space left on device")
+
+    instance.listeners.append(full_disk)
+    instance.listeners.append(received.append)
+    instance.start()
+    wait_for(lambda: instance.exit_code is not None)
+    assert len(received) == 500
+    assert instance.listener_errors == 500
+    lines = instance.log_buffer.drain()
+    assert sum("listener failed" in line for line in lines) == 1
+
+
+def test_graceful_stop_kills_a_server_that_ignores_the_exit_command(tmp_path):
+    supervisor = ServerSupervisor()
+    instance = supervisor.add("server", str(tmp_path), command=fake_server_command())
+    instance.start()
+    sent = []
+    graceful_stop(instance, sent.append, timeout=1)
+    assert sent == ["DoExit"]
+    assert not instance.is_running()
+    assert instance.status()["state"] == "stopped"
@@ -0,0 +1,199 @@
+import json
+import time
+
+import pytest
+
+from helpers import fake_server_command, wait_for
+from server_supervisor import ServerInstance
+from server_watchdog import Watchdog, watchdog_state_path
+
+
+class OffsetClock:
+    # Real time plus a jump forward, the servers' own timestamps stay on the real clock
+    def __init__(self):
+        self.offset = 0.0
+
+    def __call__(self):
+        return time.time() + self.offset
+
+    def advance(self, seconds):
+        self.offset += seconds
+
+
+@pytest.fixture
+def clock():
+    return OffsetClock()
+
+
+@pytest.fixture
+def instances(tmp_path):
+    created = []
+
+    def make(*args):
+        instance = ServerInstance(f"map{len(created)}", str(tmp_path), command=fake_server_command(*args))
+        created.append(instance)
+        return instance
+
+    yield make
+    for instance in created:
+        instance.stop(timeout=5)
+
+
+def make_watchdog(clock, messages, **kwargs):
+    options = {"backoff_initial": 10, "backoff_max": 40, "startup_timeout": 0, "crash_grace": 5}
+    options.update(kwargs)
+    # Checks are run by hand, the watchdog thread isn't started
+    return Watchdog(clock=clock, log=messages.append, **options)
+
+
+def test_clean_exit_is_not_restarted(clock, instances):
+    messages = []
+    watchdog = make_watchdog(clock, messages)
+    instance = instances("--then", "exit")
+    watchdog.watch(instance)
+    instance.start()
+    wait_for(lambda: watchdog.status(instance.name)["state"] == "stopped")
+    assert messages == [f"Server '{instance.name}' exited cleanly, not restarting it."]
+
+
+def test_stop_by_hand_is_not_restarted(clock, instances):
+    messages = []
+    watchdog = make_watchdog(clock, messages)
+    instance = instances("--ready")
+    watchdog.watch(instance)
+    instance.start()
+    instance.stop(timeout=5)
+    wait_for(lambda: watchdog.status(instance.name)["state"] == "stopped")
+    assert messages == []
+
+
+def test_crash_is_restarted_and_the_incident_is_saved(clock, instances, tmp_path):
+    messages = []
+    watchdog = make_watchdog(clock, messages)
+    instance = instances("--then", "crash")
+    state_path = watchdog_state_path(str(tmp_path))
+
+    def restart():
+        # The second run comes up fine
+        instance.command = fake_server_command("--ready")
+        instance.start()
+
+    server = watchdog.watch(instance, restart=restart, state_path=state_path)
+    instance.start()
+    wait_for(lambda: watchdog.status(instance.name)["state"] == "waiting")
+    status = watchdog.status(instance.name)
+    assert status["reason"] == "exited with code 3"
+    assert 9 <= status["restart_in"] <= 10
+
+    # Not before the backoff is over
+    watchdog.check(server)
+    assert not instance.is_running()
+    clock.advance(10)
+    watchdog.check(server)
+    assert instance.is_running()
+    wait_for(lambda: instance.ready_at is not None)
+    watchdog.check(server)
+
+    assert watchdog.status(instance.name) == {"state": "watching", "incidents": 1}
+    summary = watchdog.summary(instance.name)
+    assert summary["recovered"] == 1 and summary["last_reason"] == "exited with code 3"
+    assert summary["downtime"] > 0 and summary["mean_time_to_recover"] > 0
+    with open(state_path, "r", encoding="utf-8") as f:
+        incidents = json.load(f)["incidents"]
+    assert [(incident["reason"], incident["restarts"]) for incident in incidents] == [("exited with code 3", 1)]
+
+    # History survives a restart of the manager
+    reloaded = make_watchdog(clock, [])
+    reloaded.watch(ServerInstance(instance.name, str(tmp_path)), state_path=state_path)
+    assert reloaded.summary(instance.name)["incidents"] == 1
+
+
+def test_backoff_doubles_until_the_crash_loop_limit(clock, instances):
+    messages = []
+    watchdog = make_watchdog(clock, messages, crash_loop_limit=3)
+    instance = instances("--then", "crash")
+    server = watchdog.watch(instance)
+    instance.start()
+
+    for delay in (10, 20, 40):
+        wait_for(lambda: messages[-1:] == [f"Server '{instance.name}' exited with code 3. Restarting in {delay}s."])
+        clock.advance(delay)
+        watchdog.check(server)
+
+    wait_for(lambda: watchdog.status(instance.name)["state"] == "crash-loop")
+    assert "giving up until it is started by hand" in messages[-1]
+    assert watchdog.summary(instance.name)["incidents"] == 1
+    assert "recovered_at" not in server.incidents[0] and server.incidents[0]["restarts"] == 3
+
+    # Starting it by hand watches it again
+    watchdog.watch(instance)
+    assert watchdog.status(instance.name)["state"] == "watching"
+
+
+def test_logged_crash_of_a_process_that_stays_up_is_killed(clock, instances):
+    messages = []
+    watchdog = make_watchdog(clock, messages)
+    instance = instances("--ready", "--then", "fatal")
+    server = watchdog.watch(instance)
+    instance.start()
+    wait_for(lambda: server.crash_seen_at is not None)
+
+    # The crash reporter gets its grace period first
+    watchdog.check(server)
+    assert instance.is_running()
+    clock.advance(5)
+    watchdog.check(server)
+    assert not instance.is_running()
+    assert watchdog.status(instance.name)["state"] == "waiting"
+    assert watchdog.status(instance.name)["reason"] == "crashed: Access violation"
+    # The kill's own exit isn't a second failure
+    time.sleep(0.2)
+    assert server.consecutive_failures == 1
+
+
+@pytest.mark.parametrize("args, options, advance, reason", [
+    (("--ready", "--then", "hang"), {"heartbeat_timeout": 30}, 30, "went silent"),
+    (("--then", "hang"), {"startup_timeout": 60}, 60, "was not ready after 60s"),
+])
+def test_hung_server_is_killed(clock, instances, args, options, advance, reason):
+    messages = []
+    watchdog = make_watchdog(clock, messages, **options)
+    instance = instances(*args)
+    server = watchdog.watch(instance)
+    instance.start()
+    wait_for(lambda: instance.last_output_at is not None or "--ready" not in args)
+
+    watchdog.check(server)
+    assert instance.is_running()
+    clock.advance(advance)
+    watchdog.check(server)
+    assert not instance.is_running()
+    assert watchdog.status(instance.name)["reason"].startswith(reason)
+    assert messages[0].endswith("killing it.")
+
+
+def test_server_that_stops_answering_rcon_is_killed(clock, instances):
+    messages = []
+    watchdog = make_watchdog(clock, messages, probe_interval=10, probe_failures=2)
+    instance = instances("--ready")
+    probes = []
+
+    def probe():
+        probes.append(clock())
+        if len(probes) > 1:
+            raise OSError("timed out")
+
+    server = watchdog.watch(instance, probe=probe)
+    instance.start()
+    wait_for(lambda: instance.ready_at is not None)
+
+    # One good answer, then it takes two failed probes in a row
+    for _ in range(2):
+        clock.advance(10)
+        watchdog.check(server)
+        assert instance.is_running()
+    clock.advance(10)
+    watchdog.check(server)
+    assert len(probes) == 3
+    assert not instance.is_running()
+    assert watchdog.status(instance.name)["reason"] == "stopped answering RCON (timed out)"
@@ -0,0 +1,61 @@
+import os
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+QtGui = pytest.importorskip("PyQt5.QtGui")
+QtWidgets = pytest.importorskip("PyQt5.QtWidgets")
+
+from ini_model import known_settings
+from settings_editor import SettingsEditor
+
+known = known_settings("[ServerSettings]\nXPMultiplier=1.0\nServerPVE=False\n")
+
+
+@pytest.fixture
+def app():
+    return QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+
+class Jobs:
+    # Runs each job right away on the calling thread, counting them
+    def __init__(self):
+        self.runs = 0
+
+    def __call__(self, fn, *args, on_done=None, on_error=None):
+        self.runs += 1
+        try:
+            result = fn(*args)
+        except Exception as e:
+            on_error(str(e))
+        else:
+            on_done(result)
+
+
+def test_opening_a_file_validates_it(app):
+    jobs = Jobs()
+    editor = SettingsEditor(jobs, known=known)
+    editor.setPlainText("[ServerSettings]\nXPMultiplier=fast\n\n[SessionSettings]\nSessionName=Island\n")
+    assert jobs.runs == 1
+    assert editor.sections == [(0, "ServerSettings"), (3, "SessionSettings")]
+    assert editor.problems == {1: "XPMultiplier should be a number, like 1.0"}
+    assert editor.problemsLabel.text() == "Line 2: XPMultiplier should be a number, like 1.0"
+    assert editor.outlineSelector.count() == 2
+
+    # Nothing changed, nothing to check
+    editor.validate()
+    assert jobs.runs == 1
+
+
+def test_typing_validates_once_it_pauses(app):
+    jobs = Jobs()
+    editor = SettingsEditor(jobs, known=known)
+    editor.setPlainText("[ServerSettings]\nXPMultiplier=1.0\n")
+    editor.textEdit.moveCursor(QtGui.QTextCursor.End)
+    for character in "ServerPVE=yes":
+        editor.textEdit.insertPlainText(character)
+    assert jobs.runs == 1 and editor.validateTimer.isActive()
+
+    editor.validateTimer.timeout.emit()
+    assert jobs.runs == 2
+    assert editor.problems == {2: "ServerPVE should be True or False"}
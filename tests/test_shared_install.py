@@ -0,0 +1,81 @@
+import os
+
+import pytest
+
+from helpers import FakeSteam, LineSink
+from server_config import run_setup_script
+from shared_install import load_instances, marker_path
+from steam_update import installed_build_id, load_update_state, save_update_state
+
+exe = os.path.join("ShooterGame", "Binaries", "Win64", "ArkAscendedServer.exe")
+
+
+@pytest.fixture
+def steam(tmp_path, monkeypatch):
+    return FakeSteam(str(tmp_path), monkeypatch, build="100")
+
+
+def install(tmp_path, name, busy_instances=()):
+    sink = LineSink()
+    code = run_setup_script(
+        sink, "unused", str(tmp_path / name), f"start {name}", "[ServerSettings]\n",
+        shared_path=str(tmp_path / "shared"), busy_instances=busy_instances
+    )
+    return code, sink
+
+
+def publish(steam, tmp_path, build):
+    # Forget the cached latest build so the next update asks Steam again
+    steam.publish(build)
+    state = load_update_state(str(tmp_path / "shared"))
+    state.pop("latest_checked_at", None)
+    save_update_state(str(tmp_path / "shared"), state)
+
+
+def test_instances_link_to_the_shared_files(steam, tmp_path):
+    assert install(tmp_path, "island")[0] == 0
+    assert install(tmp_path, "center")[0] == 0
+
+    assert len(steam.app_updates()) == 1
+    assert load_instances(str(tmp_path / "shared")) == [str(tmp_path / "island"), str(tmp_path / "center")]
+    for name in ("island", "center"):
+        assert os.path.samefile(tmp_path / "shared" / exe, tmp_path / name / exe)
+        assert installed_build_id(str(tmp_path / name)) == "100"
+        assert os.path.isfile(marker_path(str(tmp_path / name)))
+    assert (tmp_path / "center" / "ShooterGame" / "Binaries" / "Win64" / "start.bat").read_text() == "start center\n"
+    assert not (tmp_path / "shared" / "ShooterGame" / "Binaries" / "Win64" / "start.bat").exists()
+
+
+def test_update_refreshes_every_stopped_instance(steam, tmp_path):
+    install(tmp_path, "island")
+    install(tmp_path, "center")
+    publish(steam, tmp_path, "101")
+
+    code, sink = install(tmp_path, "island")
+    assert code == 0
+    assert len(steam.app_updates()) == 2
+    for name in ("island", "center"):
+        assert installed_build_id(str(tmp_path / name)) == "101"
+        assert os.path.samefile(tmp_path / "shared" / exe, tmp_path / name / exe)
+    assert any(line.startswith("Refreshed 2 servers") for line in sink.lines)
+
+
+@pytest.mark.parametrize("running", ["island", "center"])
+def test_update_is_refused_while_a_linked_instance_runs(steam, tmp_path, running):
+    install(tmp_path, "island")
+    install(tmp_path, "center")
+    publish(steam, tmp_path, "101")
+    before = (tmp_path / "shared" / exe).read_bytes()
+
+    # The other server's files are the shared files, SteamCMD must not touch them while it runs
+    code, sink = install(tmp_path, "island", busy_instances=[str(tmp_path / running)])
+    assert code == 1
+    assert len(steam.app_updates()) == 1
+    assert (tmp_path / "shared" / exe).read_bytes() == before
+    assert f"{tmp_path / running} is running on the shared game files." in sink.lines
+    for name in ("island", "center"):
+        assert installed_build_id(str(tmp_path / name)) == "100"
+
+    # An unrelated running server doesn't block the update
+    assert install(tmp_path, "island", busy_instances=[str(tmp_path / "elsewhere")])[0] == 0
+    assert installed_build_id(str(tmp_path / "center")) == "101"
@@ -0,0 +1,177 @@
+import os
+
+import pytest
+
+from helpers import FakeSteam, LineSink, fake_server_command
+from server_config import run_setup_script
+from server_supervisor import ServerInstance
+from shared_install import marker_path
+import staged_update
+from staged_update import (
+    StagedUpdateError, load_history, previous_path, roll_back, stage_update, staged_info, staging_path, swap_in,
+    switch_builds, trash_path
+)
+from steam_update import installed_build_id, load_update_state, save_update_state
+
+exe = os.path.join("ShooterGame", "Binaries", "Win64", "ArkAscendedServer.exe")
+start_bat = os.path.join("ShooterGame", "Binaries", "Win64", "start.bat")
+world = os.path.join("ShooterGame", "Saved", "SavedArks", "TheIsland_WP.ark")
+# Part of the game build that SteamCMD doesn't touch between the fake builds
+movie = os.path.join("ShooterGame", "Content", "Movies", "intro.mp4")
+
+
+@pytest.fixture
+def steam(tmp_path, monkeypatch):
+    return FakeSteam(str(tmp_path), monkeypatch, build="100")
+
+
+@pytest.fixture
+def install_path(steam, tmp_path):
+    path = str(tmp_path / "server")
+    assert run_setup_script(LineSink(), "unused", path, "start", "[ServerSettings]\n") == 0
+    for relative_path, text in ((world, "world"), (movie, "movie")):
+        os.makedirs(os.path.dirname(os.path.join(path, relative_path)), exist_ok=True)
+        with open(os.path.join(path, relative_path), "w", encoding="utf-8") as f:
+            f.write(text)
+    return path
+
+
+def publish(steam, build, *install_paths):
+    # Forget the cached latest build so the next update asks Steam again
+    steam.publish(build)
+    for path in install_paths:
+        state = load_update_state(path)
+        state.pop("latest_checked_at", None)
+        save_update_state(path, state)
+
+
+def read(path, relative_path):
+    with open(os.path.join(path, relative_path), "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def stage(install_path):
+    sink = LineSink()
+    return stage_update(sink, "unused", install_path), sink
+
+
+def test_stage_while_running_then_switch(steam, install_path):
+    server = ServerInstance("island", install_path, command=fake_server_command("--ready"))
+    server.start()
+    try:
+        publish(steam, "101")
+        code, sink = stage(install_path)
+        assert code == 0
+        assert "Build 101 is staged and verified, ready to switch from 100." in sink.lines
+        # The live server was left alone
+        assert server.is_running()
+        assert installed_build_id(install_path) == "100"
+        assert read(install_path, exe).endswith("build 100")
+        assert staged_info(install_path)["build_id"] == "101"
+
+        line = switch_builds(
+            install_path, stop_server=lambda: server.stop(timeout=5), start_server=server.start
+        )
+        assert server.is_running()
+    finally:
+        server.stop(timeout=5)
+
+    assert line.startswith("Switched from build 100 to 101")
+    assert installed_build_id(install_path) == "101"
+    assert installed_build_id(previous_path(install_path)) == "100"
+    assert staged_info(install_path) is None
+    # The server's own files came along, the old tree only has the game build
+    assert read(install_path, world) == "world"
+    assert read(install_path, start_bat) == "start\n"
+    assert not os.path.exists(os.path.join(previous_path(install_path), world))
+    assert not os.path.exists(trash_path(install_path))
+    history = load_history(install_path)
+    assert [(entry["action"], entry["from_build"], entry["to_build"]) for entry in history] == [("update", "100", "101")]
+    assert history[0]["downtime_seconds"] >= 0
+
+
+def test_roll_back_and_forward(steam, install_path):
+    publish(steam, "101")
+    stage(install_path)
+    switch_builds(install_path)
+
+    line = switch_builds(install_path, rollback=True)
+    assert line.startswith("Rolled back from build 101 to 100")
+    assert installed_build_id(install_path) == "100"
+    assert read(install_path, world) == "world"
+    # The build rolled back from waits in the staging folder
+    assert installed_build_id(staging_path(install_path)) == "101"
+    assert [entry["action"] for entry in load_history(install_path)] == ["update", "rollback"]
+    # Neither switch stopped a running server
+    assert [entry["downtime_seconds"] for entry in load_history(install_path)] == [None, None]
+
+
+def test_next_stage_reuses_the_previous_build(steam, install_path):
+    publish(steam, "101")
+    stage(install_path)
+    switch_builds(install_path)
+    previous_movie = os.stat(os.path.join(previous_path(install_path), movie))
+
+    publish(steam, "102", install_path)
+    code, sink = stage(install_path)
+    assert code == 0
+    assert any(line.startswith("Reused the previous build") for line in sink.lines)
+    assert not os.path.exists(previous_path(install_path))
+    # Files the last update didn't change weren't copied again
+    staged_movie = os.stat(os.path.join(staging_path(install_path), movie))
+    assert (staged_movie.st_dev, staged_movie.st_ino) == (previous_movie.st_dev, previous_movie.st_ino)
+    assert any(" 1 unchanged" in line for line in sink.lines)
+    assert staged_info(install_path)["build_id"] == "102"
+
+    with pytest.raises(StagedUpdateError):
+        roll_back(install_path)
+    switch_builds(install_path)
+    assert installed_build_id(install_path) == "102"
+    assert installed_build_id(previous_path(install_path)) == "101"
+    assert read(install_path, movie) == "movie"
+
+
+def test_failed_steamcmd_leaves_nothing_to_switch_to(steam, install_path, monkeypatch):
+    publish(steam, "101")
+    monkeypatch.setenv("FAKE_STEAM_FAIL", "8")
+    code, sink = stage(install_path)
+    assert code == 8
+    assert any("the live server is unchanged" in line for line in sink.lines)
+    assert staged_info(install_path) is None
+    with pytest.raises(StagedUpdateError):
+        swap_in(install_path)
+    assert installed_build_id(install_path) == "100"
+
+
+def test_staging_needs_an_own_install(steam, install_path, tmp_path):
+    code, sink = stage(str(tmp_path / "missing"))
+    assert code == 1 and "run a normal Install/Update first" in sink.lines[0]
+
+    os.makedirs(os.path.dirname(marker_path(install_path)), exist_ok=True)
+    with open(marker_path(install_path), "w", encoding="utf-8") as f:
+        f.write("{}")
+    code, sink = stage(install_path)
+    assert code == 1 and "shared game file install" in sink.lines[0]
+
+
+def test_failed_switch_is_undone(steam, install_path, monkeypatch):
+    publish(steam, "101")
+    stage(install_path)
+    real_rename = os.rename
+
+    def rename(source, target):
+        # The live folder is still locked when it's time to move it aside
+        if source == install_path:
+            raise PermissionError("in use")
+        real_rename(source, target)
+
+    monkeypatch.setattr(staged_update.os, "rename", rename)
+    monkeypatch.setattr(staged_update, "rename_retry_seconds", 0)
+    with pytest.raises(StagedUpdateError):
+        swap_in(install_path)
+    monkeypatch.undo()
+
+    assert installed_build_id(install_path) == "100"
+    assert read(install_path, world) == "world"
+    assert read(install_path, start_bat) == "start\n"
+    assert staged_info(install_path)["build_id"] == "101"
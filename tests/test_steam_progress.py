@@ -0,0 +1,118 @@
+import io
+
+from helpers import FakeSteam, LineSink
+from server_config import steam_cmd_log_path, update_game_files
+from steam_progress import SteamProgress, format_bytes, format_seconds, split_lines
+
+
+class ChunkedStream:
+    # A pipe that hands out its data in fixed pieces, cutting lines and "\r\n" pairs apart
+    def __init__(self, data, size):
+        self.chunks = [data[i:i + size] for i in range(0, len(data), size)]
+
+    def read(self, size):
+        return self.chunks.pop(0) if self.chunks else b""
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def progress_line(phase, done, total, state="0x61"):
+    return f" Update state ({state}) {phase}, progress: {100.0 * done / total:.2f} ({done} / {total})"
+
+
+def test_split_lines_treats_carriage_returns_as_line_ends():
+    data = b"first\r\nsecond\rthird\n\n\r  \nfourth without newline"
+    for size in (1, 2, 3, 7, len(data)):
+        lines = []
+        split_lines(ChunkedStream(data, size), lines.append, encoding="utf-8")
+        assert lines == ["first", "second", "third", "fourth without newline"]
+
+
+def test_split_lines_replaces_bad_bytes():
+    lines = []
+    split_lines(io.BytesIO(b"ok\n\xff\xfe broken\n"), lines.append, encoding="utf-8")
+    assert lines == ["ok", "�� broken"]
+
+
+def test_progress_rate_and_eta():
+    clock = FakeClock()
+    progress = SteamProgress(clock)
+    assert progress.describe() == "Waiting for SteamCMD..."
+    assert not progress.feed("Logging in user 'anonymous' to Steam Public...OK")
+
+    total = 1000 * 1024 ** 2
+    for second in range(5):
+        clock.now = float(second)
+        assert progress.feed(progress_line("downloading", second * 10 * 1024 ** 2, total))
+    snapshot = progress.snapshot()
+    assert snapshot["phase"] == "downloading" and snapshot["state"] == "0x61"
+    assert snapshot["percent"] == 4.0
+    assert snapshot["rate"] == 10 * 1024 ** 2
+    assert snapshot["eta"] == 96
+    assert progress.describe(snapshot) == "Downloading: 4.0% (40.0 MB / 1000.0 MB) at 10.0 MB/s, 1:36 left"
+
+
+def test_rate_window_and_phase_change():
+    clock = FakeClock()
+    progress = SteamProgress(clock)
+    total = 10 ** 9
+    # Slow at first, fast for the last 10 seconds: only the recent rate counts
+    for second in range(30):
+        clock.now = float(second)
+        done = second * 1000 if second < 19 else 19000 + (second - 19) * 100000
+        progress.feed(progress_line("downloading", done, total))
+    assert progress.snapshot()["rate"] == 100000
+
+    # A new phase counts from zero, so the rate starts over
+    clock.now = 31.0
+    progress.feed(progress_line("verifying update", 5000, total, state="0x81"))
+    snapshot = progress.snapshot()
+    assert snapshot["phase"] == "verifying update" and snapshot["rate"] == 0.0 and snapshot["eta"] is None
+
+
+def test_finish_lines():
+    progress = SteamProgress(FakeClock())
+    progress.feed(progress_line("downloading", 50, 100))
+    progress.feed("Success! App '2430930' fully installed.")
+    snapshot = progress.snapshot()
+    assert snapshot["finished"] == "success" and snapshot["percent"] == 100.0
+
+    progress = SteamProgress(FakeClock())
+    progress.feed("Error! App '2430930' state is 0x202 after update job.")
+    assert progress.snapshot()["finished"] == "error"
+    assert (progress.lines, progress.progress_lines) == (1, 0)
+
+
+def test_formatting():
+    assert format_bytes(512) == "512 B"
+    assert format_bytes(1536) == "1.5 KB"
+    assert format_bytes(3 * 1024 ** 4) == "3072.0 GB"
+    assert format_seconds(59) == "0:59"
+    assert format_seconds(3725) == "1:02:05"
+
+
+def test_console_gets_summaries_and_the_log_file_everything(tmp_path, monkeypatch):
+    FakeSteam(str(tmp_path), monkeypatch)
+    monkeypatch.setenv("FAKE_STEAM_PROGRESS", "20000")
+    install_path = str(tmp_path / "server")
+    sink = LineSink()
+    progress = SteamProgress()
+
+    assert update_game_files(sink, "unused", install_path, progress) == 0
+
+    with open(steam_cmd_log_path(install_path), "r", encoding="utf-8") as f:
+        logged = f.read().splitlines()
+    assert sum("Update state (0x61) downloading" in line for line in logged) == 20000
+    assert "Success! App '2430930' fully installed." in logged
+
+    summaries = [line for line in sink.lines if line.startswith(("Downloading:", "Verifying update:"))]
+    assert 1 <= len(summaries) <= 10
+    assert not any("Update state" in line for line in sink.lines)
+    assert "Success! App '2430930' fully installed." in sink.lines
+    assert progress.progress_lines == 20001 and progress.snapshot()["finished"] == "success"
@@ -0,0 +1,82 @@
+import pytest
+
+from helpers import FakeSteam, LineSink
+from server_config import update_game_files, run_setup_script
+from steam_update import (
+    installed_build_id, installed_state_flags, load_update_state, plan_update, query_latest_build_id, parse_latest_build_id
+)
+
+day = 24 * 60 * 60
+
+
+@pytest.fixture
+def steam(tmp_path, monkeypatch):
+    return FakeSteam(str(tmp_path), monkeypatch, build="100")
+
+
+def test_latest_build_is_read_from_app_info(steam):
+    assert query_latest_build_id("unused") == "100"
+    assert parse_latest_build_id("no branches here") is None
+
+
+def test_fresh_install_runs_app_update_with_validate(steam, tmp_path):
+    install_path = str(tmp_path / "server")
+    sink = LineSink()
+    assert run_setup_script(sink, "unused", install_path, "start", "[ServerSettings]\n") == 0
+    assert installed_build_id(install_path) == "100"
+    assert installed_state_flags(install_path) == 4
+    assert len(steam.app_updates()) == 1 and "validate" in steam.app_updates()[0]
+    assert (tmp_path / "server" / "ShooterGame" / "Binaries" / "Win64" / "start.bat").read_text() == "start\n"
+    assert "Installed build: 100" in sink.lines
+
+
+def test_current_build_skips_app_update(steam, tmp_path):
+    install_path = str(tmp_path / "server")
+    update_game_files(LineSink(), "unused", install_path)
+
+    sink = LineSink()
+    assert update_game_files(sink, "unused", install_path) == 0
+    assert len(steam.app_updates()) == 1
+    assert any("skipping SteamCMD app_update" in line for line in sink.lines)
+    # The latest build answer is cached, Steam isn't asked again right away
+    assert len([args for args in steam.calls("steamcmd") if "+app_info_print" in args]) == 1
+
+
+def test_new_build_updates_without_validate(steam, tmp_path):
+    install_path = str(tmp_path / "server")
+    update_game_files(LineSink(), "unused", install_path)
+    steam.publish("101")
+    state = load_update_state(install_path)
+    plan = plan_update(install_path, "unused", now=state["last_validate_at"] + 60)
+    assert plan.run_update and not plan.validate
+    assert plan.describe() == "Running SteamCMD update without validate: build 100 -> 101."
+
+    assert update_game_files(LineSink(), "unused", install_path) == 0
+    assert installed_build_id(install_path) == "101"
+    assert "validate" not in steam.app_updates()[-1]
+
+
+def test_validate_runs_on_its_own_schedule(steam, tmp_path):
+    install_path = str(tmp_path / "server")
+    update_game_files(LineSink(), "unused", install_path)
+    state = load_update_state(install_path)
+    assert not plan_update(install_path, "unused", now=state["last_validate_at"] + 6 * day).run_update
+    plan = plan_update(install_path, "unused", now=state["last_validate_at"] + 7 * day)
+    assert plan.run_update and plan.validate
+    assert plan.reason == "scheduled validate is due"
+
+
+def test_timings_are_recorded(steam, tmp_path):
+    install_path = str(tmp_path / "server")
+    sink = LineSink()
+    update_game_files(sink, "unused", install_path)
+    timings = load_update_state(install_path)["last_timings"]
+    assert {"read_manifest", "build_check", "script"} <= set(timings)
+    assert any(line.startswith("Update timings: ") for line in sink.lines)
+
+
+def test_failed_update_is_not_recorded(steam, tmp_path, monkeypatch):
+    install_path = str(tmp_path / "server")
+    monkeypatch.setenv("FAKE_STEAM_FAIL", "8")
+    assert update_game_files(LineSink(), "unused", install_path) == 8
+    assert "installed_build_id" not in load_update_state(install_path)
@@ -1,3 +1,8 @@
+# Pass -validate to also re-hash every installed file (slow, schedule it less often than updates)
+param (
+    [switch]$validate
+)
+
 # Prompt for the SteamCMD installation directory
 $steamCmdPath = Read-Host "Enter the path where SteamCMD is installed"
 
@@ -26,7 +31,10 @@ if (-not (Test-Path $arkServerCmd)) {
 }
 
 $forceInstallDir = "+force_install_dir $installPath"
-$appUpdate = "+app_update 2430930 validate"
+$appUpdate = "+app_update 2430930"
+if ($validate) {
+    $appUpdate = "+app_update 2430930 validate"
+}
 
 # Run the update command using SteamCMD
 $steamCmdPath = Join-Path $steamCmdPath "steamcmd.exe"